@@ -0,0 +1,377 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+from .format_functions import FormatFunctions
+import point_parser.formats as fmts
+
+"""
+This module parses many matches at once. Rather than advancing one match at a
+time, all matches are advanced point by point in lock-step, with NumPy doing
+the work across matches.
+
+To do this, the format functions are called with arrays of scores rather than
+integers. The functions in standard_win_functions.py (and therefore all the
+formats in formats.py) support this. The only exceptions are the functions
+returning server and returner, which are called once for each distinct
+argument.
+"""
+
+
+@dataclass
+class BatchStates:
+    """
+    The states after each point of a batch of matches, with one array for each
+    field.
+
+    The state after point i of match m is in row offsets[m] + i of each array.
+    As in CompactMatchState, players are referred to by index: 0 is the first
+    server and 1 the first returner. The score arrays have one column for
+    each player.
+    """
+
+    server: np.ndarray
+    is_tiebreak: np.ndarray
+
+    set_num: np.ndarray
+    total_games_played: np.ndarray
+
+    cur_set_score: np.ndarray
+    cur_game_score: np.ndarray
+
+    sets_won: np.ndarray
+
+    is_over: np.ndarray
+
+    def __len__(self) -> int:
+
+        return len(self.server)
+
+
+def empty_batch_states(n_rows: int) -> BatchStates:
+    """
+    Creates BatchStates with n_rows rows, all set to the start of a match.
+    """
+
+    return BatchStates(
+        server=np.zeros(n_rows, dtype=np.int8),
+        is_tiebreak=np.zeros(n_rows, dtype=bool),
+        set_num=np.zeros(n_rows, dtype=np.int8),
+        total_games_played=np.zeros(n_rows, dtype=np.int16),
+        cur_set_score=np.zeros((n_rows, 2), dtype=np.int16),
+        cur_game_score=np.zeros((n_rows, 2), dtype=np.int16),
+        sets_won=np.zeros((n_rows, 2), dtype=np.int8),
+        is_over=np.zeros(n_rows, dtype=bool)
+    )
+
+
+def concatenate_matches(win_loss_vectors: Sequence[Sequence[bool]]) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Concatenates the win/loss vectors of several matches into the input
+    expected by parse_batch.
+
+    Args:
+        win_loss_vectors: One win/loss vector for each match.
+
+    Returns:
+        A tuple of the concatenated boolean array and the offsets array, in
+        which match m runs from offsets[m] to offsets[m + 1].
+    """
+
+    lengths = np.array([len(x) for x in win_loss_vectors], dtype=np.int64)
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    if len(win_loss_vectors) == 0:
+        return np.zeros(0, dtype=bool), offsets
+
+    win_loss = np.concatenate(
+        [np.asarray(x, dtype=bool) for x in win_loss_vectors])
+
+    return win_loss, offsets
+
+
+def _servers_from_roles(roles_fun: Callable, counts: np.ndarray,
+                        first_server: np.ndarray) -> np.ndarray:
+    # Evaluates roles_fun(count, first_server, first_returner)[0] for each
+    # element, calling it only once for each distinct pair of arguments.
+
+    keys = counts.astype(np.int64) * 2 + first_server
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+
+    servers = np.array(
+        [roles_fun(int(x // 2), int(x % 2), 1 - int(x % 2))[0]
+         for x in unique_keys], dtype=np.int8)
+
+    return servers[inverse]
+
+
+def by_final_set(fun: Callable, scores_p1: np.ndarray,
+                 scores_p2: np.ndarray, is_final_set: np.ndarray) \
+        -> np.ndarray:
+    """
+    Evaluates a format function taking the "is_final_set" flag on arrays of
+    scores. The flag is passed as a scalar, since the functions may branch
+    on it, so the function is called once for the rows in the final set and
+    once for the others.
+
+    Args:
+        fun: A field of FormatFunctions, such as is_tiebreak_fun, taking the
+            scores of both players and the "is_final_set" flag.
+        scores_p1: The scores of the first player.
+        scores_p2: The scores of the second player.
+        is_final_set: Whether each row is in the final set.
+
+    Returns:
+        A boolean array with the result for each row.
+    """
+
+    result = np.zeros(len(scores_p1), dtype=bool)
+
+    for cur_final in [False, True]:
+
+        cur_mask = is_final_set == cur_final
+
+        if cur_mask.any():
+            result[cur_mask] = fun(scores_p1[cur_mask], scores_p2[cur_mask],
+                                   cur_final)
+
+    return result
+
+
+def advance_batch(states: BatchStates, server_won: np.ndarray,
+                  format_functions: FormatFunctions) -> np.ndarray:
+    """
+    Advances a batch of matches played in the same format by one point each,
+    updating the states in place.
+
+    This applies exactly the same rules as advance_compact_state.
+
+    Args:
+        states: The current states, one row per match.
+        server_won: Whether the server won the point, one entry per match.
+        format_functions: The functions encoding the match format.
+
+    Returns:
+        A boolean array which is True for matches which were already over, and
+        which were therefore left unchanged.
+    """
+
+    already_over = states.is_over.copy()
+    rows = np.flatnonzero(~already_over)
+
+    if len(rows) == 0:
+        return already_over
+
+    server = states.server[rows]
+    returner = 1 - server
+    server_won = np.asarray(server_won, dtype=bool)[rows]
+
+    winner = np.where(server_won, server, returner)
+    loser = 1 - winner
+
+    # Advance the game score
+    game_score = states.cur_game_score
+    game_score[rows, winner] += 1
+
+    points_server = game_score[rows, server]
+    points_returner = game_score[rows, returner]
+
+    is_final_set = np.broadcast_to(
+        np.asarray(format_functions.is_final_set(states.set_num[rows]),
+                   dtype=bool), rows.shape)
+    is_tiebreak = states.is_tiebreak[rows]
+
+    game_over = np.zeros(len(rows), dtype=bool)
+    game_over[~is_tiebreak] = format_functions.service_game_over(
+        points_server[~is_tiebreak], points_returner[~is_tiebreak])
+    game_over[is_tiebreak] = by_final_set(
+        format_functions.tiebreak_over, points_server[is_tiebreak],
+        points_returner[is_tiebreak], is_final_set[is_tiebreak])
+
+    # Adjust who's serving in tiebreaks which continue
+    in_tiebreak = rows[is_tiebreak & ~game_over]
+
+    if len(in_tiebreak) > 0:
+
+        start_server = _servers_from_roles(
+            format_functions.roles_at_game_start,
+            states.total_games_played[in_tiebreak],
+            np.zeros(len(in_tiebreak), dtype=np.int8))
+
+        states.server[in_tiebreak] = _servers_from_roles(
+            format_functions.tiebreak_roles,
+            game_score[in_tiebreak].sum(axis=1), start_server)
+
+    if not game_over.any():
+        return already_over
+
+    # Handle the games which were won
+    won_game = rows[game_over]
+    winner, loser = winner[game_over], loser[game_over]
+    is_final_set = is_final_set[game_over]
+
+    set_score = states.cur_set_score
+    set_score[won_game, winner] += 1
+    states.total_games_played[won_game] += 1
+
+    states.server[won_game] = _servers_from_roles(
+        format_functions.roles_at_game_start,
+        states.total_games_played[won_game],
+        np.zeros(len(won_game), dtype=np.int8))
+
+    set_won = by_final_set(
+        format_functions.set_win_condition, set_score[won_game, winner],
+        set_score[won_game, loser], is_final_set)
+
+    if set_won.any():
+
+        won_set = won_game[set_won]
+        set_winner, set_loser = winner[set_won], loser[set_won]
+
+        states.sets_won[won_set, set_winner] += 1
+
+        match_over = np.broadcast_to(np.asarray(
+            format_functions.match_over_fun(
+                states.sets_won[won_set, set_winner],
+                states.sets_won[won_set, set_loser]),
+            dtype=bool), won_set.shape)
+
+        states.is_over[won_set[match_over]] = True
+
+        next_set = won_set[~match_over]
+        states.set_num[next_set] += 1
+        set_score[next_set] = 0
+
+        # A new set may start with a tiebreak, as in a match tiebreak.
+        is_final_set[np.flatnonzero(set_won)[~match_over]] = \
+            format_functions.is_final_set(states.set_num[next_set])
+
+    states.is_tiebreak[won_game] = by_final_set(
+        format_functions.is_tiebreak_fun, set_score[won_game, winner],
+        set_score[won_game, loser], is_final_set)
+
+    game_score[won_game] = 0
+
+    return already_over
+
+
+def parse_batch(win_loss: np.ndarray,
+                offsets: np.ndarray,
+                format_codes: np.ndarray,
+                formats: Optional[List[FormatFunctions]] = None) \
+        -> Tuple[BatchStates, np.ndarray]:
+    """
+    Parses many matches at once.
+
+    Each match starts from the start of a match, with player 0 serving, just
+    like create_start_match_state.
+
+    Args:
+        win_loss: The win/loss vectors of all matches, concatenated [see
+            concatenate_matches].
+        offsets: Array of length n_matches + 1. Match m is made up of points
+            offsets[m] to offsets[m + 1].
+        format_codes: The format of each match, given as its index into
+            formats.
+        formats: The formats referred to by the codes. Defaults to the formats
+            in formats.FORMATS, so that the codes are those returned by
+            formats.format_code.
+
+    Returns:
+        A tuple of the BatchStates after each point, and a boolean array with
+        one entry per match which is True if the match continued after it
+        was over. process_win_loss_vector raises an AssertionError for such
+        matches; here, their state is simply left as it was at the end of the
+        match.
+
+    Example::
+
+        win_loss, offsets = concatenate_matches([match_1, match_2])
+        codes = [fmts.format_code(fmts.standard_best_of_three)] * 2
+
+        states, failed = parse_batch(win_loss, offsets, codes)
+
+        # Score in games after the last point of match_1:
+        states.cur_set_score[offsets[1] - 1]
+    """
+
+    if formats is None:
+        formats = list(fmts.FORMATS.values())
+
+    win_loss = np.asarray(win_loss, dtype=bool)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    format_codes = np.asarray(format_codes, dtype=np.int64)
+
+    n_matches = len(offsets) - 1
+    lengths = np.diff(offsets)
+
+    assert len(format_codes) == n_matches
+
+    # Sort the matches by format and then by decreasing length. That way, at
+    # every point, the matches still being played make up the start of each
+    # format's block.
+    order = np.lexsort((-lengths, format_codes))
+
+    sorted_lengths = lengths[order]
+    sorted_codes = format_codes[order]
+    sorted_starts = offsets[:-1][order]
+
+    blocks = list()
+
+    for cur_code in np.unique(sorted_codes):
+
+        start, end = np.searchsorted(sorted_codes, [cur_code, cur_code + 1])
+        blocks.append((formats[cur_code], start, end,
+                       -sorted_lengths[start:end]))
+
+    states = empty_batch_states(n_matches)
+    failed = np.zeros(n_matches, dtype=bool)
+
+    fields = list(BatchStates.__dataclass_fields__)
+
+    # The states are collected point by point, since copying contiguous
+    # blocks is much faster than scattering them across the result. They are
+    # put in match order at the end.
+    positions = list()
+    point_states = {x: list() for x in fields}
+
+    for cur_point in range(lengths.max() if n_matches > 0 else 0):
+
+        for cur_format, start, end, negative_lengths in blocks:
+
+            n_active = np.searchsorted(negative_lengths, -cur_point)
+
+            if n_active == 0:
+                continue
+
+            active = slice(start, start + n_active)
+            cur_positions = sorted_starts[active] + cur_point
+
+            block_states = BatchStates(**{
+                x: getattr(states, x)[active] for x in fields})
+
+            failed[active] |= advance_batch(
+                block_states, win_loss[cur_positions], cur_format)
+
+            positions.append(cur_positions)
+
+            for cur_field in fields:
+                point_states[cur_field].append(
+                    getattr(block_states, cur_field).copy())
+
+    result = empty_batch_states(len(win_loss))
+
+    if len(positions) > 0:
+
+        positions = np.concatenate(positions)
+
+        for cur_field in fields:
+            getattr(result, cur_field)[positions] = np.concatenate(
+                point_states[cur_field])
+
+    match_failed = np.zeros(n_matches, dtype=bool)
+    match_failed[order] = failed
+
+    return result, match_failed
@@ -0,0 +1,147 @@
+import platform
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Sequence
+from .parse import process_win_loss_vector, iter_compact_states
+from .match_state import CompactMatchState
+from .utils import (create_start_match_state, match_summary_string,
+                    match_summary_strings)
+from .compare_with_sackmann import convert_to_boolean, validate_all
+from .synthetic import make_matches, make_sackmann_frame, to_pbp
+import point_parser.formats as fmts
+
+"""
+This module measures how fast the main parts of the package are, on
+synthetic matches [see synthetic.py], so that runs can be compared with each
+other. The results are plain dictionaries which can be saved as JSON.
+"""
+
+
+def measure(fun: Callable[[Any], Any], items: Sequence[Any],
+            n_points: int) -> Dict[str, float]:
+    """
+    Times calling fun on each of the items.
+
+    The calls are made twice: once to time them, and once with tracemalloc
+    running to find the peak memory use, since tracing slows them down.
+
+    Args:
+        fun: The function to time.
+        items: The arguments to call it with, one call per item.
+        n_points: The total number of points in the items, used to compute
+            the throughput.
+
+    Returns:
+        A dictionary with the number of calls and points, the total time in
+        seconds, the points per second, the mean, median and 95th percentile
+        of the time per call in milliseconds, and the peak memory allocated
+        while making the calls, in bytes.
+    """
+
+    latencies = np.zeros(len(items))
+
+    for cur_item_num, cur_item in enumerate(items):
+
+        start = time.perf_counter()
+        fun(cur_item)
+        latencies[cur_item_num] = time.perf_counter() - start
+
+    tracemalloc.start()
+
+    try:
+        for cur_item in items:
+            fun(cur_item)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = float(latencies.sum())
+
+    return {
+        'calls': len(items),
+        'points': n_points,
+        'seconds': seconds,
+        'points_per_second': n_points / seconds if seconds > 0 else 0.,
+        'latency_mean_ms': float(latencies.mean() * 1000),
+        'latency_median_ms': float(np.median(latencies) * 1000),
+        'latency_p95_ms': float(np.percentile(latencies, 95) * 1000),
+        'peak_memory_bytes': peak_memory
+    }
+
+
+def run_benchmarks(n_per_format: int = 20, seed: int = 0,
+                   final_set_games: int = 40,
+                   n_validation_matches: int = 200) -> Dict[str, Any]:
+    """
+    Runs all the benchmarks.
+
+    Args:
+        n_per_format: The number of random matches per format [see
+            synthetic.make_matches].
+        seed: The random seed.
+        final_set_games: The length of the long final sets [see
+            synthetic.long_final_set_win_loss].
+        n_validation_matches: The number of matches to validate [see
+            synthetic.make_sackmann_frame].
+
+    Returns:
+        A dictionary with the settings and environment, and a "results"
+        entry with the measurements for each benchmark [see measure].
+    """
+
+    matches = [(fmts.FORMATS[x], y) for x, y in
+               make_matches(n_per_format, seed, final_set_games)]
+    n_points = sum(len(x[1]) for x in matches)
+
+    results = dict()
+
+    results['process_win_loss_vector'] = measure(
+        lambda x: process_win_loss_vector(
+            x[1], create_start_match_state('p1', 'p2'), x[0]),
+        matches, n_points)
+
+    pbps = [to_pbp(y, x) for x, y in matches]
+
+    results['convert_to_boolean'] = measure(convert_to_boolean, pbps,
+                                            n_points)
+
+    states = [cur_state for cur_format, cur_win_loss in matches
+              for cur_state in process_win_loss_vector(
+                  cur_win_loss, create_start_match_state('p1', 'p2'),
+                  cur_format)]
+
+    results['match_summary_string'] = measure(match_summary_string, states,
+                                              len(states))
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+    compact_matches = [list(iter_compact_states(y, start_state, x))
+                       for x, y in matches]
+
+    results['match_summary_strings'] = measure(match_summary_strings,
+                                               compact_matches, n_points)
+
+    sackmann_df = make_sackmann_frame(n_validation_matches, seed)
+    n_validation_points = int(sackmann_df['pbp'].map(
+        lambda x: len(convert_to_boolean(x))).sum())
+
+    results['validate_all'] = measure(validate_all, [sackmann_df],
+                                      n_validation_points)
+
+    return {
+        'settings': {
+            'n_per_format': n_per_format,
+            'seed': seed,
+            'final_set_games': final_set_games,
+            'n_validation_matches': n_validation_matches
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine()
+        },
+        'results': results
+    }
@@ -0,0 +1,115 @@
+from bisect import bisect_right
+from typing import Iterable, Optional
+from .match_state import MatchState, CompactMatchState
+from .format_functions import FormatFunctions
+from .manipulate_match_state import advance_compact_state
+from .parse import iter_compact_states
+from .transition_cache import TransitionCache
+
+
+class CheckpointIndex:
+    """
+    Gives the state of a match after any point, without keeping every state.
+
+    The match is parsed once, and the state at the start of each game is kept
+    as a checkpoint. The state after point k is then found by going back to
+    the start of its game and replaying the points up to k, so that at most
+    one game is ever replayed.
+
+    Example::
+
+        index = CheckpointIndex(win_loss, start_state,
+                                fmts.classic_slam_format_men)
+
+        # The same as process_win_loss_vector(...)[100]:
+        state = index[100]
+    """
+
+    def __init__(self, win_loss_vector: Iterable[bool],
+                 match_state: MatchState,
+                 format_functions: FormatFunctions,
+                 transition_cache: Optional[TransitionCache] = None):
+        """
+        Args:
+            win_loss_vector: True and False indicating whether the server won
+                or lost each point.
+            match_state: The state of the match before the first point. Can
+                be a MatchState or a CompactMatchState.
+            format_functions: The functions encoding the rules of the match.
+            transition_cache: Optionally, a TransitionCache to speed up
+                parsing and replaying.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        self.format_functions = format_functions
+
+        self._advance = (advance_compact_state if transition_cache is None
+                         else transition_cache.advance)
+
+        # One byte per point.
+        self._win_loss = bytes(bool(x) for x in win_loss_vector)
+
+        # The checkpoints: the state before point self._points[i] is
+        # self._states[i].
+        self._points = [0]
+        self._states = [match_state]
+
+        for cur_point, cur_state in enumerate(iter_compact_states(
+                self._win_loss, match_state, format_functions,
+                transition_cache=transition_cache)):
+
+            if (cur_state.total_games_played !=
+                    self._states[-1].total_games_played):
+                self._points.append(cur_point + 1)
+                self._states.append(cur_state)
+
+        # A checkpoint after the last point is never needed.
+        if self._points[-1] == len(self._win_loss):
+            del self._points[-1], self._states[-1]
+
+    def __len__(self) -> int:
+
+        return len(self._win_loss)
+
+    @property
+    def n_checkpoints(self) -> int:
+
+        return len(self._points)
+
+    def state_at(self, point: int) -> CompactMatchState:
+        """
+        Returns the state after a point.
+
+        Args:
+            point: The index of the point in the win/loss vector. As with
+                lists, negative indices count from the end.
+
+        Returns:
+            The CompactMatchState after the point.
+        """
+
+        if point < 0:
+            point += len(self)
+
+        if not 0 <= point < len(self):
+            raise IndexError('Point out of range.')
+
+        checkpoint = bisect_right(self._points, point) - 1
+        state = self._states[checkpoint]
+
+        for cur_win_loss in self._win_loss[self._points[checkpoint]:
+                                           point + 1]:
+            state = self._advance(cur_win_loss == 1, state,
+                                  self.format_functions)
+
+        return state
+
+    def __getitem__(self, point: int) -> MatchState:
+        """
+        Returns the state after a point as a MatchState, as if indexing the
+        list returned by process_win_loss_vector.
+        """
+
+        return self.state_at(point).to_match_state()
@@ -0,0 +1,282 @@
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+from .parse import iter_compact_states, final_compact_state
+from .transition_cache import TransitionCache
+from .match_state import CompactMatchState
+from .utils import ScoreRenderer, create_start_match_state
+from .compare_with_sackmann import (SLAM_FORMATS, clean_tny_name,
+                                    compact_state_matches_score,
+                                    convert_to_boolean)
+import point_parser.formats as fmts
+
+"""
+The tennis-point-parser command, which parses matches read from JSONL or CSV
+files, or from stdin, and writes one JSON line per match to stdout.
+
+Each match record has Jeff's "pbp" string and, optionally, the players
+("server1" and "server2"), the "tny_name" used to find the format, and the
+"score" to check the parsed score against. Other fields, such as ids, are
+passed through. Records are read and written in batches, so that memory use
+does not grow with the input, and the output is in the same order as the
+input, regardless of the number of workers. For example:
+
+    tennis-point-parser --final-only pbp_matches_atp_main_current.csv
+
+Only the parser is imported, not pandas or tqdm, so that the command starts
+quickly.
+"""
+
+# The number of records given to each worker at a time.
+_BATCH_SIZE = 256
+
+# Each worker process keeps its own cache.
+_transition_cache = None
+
+
+def _format_name(record: Dict[str, Any], format_name: Optional[str]) -> str:
+    # The name of the format in formats.FORMATS of a record.
+
+    if format_name is not None:
+        return format_name
+
+    tny_name = record.get('tny_name')
+    format_functions = fmts.standard_best_of_three
+
+    if tny_name:
+        format_functions = SLAM_FORMATS.get(clean_tny_name(tny_name),
+                                            format_functions)
+
+    return next(x for x, y in fmts.FORMATS.items() if y is format_functions)
+
+
+def parse_record(record: Dict[str, Any], format_name: Optional[str] = None,
+                 final_only: bool = False) -> Dict[str, Any]:
+    """
+    Parses one match record.
+
+    Args:
+        record: The record, with at least a "pbp" field [see the module
+            docstring].
+        format_name: The name of the format in formats.FORMATS. By default,
+            it is found from the record's "tny_name", as in validate_match.
+        final_only: If True, only the final score is given, not the score
+            after each point.
+
+    Returns:
+        The record without its "pbp", with the "format" used, the
+        "n_points", the "final_score", whether the match "is_over", the
+        "scores" after each point unless final_only, and, if the record has
+        a score, whether it "matches_score". If the match cannot be parsed,
+        there is an "error" instead, which starts with the reason, as in
+        triage: "invalid_pbp" if the pbp string cannot be decoded, or
+        "points_after_end" if the match is over before its last point.
+        Unlike in validate_match, strings in which only one player wins
+        points, such as "SSSS", are accepted, since they can be the start
+        of a match.
+    """
+
+    global _transition_cache
+
+    if _transition_cache is None:
+        _transition_cache = TransitionCache()
+
+    result = {x: y for x, y in record.items() if x != 'pbp'}
+    result['format'] = _format_name(record, format_name)
+
+    format_functions = fmts.FORMATS[result['format']]
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state(record.get('server1', 'p1'),
+                                 record.get('server2', 'p2')))
+
+    pbp = record.get('pbp')
+
+    if not isinstance(pbp, str):
+        result['error'] = 'invalid_pbp: The record has no "pbp" string.'
+        return result
+
+    try:
+        win_loss = convert_to_boolean(pbp, require_both=False)
+    except AssertionError as error:
+        result['error'] = f'invalid_pbp: {error}'
+        return result
+
+    try:
+        if final_only:
+            final_state = final_compact_state(
+                win_loss, start_state, format_functions,
+                transition_cache=_transition_cache)
+        else:
+            renderer = ScoreRenderer(score_only=True)
+            scores = list()
+
+            for final_state in iter_compact_states(
+                    win_loss, start_state, format_functions,
+                    transition_cache=_transition_cache):
+                scores.append(renderer.render(final_state))
+
+    except AssertionError:
+        result['error'] = ('points_after_end: The match is over before the '
+                           'last point.')
+        return result
+
+    result['n_points'] = len(win_loss)
+    result['final_score'] = ScoreRenderer(score_only=True).render(
+        final_state)
+    result['is_over'] = final_state.is_over
+
+    if not final_only:
+        result['scores'] = scores
+
+    if record.get('score'):
+        result['matches_score'] = compact_state_matches_score(
+            final_state, record['score'])
+
+    return result
+
+
+def _parse_records(records: List[Dict[str, Any]], format_name: Optional[str],
+                   final_only: bool) -> List[Dict[str, Any]]:
+
+    return [parse_record(x, format_name, final_only) for x in records]
+
+
+def read_records(input_file: TextIO, input_format: str) \
+        -> Iterator[Dict[str, Any]]:
+    """
+    Reads match records one at a time.
+
+    Args:
+        input_file: The file to read from.
+        input_format: "jsonl", with one JSON object per line, or "csv", with
+            a header, as in Jeff's files.
+
+    Yields:
+        Each record, as a dictionary.
+    """
+
+    if input_format == 'csv':
+        yield from csv.DictReader(input_file)
+        return
+
+    for cur_line in input_file:
+        if cur_line.strip():
+            yield json.loads(cur_line)
+
+
+def parse_records(records: Iterable[Dict[str, Any]],
+                  format_name: Optional[str] = None,
+                  final_only: bool = False,
+                  workers: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Parses match records [see parse_record], keeping a bounded number of them
+    in memory.
+
+    Args:
+        records: The records.
+        format_name: Passed on to parse_record.
+        final_only: Passed on to parse_record.
+        workers: The number of processes to use.
+
+    Yields:
+        The result for each record, in order.
+    """
+
+    records = iter(records)
+
+    if workers <= 1:
+        for cur_record in records:
+            yield parse_record(cur_record, format_name, final_only)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        while True:
+
+            # Enough batches to keep every worker busy, but no more.
+            batches = [list(islice(records, _BATCH_SIZE))
+                       for _ in range(workers * 2)]
+            batches = [x for x in batches if x]
+
+            if not batches:
+                return
+
+            for cur_results in executor.map(
+                    _parse_records, batches, [format_name] * len(batches),
+                    [final_only] * len(batches)):
+                yield from cur_results
+
+
+def _input_format(path: str, input_format: Optional[str]) -> str:
+
+    if input_format is not None:
+        return input_format
+
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the tennis-point-parser command [see the module docstring].
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        The exit status: 0, or 1 if some matches could not be parsed.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog='tennis-point-parser',
+        description='Parses tennis matches from Jeff Sackmann\'s pbp '
+        'strings, writing one JSON line per match.')
+    parser.add_argument('input_files', nargs='*', default=['-'],
+                        help='JSONL or CSV files. Defaults to stdin ("-").')
+    parser.add_argument('--input-format', choices=['jsonl', 'csv'],
+                        help='The format of the input. By default, CSV for '
+                        'files ending in .csv and JSONL otherwise.')
+    parser.add_argument('--format', choices=list(fmts.FORMATS),
+                        help='The format of all the matches. By default, it '
+                        'is found from the tournament name.')
+    parser.add_argument('--final-only', action='store_true',
+                        help='Only give the final score of each match.')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='The number of processes to use.')
+
+    args = parser.parse_args(argv)
+
+    def iter_all_records() -> Iterator[Dict[str, Any]]:
+
+        for cur_path in args.input_files:
+
+            input_format = _input_format(cur_path, args.input_format)
+
+            if cur_path == '-':
+                yield from read_records(sys.stdin, input_format)
+                continue
+
+            with open(cur_path, newline='') as input_file:
+                yield from read_records(input_file, input_format)
+
+    n_errors = 0
+
+    for cur_result in parse_records(iter_all_records(), args.format,
+                                    args.final_only, args.workers):
+
+        n_errors += 'error' in cur_result
+        sys.stdout.write(json.dumps(cur_result) + '\n')
+
+    if n_errors > 0:
+        print(f'{n_errors} matches could not be parsed.', file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Sequence, Tuple
+from .batch import (BatchStates, concatenate_matches, empty_batch_states,
+                    parse_batch)
+from .format_functions import FormatFunctions
+from .match_state import CompactMatchState
+from .manipulate_match_state import advance_compact_state
+from .utils import create_start_match_state
+from .compare_with_sackmann import decode_pbp, get_format_codes
+
+"""
+This module parses matches straight into typed columns, one row per point,
+rather than into lists of MatchStates. This is much more compact, and the
+result can be used directly as a DataFrame.
+
+As elsewhere, "p1" is the first server of the match and "p2" the first
+returner, and each row holds the state after the point.
+"""
+
+
+def batch_states_to_columns(states: BatchStates,
+                            server_won: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Splits BatchStates into one column per player and field.
+
+    Args:
+        states: The states after each point.
+        server_won: Whether the server won each point.
+
+    Returns:
+        A dictionary of NumPy arrays, one entry per point.
+    """
+
+    return {
+        'server_won': np.asarray(server_won, dtype=bool),
+        'server': states.server,
+        'is_tiebreak': states.is_tiebreak,
+        'set_num': states.set_num,
+        'total_games_played': states.total_games_played,
+        'games_p1': states.cur_set_score[:, 0],
+        'games_p2': states.cur_set_score[:, 1],
+        'points_p1': states.cur_game_score[:, 0],
+        'points_p2': states.cur_game_score[:, 1],
+        'sets_won_p1': states.sets_won[:, 0],
+        'sets_won_p2': states.sets_won[:, 1],
+        'is_over': states.is_over
+    }
+
+
+def match_to_columns(win_loss_vector: Sequence[bool],
+                     format_functions: FormatFunctions) \
+        -> Dict[str, np.ndarray]:
+    """
+    Parses a single match into columns.
+
+    Args:
+        win_loss_vector: A list of True and False indicating whether the server
+            won or lost the point.
+        format_functions: The functions encoding the rules of the match.
+
+    Returns:
+        A dictionary of NumPy arrays with one entry per point [see
+        batch_states_to_columns].
+    """
+
+    states = empty_batch_states(len(win_loss_vector))
+
+    # The names play no role here, so any will do.
+    match_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    for cur_point, cur_win_loss in enumerate(win_loss_vector):
+
+        # The match better not be over if there are points left!
+        assert not match_state.is_over
+
+        match_state = advance_compact_state(cur_win_loss, match_state,
+                                            format_functions)
+
+        states.server[cur_point] = match_state.server
+        states.is_tiebreak[cur_point] = match_state.is_tiebreak
+        states.set_num[cur_point] = match_state.set_num
+        states.total_games_played[cur_point] = match_state.total_games_played
+        states.cur_set_score[cur_point] = match_state.cur_set_score
+        states.cur_game_score[cur_point] = match_state.cur_game_score
+        states.sets_won[cur_point] = match_state.sets_won
+        states.is_over[cur_point] = match_state.is_over
+
+    return batch_states_to_columns(states, win_loss_vector)
+
+
+def match_to_frame(win_loss_vector: Sequence[bool],
+                   first_server: str,
+                   first_returner: str,
+                   format_functions: FormatFunctions) -> pd.DataFrame:
+    """
+    Parses a single match into a DataFrame with one row per point.
+
+    Args:
+        win_loss_vector: A list of True and False indicating whether the server
+            won or lost the point.
+        first_server: The first server in the match.
+        first_returner: The first returner in the match.
+        format_functions: The functions encoding the rules of the match.
+
+    Returns:
+        A DataFrame with the columns of match_to_columns, as well as the
+        players as categorical columns "player_1" and "player_2".
+    """
+
+    columns = match_to_columns(win_loss_vector, format_functions)
+    n_points = len(win_loss_vector)
+
+    players = pd.CategoricalDtype([first_server, first_returner])
+
+    frame = pd.DataFrame(columns)
+    frame.insert(0, 'player_2', pd.Categorical.from_codes(
+        np.ones(n_points, dtype=np.int8), dtype=players))
+    frame.insert(0, 'player_1', pd.Categorical.from_codes(
+        np.zeros(n_points, dtype=np.int8), dtype=players))
+
+    return frame
+
+
+def sackmann_to_frame(sackmann_df: pd.DataFrame) \
+        -> Tuple[pd.DataFrame, pd.Index]:
+    """
+    Parses all the matches in Jeff's data into a single DataFrame, with one
+    row per point.
+
+    Args:
+        sackmann_df: The data, as loaded by load_sackmann_data.
+
+    Returns:
+        A tuple. The first element is the DataFrame of points. In addition to
+        the columns of match_to_columns, it has a "match" column with the
+        index of the match in sackmann_df, a "point" column numbering the
+        points within each match, and the categorical columns "player_1" and
+        "player_2". The second element contains the index of the matches
+        which could not be parsed [see validate_all], which are left out.
+    """
+
+    n_matches = len(sackmann_df)
+    vectors = list()
+    parsed = np.ones(n_matches, dtype=bool)
+
+    for cur_match, cur_pbp in enumerate(sackmann_df['pbp']):
+
+        try:
+            vectors.append(decode_pbp(cur_pbp).server_won)
+        except AssertionError:
+            vectors.append(np.zeros(0, dtype=bool))
+            parsed[cur_match] = False
+
+    win_loss, offsets = concatenate_matches(vectors)
+    lengths = np.diff(offsets)
+    del vectors
+
+    states, failed = parse_batch(
+        win_loss, offsets, get_format_codes(sackmann_df['tny_name']))
+
+    parsed &= ~failed
+
+    columns = batch_states_to_columns(states, win_loss)
+
+    players = pd.CategoricalDtype(pd.unique(np.concatenate([
+        sackmann_df['server1'].to_numpy(), sackmann_df['server2'].to_numpy()
+    ])))
+
+    player_1 = pd.Categorical(sackmann_df['server1'], dtype=players).codes
+    player_2 = pd.Categorical(sackmann_df['server2'], dtype=players).codes
+
+    match_nums = np.repeat(np.arange(n_matches), lengths)
+    point_nums = (np.arange(offsets[-1]) -
+                  np.repeat(offsets[:-1], lengths)).astype(np.int16)
+
+    frame = pd.DataFrame({
+        'match': sackmann_df.index.to_numpy()[match_nums],
+        'point': point_nums,
+        'player_1': pd.Categorical.from_codes(player_1[match_nums],
+                                              dtype=players),
+        'player_2': pd.Categorical.from_codes(player_2[match_nums],
+                                              dtype=players),
+        **columns
+    })
+
+    frame = frame[parsed[match_nums]].reset_index(drop=True)
+
+    return frame, sackmann_df.index[~parsed]
@@ -1,12 +1,23 @@
-import pandas as pd
-from tqdm import tqdm
-from typing import List, Dict, Any
-from .parse import process_win_loss_vector
+import re
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from typing import (List, Dict, Any, Iterable, Iterator, NamedTuple,
+                    Optional, Tuple, Union, TYPE_CHECKING)
+from .parse import iter_compact_states, final_compact_state
+from .transition_cache import TransitionCache
+from .parse_cache import ParseCache
+from .profiling import instrument, stage
 from .utils import match_summary_string, create_start_match_state
-from .match_state import MatchState
+from .match_state import MatchState, CompactMatchState
 from .format_functions import FormatFunctions
 import point_parser.formats as fmts
 
+# pandas and tqdm are only imported by the functions working on Jeff's data as
+# a whole, so that parsing single matches does not need them.
+if TYPE_CHECKING:
+    import pandas as pd
+
 SLAM_FORMATS = {
     "GentlemensWimbledonSingles": fmts.classic_slam_format_men,
     "MensFrenchOpen": fmts.classic_slam_format_men,
@@ -19,26 +30,173 @@ SLAM_FORMATS = {
 }
 
 
-def convert_to_boolean(score_str: str) -> List[bool]:
+# Codes for the characters in Jeff's pbp strings: points won by the server
+# ("S", or "A" for an ace) are 1, points won by the returner ("R", or "D" for
+# a double fault) are 0. The delimiters are ";" for the end of a game, "."
+# for the end of a set and "/" for a change of server in a tiebreak.
+_PBP_CODES = bytes.maketrans(b'SARD;./', b'\x01\x01\x00\x00\x02\x03\x04')
+_GAME_END, _SET_END, _TIEBREAK_SERVE_CHANGE = 2, 3, 4
+_DELIMITER_CODES = bytes([_GAME_END, _SET_END, _TIEBREAK_SERVE_CHANGE])
+
+
+class DecodedPbp(NamedTuple):
+    """
+    A pbp string from Jeff's data, decoded [see decode_pbp].
+
+    The delimiters are given as the index of the point just before them.
+    Note that the last game and set of a match are not followed by one.
+    """
+
+    # Whether the server won each point.
+    server_won: np.ndarray
+
+    # Points which end a game (including those which end a set).
+    game_ends: np.ndarray
+
+    # Points which end a set.
+    set_ends: np.ndarray
+
+    # Points in tiebreaks after which the server changes.
+    tiebreak_serve_changes: np.ndarray
+
+
+def _encode_pbp(score_str: str, require_both: bool = True) \
+        -> Tuple[bytes, bytes]:
+    # Returns the codes of all characters, and the codes of the points only.
+
+    codes = score_str.encode('ascii', 'replace').translate(_PBP_CODES)
+    points = codes.translate(None, _DELIMITER_CODES)
+
+    # Only points should be left, and the server and returner should both
+    # have won some (or, if not require_both, there should be some).
+    assert len(points.translate(None, b'\x00\x01')) == 0, \
+        'The pbp string has characters other than "SARD;./".'
+
+    if require_both:
+        assert b'\x00' in points and b'\x01' in points, \
+            'The server and the returner have not both won a point.'
+    else:
+        assert len(points) > 0, 'The pbp string has no points.'
+
+    return codes, points
+
+
+def decode_pbp(score_str: str) -> DecodedPbp:
+    """
+    Decodes the pbp string in Jeff Sackmann's dataset, keeping track of where
+    games and sets end.
+
+    Args:
+        score_str: The pbp string.
+
+    Returns:
+        The decoded string.
+    """
+
+    codes, points = _encode_pbp(score_str)
+
+    codes = np.frombuffer(codes, dtype=np.uint8)
+    delimiters = np.flatnonzero(codes >= _GAME_END)
+    kinds = codes[delimiters]
+
+    # Each delimiter shifts the ones after it by one position.
+    last_points = delimiters - np.arange(1, len(delimiters) + 1)
+
+    return DecodedPbp(
+        server_won=np.frombuffer(points, dtype=bool),
+        game_ends=last_points[kinds != _TIEBREAK_SERVE_CHANGE],
+        set_ends=last_points[kinds == _SET_END],
+        tiebreak_serve_changes=last_points[kinds == _TIEBREAK_SERVE_CHANGE]
+    )
+
+
+def convert_to_boolean(score_str: str,
+                       require_both: bool = True) -> List[bool]:
     """
     Converts the pbp string in Jeff Sackmann's dataset to a sequence of
     "True" and "False" for input into the parser.
+
+    Args:
+        score_str: The pbp string.
+        require_both: If True, strings in which only one of the server and
+            the returner wins points, such as "SSSS", are rejected, as they
+            are never whole matches. If False, they are accepted, e.g. for
+            matches in progress.
+
+    Returns:
+        Whether the server won each point. An AssertionError is raised if
+        the string cannot be decoded.
     """
 
-    flat_string = score_str.replace(';', '')
-    flat_string = flat_string.replace('.', '')
-    flat_string = flat_string.replace('A', 'S')
-    flat_string = flat_string.replace('D', 'R')
-    flat_string = flat_string.replace('/', '')
-    assert(len(set(flat_string)) == 2)
+    _, points = _encode_pbp(score_str, require_both)
 
-    server_won = [x == 'S' for x in flat_string]
+    server_won = np.frombuffer(points, dtype=bool).tolist()
 
     return server_won
 
 
+def get_format_codes(tny_names: 'pd.Series') -> np.ndarray:
+    """
+    Finds the format code [see formats.format_code] of each match from its
+    tournament name.
+
+    Args:
+        tny_names: The tournament names, as in the "tny_name" column of Jeff's
+            data.
+
+    Returns:
+        An array with the format code of each match.
+    """
+
+    default_code = fmts.format_code(fmts.standard_best_of_three)
+
+    # Only look up each tournament once.
+    names, inverse = np.unique(tny_names.to_numpy(dtype=str),
+                               return_inverse=True)
+
+    codes = np.array([fmts.format_code(SLAM_FORMATS[x])
+                      if x in SLAM_FORMATS else default_code
+                      for x in names], dtype=np.int8)
+
+    return codes[inverse.reshape(-1)]
+
+
+# Events which are not played in one of the usual formats.
+UNUSUAL_EVENTS = ['DavisCup', 'Hopman', 'WildcardPlayoff', 'WildCardPlayoff',
+                  'FedCup']
+
+# The columns read by iter_sackmann_data by default, with their types.
+SACKMANN_COLUMNS = {
+    'pbp_id': 'int64',
+    'date': str,
+    'tny_name': str,
+    'server1': str,
+    'server2': str,
+    'pbp': str,
+    'score': str
+}
+
+
+def clean_tny_name(tny_name: str) -> str:
+    """
+    Normalises a tournament name in Jeff's data, so that, for example,
+    "MensFrenchOpen2013.html" becomes "MensFrenchOpen". Missing names, such
+    as NaN, are returned unchanged.
+    """
+
+    if not isinstance(tny_name, str):
+        return tny_name
+
+    tny_name = tny_name.replace('.html', '')
+    tny_name = re.sub(r'\.$', '', tny_name)
+    tny_name = tny_name.replace("'", '')
+    tny_name = tny_name.replace("2013", '')
+
+    return tny_name
+
+
 def load_sackmann_data(sackmann_csv_file: str,
-                       discard_unusual_events: bool = True) -> pd.DataFrame:
+                       discard_unusual_events: bool = True) -> 'pd.DataFrame':
     """
     Loads Jeff's data into a DataFrame.
 
@@ -51,27 +209,118 @@ def load_sackmann_data(sackmann_csv_file: str,
         A DataFrame with the contents of the CSV.
     """
 
-    data = pd.read_csv(sackmann_csv_file)
+    import pandas as pd
+
+    with stage('load_csv'):
+        data = pd.read_csv(sackmann_csv_file)
     data = data.reset_index()
 
-    data['tny_name'] = data['tny_name'].str.replace('.html', '')
-    data['tny_name'] = data['tny_name'].str.replace(r'\.$', '')
-    data['tny_name'] = data['tny_name'].str.replace("'", '')
-    data['tny_name'] = data['tny_name'].str.replace("2013", '')
+    data['tny_name'] = data['tny_name'].map(clean_tny_name)
 
     data['date'] = pd.to_datetime(data['date'])
 
     if discard_unusual_events:
-        data = data[~data.tny_name.str.contains(
-            'DavisCup|Hopman|WildcardPlayoff|WildCardPlayoff|FedCup')]
+        data = data[~data.tny_name.str.contains('|'.join(UNUSUAL_EVENTS),
+                                                na=False)]
 
     return data
 
 
+def iter_sackmann_data(sackmann_csv_file: str,
+                       chunk_size: int = 10000,
+                       discard_unusual_events: bool = True,
+                       columns: Optional[Dict[str, Any]] = None) \
+        -> Iterator['pd.DataFrame']:
+    """
+    Loads Jeff's data in chunks, so that files of any size can be processed
+    with bounded memory.
+
+    Compared to load_sackmann_data, only the columns needed are read, and the
+    work on tournament names is done once per distinct name rather than once
+    per row. Each chunk also gets a categorical "format" column with the name
+    of the match format [see formats.FORMATS].
+
+    Args:
+        sackmann_csv_file: Path to the csv with Jeff's data.
+        chunk_size: The number of rows to read at a time. Chunks can be
+            smaller than this once unusual events are discarded.
+        discard_unusual_events: If True, discards Davis Cup, Hopman Cup,
+            Fed Cup, Wildcard Playoffs [recommended].
+        columns: The columns to read, with their types. Defaults to
+            SACKMANN_COLUMNS. Must contain "tny_name".
+
+    Yields:
+        DataFrames, each with up to chunk_size matches. The index is the row
+        number in the file.
+    """
+
+    import pandas as pd
+
+    if columns is None:
+        columns = SACKMANN_COLUMNS
+
+    format_dtype = pd.CategoricalDtype(list(fmts.FORMATS))
+    unusual_events = re.compile('|'.join(UNUSUAL_EVENTS))
+
+    # Maps each raw tournament name seen so far to its cleaned name, its
+    # format code, and whether to keep it.
+    tournaments = dict()
+
+    chunks = pd.read_csv(sackmann_csv_file, usecols=list(columns),
+                         dtype=columns, chunksize=chunk_size)
+
+    while True:
+
+        with stage('load_csv'):
+            cur_chunk = next(chunks, None)
+
+        if cur_chunk is None:
+            break
+
+        codes, raw_names = pd.factorize(cur_chunk['tny_name'])
+
+        for cur_name in raw_names:
+
+            if cur_name in tournaments:
+                continue
+
+            clean_name = clean_tny_name(cur_name)
+
+            tournaments[cur_name] = (
+                clean_name,
+                fmts.format_code(SLAM_FORMATS.get(
+                    clean_name, fmts.standard_best_of_three)),
+                not (discard_unusual_events and
+                     unusual_events.search(clean_name) is not None))
+
+        # The code of missing names is -1, so the last entry is used for them.
+        names = [tournaments[x] for x in raw_names] + [
+            (None, fmts.format_code(fmts.standard_best_of_three), True)]
+
+        keep = np.array([x[2] for x in names])[codes]
+        codes = codes[keep]
+
+        cur_chunk = cur_chunk[keep].copy()
+
+        cur_chunk['tny_name'] = np.array([x[0] for x in names],
+                                         dtype=object)[codes]
+        cur_chunk['format'] = pd.Categorical.from_codes(
+            np.array([x[1] for x in names], dtype=np.int8)[codes],
+            dtype=format_dtype)
+
+        if 'date' in cur_chunk:
+            cur_chunk['date'] = pd.to_datetime(cur_chunk['date'])
+
+        if len(cur_chunk) > 0:
+            yield cur_chunk
+
+
 def process_match(first_server: str,
                   first_returner: str,
                   sackmann_str: str,
-                  format_functions: FormatFunctions) \
+                  format_functions: FormatFunctions,
+                  transition_cache: Optional[TransitionCache] = None,
+                  parse_cache: Optional[ParseCache] = None) \
         -> List[MatchState]:
     """
     Parses one match from Jeff's data.
@@ -81,20 +330,80 @@ def process_match(first_server: str,
         first_returner: The first returner in the match.
         sackmann_str: The coded string from Jeff's data.
         format_functions: The format of the match.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+        parse_cache: Optionally, a ParseCache to look the result up in, or to
+            store it in after parsing.
 
     Returns:
         A list of MatchStates, one for each point of the match.
     """
 
-    win_loss = convert_to_boolean(sackmann_str)
+    def compute():
+        return list(_iter_compact_match(first_server, first_returner,
+                                        sackmann_str, format_functions,
+                                        transition_cache))
 
-    start_state = create_start_match_state(first_server, first_returner)
+    with stage('parse'):
+        if parse_cache is None:
+            compact_states = compute()
+        else:
+            compact_states = parse_cache.get_or_compute(parse_cache.match_key(
+                'states', first_server, first_returner, sackmann_str,
+                format_functions), compute)
 
-    result = process_win_loss_vector(win_loss, start_state, format_functions)
+    with stage('copy_states'):
+        result = [x.to_match_state() for x in compact_states]
 
     return result
 
 
+def _to_boolean(sackmann_str: Union[str, List[bool]]) -> List[bool]:
+    # The win/loss vector of a match given as a pbp string, or as the vector
+    # itself if it is already decoded (e.g. from a corpus).
+
+    if not isinstance(sackmann_str, str):
+        return sackmann_str
+
+    with stage('convert_to_boolean'):
+        return convert_to_boolean(sackmann_str)
+
+
+def _iter_compact_match(first_server: str, first_returner: str,
+                        sackmann_str: Union[str, List[bool]],
+                        format_functions: FormatFunctions,
+                        transition_cache: Optional[TransitionCache]):
+
+    win_loss = _to_boolean(sackmann_str)
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state(first_server, first_returner))
+
+    return iter_compact_states(win_loss, start_state,
+                               instrument(format_functions),
+                               transition_cache=transition_cache)
+
+
+def _final_compact_state(first_server: str, first_returner: str,
+                         sackmann_str: Union[str, List[bool]],
+                         format_functions: FormatFunctions,
+                         transition_cache: Optional[TransitionCache]) \
+        -> CompactMatchState:
+
+    win_loss = _to_boolean(sackmann_str)
+
+    # Like process_match(...)[-1], fail if there are no points.
+    if len(win_loss) == 0:
+        raise IndexError('The match has no points.')
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state(first_server, first_returner))
+
+    with stage('parse'):
+        return final_compact_state(win_loss, start_state,
+                                   instrument(format_functions),
+                                   transition_cache=transition_cache)
+
+
 def validate_against_sackmann_score(final_match_state: MatchState,
                                     sackmann_score: str) -> bool:
     """
@@ -108,57 +417,384 @@ def validate_against_sackmann_score(final_match_state: MatchState,
         True if scores match, False if not.
     """
 
-    matches_sack = (
-        match_summary_string(final_match_state, score_only=True) ==
-        sackmann_score)
+    with stage('match_summary_string'):
+        summary = match_summary_string(final_match_state, score_only=True)
+
+    matches_sack = summary == sackmann_score
 
     return matches_sack
 
 
-def validate_all(sackmann_df: pd.DataFrame) -> List[Dict[str, Any]]:
+# A set in Jeff's scores, e.g. "7-6(5)". Numbers are written without leading
+# zeros, as match_summary_string does.
+_SET_SCORE = re.compile(r'(0|[1-9][0-9]*)-(0|[1-9][0-9]*)'
+                        r'(?:\((0|[1-9][0-9]*)\))?')
+
+
+@lru_cache(maxsize=2 ** 16)
+def parse_sackmann_score(sackmann_score: str) \
+        -> Optional[Tuple[Tuple[int, int, Optional[int]], ...]]:
+    """
+    Parses a score in Jeff's dataset, such as "6-4 3-6 7-6(5)".
+
+    Args:
+        sackmann_score: The string score in Jeff's dataset.
+
+    Returns:
+        One tuple per set, with the games of the match winner and loser and
+        the loser's points in the tiebreak (None if there was none), or None
+        if the score is not made up of sets only (e.g. "6-4 2-1 RET").
+    """
+
+    if not isinstance(sackmann_score, str):
+        return None
+
+    sets = list()
+
+    for cur_set in sackmann_score.split(' '):
+
+        set_match = _SET_SCORE.fullmatch(cur_set)
+
+        if set_match is None:
+            return None
+
+        games_winner, games_loser, tiebreak = set_match.groups()
+
+        sets.append((int(games_winner), int(games_loser),
+                     None if tiebreak is None else int(tiebreak)))
+
+    return tuple(sets)
+
+
+def compact_state_matches_score(final_state: CompactMatchState,
+                                sackmann_score: str) -> bool:
+    """
+    Compares the parsed score against the one in Jeff's dataset, like
+    validate_against_sackmann_score, but without formatting the parsed score
+    as a string: the games and tiebreak points of each set are compared
+    with those in the parsed Sackmann score [see parse_sackmann_score].
+
+    Args:
+        final_state: The final parsed state.
+        sackmann_score: The string score in Jeff's dataset.
+
+    Returns:
+        True if scores match, False if not.
+    """
+
+    players = final_state.players
+
+    # Jeff's scores only ever describe finished matches, but compare the
+    # strings otherwise, so that the result is always the same as that of
+    # validate_against_sackmann_score.
+    if not final_state.is_over or players[0] == players[1]:
+        return validate_against_sackmann_score(final_state.to_match_state(),
+                                               sackmann_score)
+
+    with stage('compare_score'):
+
+        sets = parse_sackmann_score(sackmann_score)
+
+        if sets is None or len(sets) != len(final_state.past_sets):
+            return False
+
+        winner = int(final_state.sets_won[1] > final_state.sets_won[0])
+        loser = 1 - winner
+
+        for (cur_scores, cur_tiebreak), cur_sackmann_set in zip(
+                final_state.past_sets, sets):
+
+            if (cur_scores[winner], cur_scores[loser],
+                    None if cur_tiebreak is None else min(cur_tiebreak)) \
+                    != cur_sackmann_set:
+                return False
+
+    return True
+
+
+def validate_match(first_server: str,
+                   first_returner: str,
+                   sackmann_str: Union[str, List[bool]],
+                   sackmann_score: str,
+                   tny_name: str,
+                   transition_cache: Optional[TransitionCache] = None,
+                   parse_cache: Optional[ParseCache] = None,
+                   final_state_only: bool = True) \
+        -> Tuple[bool, Optional[Union[MatchState, CompactMatchState]]]:
+    """
+    Parses one match from Jeff's data and checks it against his score.
+
+    Args:
+        first_server: The first server in the match.
+        first_returner: The first returner in the match.
+        sackmann_str: The coded string from Jeff's data, or the win/loss
+            vector if it is already decoded (e.g. from a corpus). Vectors
+            are not cached in a parse_cache.
+        sackmann_score: The string score in Jeff's dataset.
+        tny_name: The tournament name, used to find the format.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+        parse_cache: Optionally, a ParseCache in which to look up the final
+            state (or all the states, if not final_state_only), or to store
+            it in after parsing.
+        final_state_only: If True, only the final state is kept while
+            parsing, and it is compared with the parsed Sackmann score [see
+            compact_state_matches_score]. If False, the states after every
+            point are created and the final one is compared as a string,
+            which is slower but can help with debugging. The results are
+            the same.
+
+    Returns:
+        A tuple. The first element is True if the scores match, the second
+        is the final parsed state, or None if the match could not be parsed.
+        The final state is a CompactMatchState if final_state_only, so that
+        no MatchState is created for the matches which agree, and a
+        MatchState otherwise.
+    """
+
+    cur_format = SLAM_FORMATS.get(tny_name, fmts.standard_best_of_three)
+
+    def compute():
+        return _final_compact_state(first_server, first_returner,
+                                    sackmann_str, cur_format,
+                                    transition_cache)
+
+    try:
+        if not final_state_only:
+            final_state = process_match(
+                first_server, first_returner, sackmann_str, cur_format,
+                transition_cache=transition_cache,
+                parse_cache=parse_cache)[-1]
+        elif parse_cache is None:
+            final_state = compute()
+        else:
+            final_state = parse_cache.get_or_compute(
+                parse_cache.match_key('final_state', first_server,
+                                      first_returner, sackmann_str,
+                                      cur_format), compute)
+    except AssertionError:
+        return False, None
+
+    if final_state_only:
+        matches_sack = compact_state_matches_score(final_state,
+                                                   sackmann_score)
+    else:
+        matches_sack = validate_against_sackmann_score(final_state,
+                                                       sackmann_score)
+
+    return matches_sack, final_state
+
+
+def _to_match_state(final_state: Optional[Union[MatchState,
+                                                CompactMatchState]]) \
+        -> Optional[MatchState]:
+    # The final state returned by validate_match, as a MatchState.
+
+    if not isinstance(final_state, CompactMatchState):
+        return final_state
+
+    with stage('copy_states'):
+        return final_state.to_match_state()
+
+
+# The columns of Jeff's data needed by validate_match, in order.
+VALIDATION_COLUMNS = ['server1', 'server2', 'pbp', 'score', 'tny_name']
+
+# Each worker process of validate_all keeps its own cache.
+_worker_transition_cache = None
+
+
+def iter_problematic(rows: Iterable[Tuple],
+                     transition_cache: Optional[TransitionCache] = None,
+                     parse_cache: Optional[ParseCache] = None,
+                     final_state_only: bool = True) \
+        -> Iterator[Tuple[Any, MatchState]]:
+    """
+    Checks matches against their parsed results [see validate_match], as
+    validate_all does for the rows of a DataFrame.
+
+    Args:
+        rows: Tuples made up of anything identifying the match, followed by
+            the arguments of validate_match, in the order of the
+            VALIDATION_COLUMNS.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+        parse_cache: Optionally, a ParseCache [see validate_match].
+        final_state_only: Passed on to validate_match.
+
+    Yields:
+        The identifier and the final parsed state (None if the match could
+        not be parsed) of each match which did not parse in the same way as
+        Jeff's parser, in order.
+    """
+
+    for cur_key, *cur_columns in rows:
+
+        matches_sack, final_state = validate_match(
+            *cur_columns, transition_cache=transition_cache,
+            parse_cache=parse_cache, final_state_only=final_state_only)
+
+        if not matches_sack:
+            yield cur_key, _to_match_state(final_state)
+
+
+def _validate_rows(rows: List[Tuple], parse_cache: Optional[ParseCache],
+                   final_state_only: bool) \
+        -> Tuple[List[Tuple[int, MatchState]], int, int]:
+    # Validates rows made up of the position in the DataFrame followed by the
+    # VALIDATION_COLUMNS. Returns the position and final state of the
+    # problematic ones, together with the parse cache hits and misses.
+
+    global _worker_transition_cache
+
+    if _worker_transition_cache is None:
+        _worker_transition_cache = TransitionCache()
+
+    problematic = list(iter_problematic(rows, _worker_transition_cache,
+                                        parse_cache, final_state_only))
+
+    if parse_cache is None:
+        return problematic, 0, 0
+
+    # This is the worker's own copy of the cache.
+    parse_cache.close()
+
+    return problematic, parse_cache.hits, parse_cache.misses
+
+
+def _validate_all_parallel(sackmann_df: 'pd.DataFrame', workers: int,
+                           chunk_size: Optional[int],
+                           parse_cache: Optional[ParseCache],
+                           final_state_only: bool) \
+        -> List[Tuple[int, MatchState]]:
+
+    from tqdm import tqdm
+
+    n_matches = len(sackmann_df)
+
+    if chunk_size is None:
+        # Enough chunks per worker to balance the load.
+        chunk_size = max(1, -(-n_matches // (workers * 16)))
+
+    # Only send the columns needed, as plain tuples.
+    rows = list(zip(range(n_matches),
+                    *[sackmann_df[x].tolist() for x in VALIDATION_COLUMNS]))
+    chunks = [rows[i:i + chunk_size] for i in range(0, n_matches, chunk_size)]
+
+    chunk_results = [None] * len(chunks)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=n_matches) as progress:
+
+        futures = {executor.submit(_validate_rows, cur_chunk, parse_cache,
+                                   final_state_only): i
+                   for i, cur_chunk in enumerate(chunks)}
+
+        for cur_future in as_completed(futures):
+
+            cur_chunk = futures[cur_future]
+            chunk_results[cur_chunk], hits, misses = cur_future.result()
+            progress.update(len(chunks[cur_chunk]))
+
+            if parse_cache is not None:
+                parse_cache.hits += hits
+                parse_cache.misses += misses
+
+    # Chunks are in input order, and so is each chunk's result.
+    return [x for cur_result in chunk_results for x in cur_result]
+
+
+def validate_all(sackmann_df: 'pd.DataFrame',
+                 transition_cache: Optional[TransitionCache] = None,
+                 workers: int = 1,
+                 chunk_size: Optional[int] = None,
+                 parse_cache: Optional[ParseCache] = None,
+                 final_state_only: bool = True) \
+        -> List[Dict[str, Any]]:
     """
     Checks all matches in the DataFrame against their parsed results.
 
     Args:
         sackmann_df: The loaded data.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+            Since the same scores recur in every match, this is very
+            effective when validating many matches. Only used if workers is
+            1; worker processes always use a cache of their own.
+        workers: The number of processes to use. If more than one, the
+            matches are split into chunks which are validated in a process
+            pool.
+        chunk_size: The number of matches in each chunk when using several
+            workers. By default, each worker gets about 16 chunks.
+        parse_cache: Optionally, a ParseCache holding the final states (or
+            all the states, if not final_state_only) of matches parsed
+            before. Matches found in it are not parsed again, and the
+            others are added to it.
+        final_state_only: If True, only the final state of each match is
+            kept while parsing [see validate_match].
 
     Returns:
         A list containing each match which did not parse in the same way as
         Jeff's parser, as a dictionary with fields "final_state", containing
         the final parsed state, and "match_tuple", containing Jeff's row
-        in the DataFrame.
+        in the DataFrame. The matches are in the same order as in
+        sackmann_df, regardless of the number of workers.
     """
 
-    problematic_matches = list()
+    if workers > 1:
 
-    for cur_match in tqdm(sackmann_df.itertuples()):
+        problematic = _validate_all_parallel(sackmann_df, workers,
+                                             chunk_size, parse_cache,
+                                             final_state_only)
 
-        cur_format = SLAM_FORMATS.get(cur_match.tny_name,
-                                      fmts.standard_best_of_three)
+        match_tuples = sackmann_df.iloc[
+            [x[0] for x in problematic]].itertuples()
 
-        try:
-            result = process_match(cur_match.server1, cur_match.server2,
-                                   cur_match.pbp, cur_format)
-        except AssertionError:
+        return [{'final_state': final_state, 'match_tuple': cur_match}
+                for (_, final_state), cur_match in zip(problematic,
+                                                       match_tuples)]
 
-            matches_sack = False
+    from tqdm import tqdm
 
-            problematic_matches.append({
-                'final_state': None,
-                'match_tuple': cur_match
-            })
+    rows = ((x, *[getattr(x, y) for y in VALIDATION_COLUMNS])
+            for x in tqdm(sackmann_df.itertuples(), total=len(sackmann_df)))
 
-            continue
+    return [{'final_state': final_state, 'match_tuple': cur_match}
+            for cur_match, final_state in iter_problematic(
+                rows, transition_cache, parse_cache, final_state_only)]
 
-        final_state = result[-1]
 
-        matches_sack = validate_against_sackmann_score(
-            final_state, cur_match.score)
+def validate_sackmann_file(sackmann_csv_file: str,
+                           chunk_size: int = 10000,
+                           workers: int = 1,
+                           discard_unusual_events: bool = True,
+                           parse_cache: Optional[ParseCache] = None,
+                           final_state_only: bool = True) \
+        -> List[Dict[str, Any]]:
+    """
+    Checks all matches in one of Jeff's files, streaming it in chunks [see
+    iter_sackmann_data] so that memory use does not grow with the file.
 
-        if not matches_sack:
-            problematic_matches.append({
-                'final_state': final_state,
-                'match_tuple': cur_match
-            })
+    Args:
+        sackmann_csv_file: Path to the csv with Jeff's data.
+        chunk_size: The number of rows to read at a time.
+        workers: The number of processes to use [see validate_all].
+        discard_unusual_events: If True, discards Davis Cup, Hopman Cup,
+            Fed Cup, Wildcard Playoffs [recommended].
+        parse_cache: Optionally, a ParseCache [see validate_all].
+        final_state_only: If True, only the final state of each match is
+            kept while parsing [see validate_match].
+
+    Returns:
+        The problematic matches, as returned by validate_all.
+    """
+
+    transition_cache = TransitionCache()
+    problematic_matches = list()
+
+    for cur_chunk in iter_sackmann_data(
+            sackmann_csv_file, chunk_size=chunk_size,
+            discard_unusual_events=discard_unusual_events):
+
+        problematic_matches.extend(validate_all(
+            cur_chunk, transition_cache=transition_cache, workers=workers,
+            parse_cache=parse_cache, final_state_only=final_state_only))
 
     return problematic_matches
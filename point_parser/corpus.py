@@ -0,0 +1,353 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from typing import (Any, Dict, Iterable, Iterator, List, NamedTuple,
+                    Optional, Union)
+from .parse import process_win_loss_vector
+from .transition_cache import TransitionCache
+from .utils import create_start_match_state
+from .match_state import MatchState
+from .compare_with_sackmann import (decode_pbp, get_format_codes,
+                                    iter_problematic)
+import point_parser.formats as fmts
+
+"""
+This module stores matches in a compact binary corpus, so that they need not
+be read and decoded from Jeff's CSV files every time.
+
+A corpus is a directory with three files:
+
+* points.bin: The win/loss vectors of all matches, eight points to a byte
+  [see np.packbits]. Each match starts on a new byte.
+* index.npy: A structured array with one row per match [see INDEX_DTYPE],
+  holding the position of its points and its metadata.
+* strings.json: The players, tournaments and scores referred to by the
+  index, each stored once.
+
+Both points.bin and index.npy are memory-mapped when the corpus is opened,
+so opening it takes the same time regardless of its size, and only the
+matches which are used are ever read. Only Corpus.packed gives a view into
+the file, though: Corpus.win_loss unpacks the points into a new array, one
+byte per point, and validate_corpus turns that into a list for the parser.
+"""
+
+# The index of a corpus. Players, tournaments and scores are positions in the
+# lists in strings.json. Matches without a date have NaT, and those without a
+# pbp_id have -1.
+INDEX_DTYPE = np.dtype([
+    ('byte_offset', '<i8'),
+    ('n_points', '<i4'),
+    ('server1', '<i4'),
+    ('server2', '<i4'),
+    ('tournament', '<i4'),
+    ('score', '<i4'),
+    ('format_code', 'i1'),
+    ('date', '<M8[D]'),
+    ('pbp_id', '<i8')
+])
+
+_POINTS_FILE = 'points.bin'
+_INDEX_FILE = 'index.npy'
+_STRINGS_FILE = 'strings.json'
+
+
+class CorpusMatch(NamedTuple):
+    """
+    One match read from a Corpus.
+    """
+
+    win_loss: np.ndarray
+    first_server: str
+    first_returner: str
+    format_code: int
+    tny_name: str
+    score: str
+    date: np.datetime64
+    pbp_id: int
+
+    @property
+    def format_functions(self):
+
+        return list(fmts.FORMATS.values())[self.format_code]
+
+
+class _StringTable:
+    # Gives each distinct string a number, in order of first appearance.
+
+    def __init__(self):
+
+        self.strings = list()
+        self._codes = dict()
+
+    def codes(self, values: Iterable[str]) -> np.ndarray:
+
+        result = list()
+
+        for cur_value in values:
+
+            if cur_value not in self._codes:
+                self._codes[cur_value] = len(self.strings)
+                self.strings.append(cur_value)
+
+            result.append(self._codes[cur_value])
+
+        return np.array(result, dtype=np.int32)
+
+
+def write_corpus(sackmann_dfs: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+                 path: str) -> pd.Index:
+    """
+    Writes Jeff's data to a corpus.
+
+    Args:
+        sackmann_dfs: The data, as loaded by load_sackmann_data, or an
+            iterable of chunks, as returned by iter_sackmann_data.
+        path: The directory to write the corpus to. It is created if it does
+            not exist.
+
+    Returns:
+        The index of the matches whose pbp string could not be decoded. These
+        are left out of the corpus.
+    """
+
+    if isinstance(sackmann_dfs, pd.DataFrame):
+        sackmann_dfs = [sackmann_dfs]
+
+    os.makedirs(path, exist_ok=True)
+
+    players = _StringTable()
+    tournaments = _StringTable()
+    scores = _StringTable()
+
+    index_chunks = list()
+    failed = list()
+    byte_offset = 0
+
+    with open(os.path.join(path, _POINTS_FILE), 'wb') as points_file:
+
+        for cur_df in sackmann_dfs:
+
+            keep = np.ones(len(cur_df), dtype=bool)
+            n_points = np.zeros(len(cur_df), dtype=np.int32)
+            packed = list()
+
+            for cur_match, cur_pbp in enumerate(cur_df['pbp']):
+
+                try:
+                    server_won = decode_pbp(cur_pbp).server_won
+                except AssertionError:
+                    keep[cur_match] = False
+                    continue
+
+                n_points[cur_match] = len(server_won)
+                packed.append(np.packbits(server_won).tobytes())
+
+            failed.append(cur_df.index[~keep])
+            cur_df = cur_df[keep]
+            n_points = n_points[keep]
+
+            cur_index = np.zeros(len(cur_df), dtype=INDEX_DTYPE)
+
+            n_bytes = (n_points.astype(np.int64) + 7) // 8
+            cur_index['byte_offset'] = byte_offset + np.cumsum(n_bytes) - \
+                n_bytes
+            cur_index['n_points'] = n_points
+            cur_index['server1'] = players.codes(cur_df['server1'])
+            cur_index['server2'] = players.codes(cur_df['server2'])
+            cur_index['tournament'] = tournaments.codes(cur_df['tny_name'])
+            cur_index['score'] = scores.codes(cur_df['score'])
+
+            if 'format' in cur_df:
+                cur_index['format_code'] = cur_df['format'].cat.codes
+            else:
+                cur_index['format_code'] = get_format_codes(
+                    cur_df['tny_name'])
+
+            if 'date' in cur_df:
+                cur_index['date'] = pd.to_datetime(
+                    cur_df['date']).to_numpy(dtype='datetime64[D]')
+            else:
+                cur_index['date'] = np.datetime64('NaT')
+
+            if 'pbp_id' in cur_df:
+                cur_index['pbp_id'] = cur_df['pbp_id']
+            else:
+                cur_index['pbp_id'] = -1
+
+            points_file.write(b''.join(packed))
+            byte_offset += int(n_bytes.sum())
+
+            index_chunks.append(cur_index)
+
+    if len(index_chunks) > 0:
+        index = np.concatenate(index_chunks)
+    else:
+        index = np.zeros(0, dtype=INDEX_DTYPE)
+
+    np.save(os.path.join(path, _INDEX_FILE), index)
+
+    with open(os.path.join(path, _STRINGS_FILE), 'w') as strings_file:
+        json.dump({
+            'players': players.strings,
+            'tournaments': tournaments.strings,
+            'scores': scores.strings
+        }, strings_file)
+
+    if len(failed) == 0:
+        return pd.Index([])
+
+    return failed[0].append(failed[1:])
+
+
+class Corpus:
+    """
+    Reads a corpus written by write_corpus.
+
+    Any match can be read in constant time, and nothing is read from disk
+    until it is needed.
+
+    Example::
+
+        corpus = Corpus('sackmann_corpus')
+
+        match = corpus[10]
+        states = corpus.process_match(10)
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: The directory the corpus was written to.
+        """
+
+        self.path = os.fspath(path)
+
+        self.index = np.load(os.path.join(self.path, _INDEX_FILE),
+                             mmap_mode='r')
+
+        points_path = os.path.join(self.path, _POINTS_FILE)
+
+        # Empty files cannot be memory-mapped.
+        if os.path.getsize(points_path) > 0:
+            self.points = np.memmap(points_path, dtype=np.uint8, mode='r')
+        else:
+            self.points = np.zeros(0, dtype=np.uint8)
+
+        self._strings = None
+
+    def __len__(self) -> int:
+
+        return len(self.index)
+
+    @property
+    def strings(self) -> Dict[str, List[str]]:
+        """The players, tournaments and scores referred to by the index."""
+
+        # Only loaded when first needed, so that opening a corpus is cheap.
+        if self._strings is None:
+            with open(os.path.join(self.path, _STRINGS_FILE)) as strings_file:
+                self._strings = json.load(strings_file)
+
+        return self._strings
+
+    def packed(self, match_num: int) -> np.ndarray:
+        """
+        Returns the points of a match as stored, eight to a byte. This is a
+        view into the file rather than a copy.
+        """
+
+        entry = self.index[match_num]
+        start = int(entry['byte_offset'])
+
+        return self.points[start:start + (int(entry['n_points']) + 7) // 8]
+
+    def win_loss(self, match_num: int) -> np.ndarray:
+        """
+        Returns the win/loss vector of a match as a boolean array. Unlike
+        packed, this is a new array, with one byte per point.
+        """
+
+        n_points = int(self.index[match_num]['n_points'])
+
+        return np.unpackbits(self.packed(match_num),
+                             count=n_points).view(bool)
+
+    def __getitem__(self, match_num: int) -> CorpusMatch:
+
+        entry = self.index[match_num]
+        strings = self.strings
+
+        return CorpusMatch(
+            win_loss=self.win_loss(match_num),
+            first_server=strings['players'][entry['server1']],
+            first_returner=strings['players'][entry['server2']],
+            format_code=int(entry['format_code']),
+            tny_name=strings['tournaments'][entry['tournament']],
+            score=strings['scores'][entry['score']],
+            date=entry['date'],
+            pbp_id=int(entry['pbp_id'])
+        )
+
+    def __iter__(self) -> Iterator[CorpusMatch]:
+
+        for cur_match in range(len(self)):
+            yield self[cur_match]
+
+    def process_match(self, match_num: int,
+                      transition_cache: Optional[TransitionCache] = None) \
+            -> List[MatchState]:
+        """
+        Parses one match of the corpus.
+
+        Args:
+            match_num: The position of the match in the corpus.
+            transition_cache: Optionally, a TransitionCache to speed up
+                parsing.
+
+        Returns:
+            A list of MatchStates, one for each point of the match.
+        """
+
+        match = self[match_num]
+
+        return process_win_loss_vector(
+            match.win_loss,
+            create_start_match_state(match.first_server,
+                                     match.first_returner),
+            match.format_functions, transition_cache=transition_cache)
+
+
+def validate_corpus(corpus: Corpus,
+                    transition_cache: Optional[TransitionCache] = None) \
+        -> List[Dict[str, Any]]:
+    """
+    Checks all matches in a corpus against their parsed results, with the
+    same checks as validate_all [see iter_problematic].
+
+    Args:
+        corpus: The corpus.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+
+    Returns:
+        A list containing each match which did not parse in the same way as
+        Jeff's parser, as a dictionary with fields "final_state", containing
+        the final parsed state (None if the match could not be parsed),
+        "match_num", containing its position in the corpus, and "match",
+        containing the CorpusMatch.
+    """
+
+    if transition_cache is None:
+        transition_cache = TransitionCache()
+
+    # The decoded points take the place of the pbp string.
+    rows = ((cur_match_num, cur_match.first_server, cur_match.first_returner,
+             cur_match.win_loss.tolist(), cur_match.score, cur_match.tny_name)
+            for cur_match_num, cur_match in tqdm(enumerate(corpus),
+                                                 total=len(corpus)))
+
+    return [{'final_state': final_state, 'match_num': cur_match_num,
+             'match': corpus[cur_match_num]}
+            for cur_match_num, final_state in iter_problematic(
+                rows, transition_cache)]
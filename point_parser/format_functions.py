@@ -21,7 +21,9 @@ class FormatFunctions:
     set_win_condition: Callable[[int, int, bool], bool]
 
     # Function taking games_won_p1, games_won_p2, is_final set, and returning
-    # whether we are in a tiebreak.
+    # whether we are in a tiebreak. It is called after each game, with
+    # is_final_set referring to the set which is then being played, so that
+    # a set can start with a tiebreak (e.g. a match tiebreak).
     is_tiebreak_fun: Callable[[int, int, bool], bool]
 
     # Function taking games_won_p1, games_won_p2, is_final_set, and returning
@@ -0,0 +1,382 @@
+import numpy as np
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
+from .format_functions import FormatFunctions
+import point_parser.standard_win_functions as swf
+
+"""
+This module describes match formats declaratively, as a FormatSpec, rather
+than as a collection of functions. A FormatSpec is immutable and hashable, so
+it can be used as a cache key and sent cheaply to other processes, and it is
+compiled into small tables holding the answer of each rule for every score
+which can come up. The FormatFunctions it produces [see
+FormatSpec.to_format_functions] can be used anywhere the formats in
+formats.py can.
+
+Example::
+
+    # The best of five format played at the slams since 2022, with a
+    # ten-point tiebreak at 6-6 in the final set.
+    spec = FormatSpec(best_of=5, final_set_tiebreak_points=10)
+
+    states = process_win_loss_vector(win_loss, start_state,
+                                     spec.to_format_functions())
+"""
+
+# What happens in the final set: a tiebreak at final_set_tiebreak_at all,
+# no tiebreak at all, or a single tiebreak instead of the set.
+FINAL_SET_RULES = ('tiebreak', 'advantage', 'match_tiebreak')
+
+
+@dataclass(frozen=True)
+class FormatSpec:
+    """
+    The rules of a match format.
+    """
+
+    # The number of sets, e.g. 3 for best of three.
+    best_of: int = 3
+
+    # The games needed to win a set, by two clear games.
+    games_per_set: int = 6
+
+    # Whether games are won by two clear points. If False, the point at
+    # deuce decides the game.
+    has_ad: bool = True
+
+    # The points needed to win a tiebreak, by two clear points.
+    tiebreak_points: int = 7
+
+    # One of FINAL_SET_RULES.
+    final_set: str = 'tiebreak'
+
+    # The points needed to win the tiebreak of the final set (or the match
+    # tiebreak which replaces it).
+    final_set_tiebreak_points: int = 7
+
+    # The games each at which the final set goes to a tiebreak, if it has
+    # one. By default, games_per_set.
+    final_set_tiebreak_at: Optional[int] = None
+
+    def __post_init__(self):
+
+        if self.best_of < 1 or self.best_of % 2 == 0:
+            raise ValueError('best_of must be an odd, positive number.')
+
+        if self.final_set not in FINAL_SET_RULES:
+            raise ValueError(f'final_set must be one of {FINAL_SET_RULES}.')
+
+        if self.final_set == 'match_tiebreak' and self.best_of == 1:
+            raise ValueError('A match tiebreak needs at least three sets.')
+
+        if min(self.games_per_set, self.tiebreak_points,
+               self.final_set_tiebreak_points) < 1:
+            raise ValueError('Games and points needed must be positive.')
+
+        if (self.final_set_tiebreak_at is not None and
+                self.final_set_tiebreak_at < self.games_per_set):
+            raise ValueError('final_set_tiebreak_at must be at least '
+                             'games_per_set.')
+
+    def compile(self) -> 'CompiledFormat':
+        """
+        Returns the lookup tables of the format. They are only built once
+        for each spec.
+        """
+
+        return _compile(self)
+
+    def to_format_functions(self) -> FormatFunctions:
+        """
+        Returns the FormatFunctions of the format. The same object is
+        returned every time for equal specs, so that it can be used with a
+        TransitionCache.
+        """
+
+        return _format_functions(self)
+
+
+# The rules themselves, in terms of the spec. As in standard_win_functions,
+# they only use elementwise operations, so that they also work on arrays.
+
+def _first_to(target: int) -> Callable:
+    # First to target points or games, by two clear.
+
+    def over(score_a, score_b):
+        return (((score_a >= target) | (score_b >= target)) &
+                (abs(score_a - score_b) >= 2))
+
+    return over
+
+
+def _tiebreak_set(games: int, tiebreak_at: int) -> Callable:
+    # First to games by two clear, or winning the tiebreak at tiebreak_at.
+
+    ad_set = _first_to(games)
+
+    def over(score_a, score_b):
+        won_tiebreak = (((score_a == tiebreak_at + 1) &
+                         (score_b == tiebreak_at)) |
+                        ((score_b == tiebreak_at + 1) &
+                         (score_a == tiebreak_at)))
+        return ad_set(score_a, score_b) | won_tiebreak
+
+    return over
+
+
+def _tied_at(games: int) -> Callable:
+
+    def tied(score_a, score_b):
+        return (score_a == games) & (score_b == games)
+
+    return tied
+
+
+def _never(score_a, score_b):
+
+    return (score_a < 0) & (score_b < 0)
+
+
+def _first_to_no_ad(target: int) -> Callable:
+
+    def over(score_a, score_b):
+        return (score_a >= target) | (score_b >= target)
+
+    return over
+
+
+# How far the tables extend beyond the scores at which the rules change, so
+# that long deuce games and sets are usually looked up directly.
+_TABLE_MARGIN = 16
+
+
+class ScoreTable:
+    """
+    A rule taking two scores, stored as a table of its answers.
+
+    Scores beyond the table are handled in one of two ways. For rules which
+    only depend on the difference of the scores once both are past
+    tie_limit (such as "first to seven, by two clear"), both scores are
+    reduced by the same amount until one is back at tie_limit. Anything else
+    beyond the table, which only happens for scores which cannot come up in
+    a match, is evaluated with the rule itself.
+    """
+
+    def __init__(self, rule: Callable, last_change: int,
+                 tie_limit: Optional[int] = None):
+        """
+        Args:
+            rule: The rule, taking two scores and returning a bool. It must
+                work elementwise on arrays.
+            last_change: The highest score at which the rule can change.
+                The table covers scores up to this plus a margin.
+            tie_limit: Optionally, the score past which only the difference
+                of the scores matters.
+        """
+
+        self.rule = rule
+        self.size = last_change + _TABLE_MARGIN
+        self.tie_limit = tie_limit
+
+        scores = np.arange(self.size)
+        self.table = np.asarray(rule(scores[:, None], scores[None, :]),
+                                dtype=bool)
+
+        # Indexing nested tuples is much faster than indexing an array with
+        # single integers.
+        self.rows = tuple(tuple(bool(x) for x in y) for y in self.table)
+
+    def lookup(self, score_a, score_b):
+        """
+        Looks the rule up for two scores, which can be integers or arrays.
+        """
+
+        if type(score_a) is np.ndarray or type(score_b) is np.ndarray:
+            return self._lookup_arrays(score_a, score_b)
+
+        if self.tie_limit is not None:
+
+            excess = min(score_a, score_b) - self.tie_limit
+
+            if excess > 0:
+                score_a -= excess
+                score_b -= excess
+
+        if score_a < self.size and score_b < self.size:
+            return self.rows[score_a][score_b]
+
+        return bool(self.rule(score_a, score_b))
+
+    def _lookup_arrays(self, score_a: np.ndarray,
+                       score_b: np.ndarray) -> np.ndarray:
+
+        score_a, score_b = np.broadcast_arrays(score_a, score_b)
+
+        if self.tie_limit is not None:
+            excess = np.maximum(np.minimum(score_a, score_b) -
+                                self.tie_limit, 0)
+            score_a, score_b = score_a - excess, score_b - excess
+
+        inside = (score_a < self.size) & (score_b < self.size)
+
+        result = self.table[np.where(inside, score_a, 0),
+                            np.where(inside, score_b, 0)]
+
+        if not inside.all():
+            result[~inside] = self.rule(score_a[~inside], score_b[~inside])
+
+        return result
+
+
+# The functions below turn tables into the functions of FormatFunctions. The
+# common case, integer scores inside the table, is a plain tuple lookup;
+# everything else (arrays, or scores beyond the table) fails with an
+# IndexError or TypeError and goes through ScoreTable.lookup.
+
+def _table_function(table: ScoreTable) -> Callable:
+
+    rows = table.rows
+
+    def lookup(score_a, score_b):
+        try:
+            return rows[score_a][score_b]
+        except (IndexError, TypeError):
+            return table.lookup(score_a, score_b)
+
+    return lookup
+
+
+def _final_set_function(table: ScoreTable,
+                        final_set_table: ScoreTable) -> Callable:
+    # For the functions taking the is_final_set flag.
+
+    tables = (table, final_set_table)
+    rows = (table.rows, final_set_table.rows)
+
+    def lookup(score_a, score_b, is_final_set):
+        try:
+            return rows[is_final_set][score_a][score_b]
+        except (IndexError, TypeError):
+            return tables[bool(is_final_set)].lookup(score_a, score_b)
+
+    return lookup
+
+
+class CompiledFormat:
+    """
+    The lookup tables of a FormatSpec, and the functions looking them up,
+    which take the same arguments as the fields of FormatFunctions.
+    """
+
+    def __init__(self, spec: FormatSpec):
+
+        self.spec = spec
+
+        games = spec.games_per_set
+        tiebreak_at = (games if spec.final_set_tiebreak_at is None
+                       else spec.final_set_tiebreak_at)
+
+        if spec.has_ad:
+            self.game_table = ScoreTable(_first_to(4), 4, tie_limit=3)
+        else:
+            self.game_table = ScoreTable(_first_to_no_ad(4), 4)
+
+        # Pairs of tables for the other sets and the final set.
+        self.tiebreak_tables = tuple(
+            ScoreTable(_first_to(x), x, tie_limit=x - 1)
+            for x in [spec.tiebreak_points, spec.final_set_tiebreak_points])
+
+        final_set_table = {
+            'tiebreak': ScoreTable(_tiebreak_set(games, tiebreak_at),
+                                   tiebreak_at + 1),
+            'advantage': ScoreTable(_first_to(games), games,
+                                    tie_limit=games - 1),
+            # The match tiebreak is the only game of the set.
+            'match_tiebreak': ScoreTable(_first_to_no_ad(1), 1)
+        }[spec.final_set]
+
+        self.set_tables = (ScoreTable(_tiebreak_set(games, games), games + 1),
+                           final_set_table)
+
+        final_tiebreak_start_table = {
+            'tiebreak': ScoreTable(_tied_at(tiebreak_at), tiebreak_at),
+            'advantage': ScoreTable(_never, 0, tie_limit=0),
+            'match_tiebreak': ScoreTable(_tied_at(0), 0)
+        }[spec.final_set]
+
+        self.tiebreak_start_tables = (ScoreTable(_tied_at(games), games),
+                                      final_tiebreak_start_table)
+
+        sets_needed = spec.best_of // 2 + 1
+
+        self.match_table = ScoreTable(
+            lambda x, y: (x == sets_needed) | (y == sets_needed),
+            sets_needed)
+
+        self.service_game_over = _table_function(self.game_table)
+        self.tiebreak_over = _final_set_function(*self.tiebreak_tables)
+        self.set_win_condition = _final_set_function(*self.set_tables)
+        self.is_tiebreak_fun = _final_set_function(
+            *self.tiebreak_start_tables)
+        self.match_over_fun = _table_function(self.match_table)
+
+    def __reduce__(self):
+        # Only send the spec to other processes; they compile it again.
+
+        return _compile, (self.spec,)
+
+    def is_final_set(self, set_num):
+
+        return set_num + 1 == self.spec.best_of
+
+
+@lru_cache(maxsize=None)
+def _compile(spec: FormatSpec) -> CompiledFormat:
+
+    return CompiledFormat(spec)
+
+
+class SpecFormatFunctions(FormatFunctions):
+    """
+    The FormatFunctions of a FormatSpec, which remember their spec. Only the
+    spec is pickled, so that they are cheap to send to other processes.
+    """
+
+    spec: FormatSpec
+
+    def __reduce__(self):
+
+        return _format_functions, (self.spec,)
+
+
+@lru_cache(maxsize=None)
+def _format_functions(spec: FormatSpec) -> SpecFormatFunctions:
+
+    compiled = _compile(spec)
+
+    format_functions = SpecFormatFunctions(
+        set_win_condition=compiled.set_win_condition,
+        is_tiebreak_fun=compiled.is_tiebreak_fun,
+        tiebreak_over=compiled.tiebreak_over,
+        match_over_fun=compiled.match_over_fun,
+        service_game_over=compiled.service_game_over,
+        roles_at_game_start=swf.roles_at_game_start,
+        is_final_set=compiled.is_final_set,
+        tiebreak_roles=swf.tiebreak_roles_standard
+    )
+    format_functions.spec = spec
+
+    return format_functions
+
+
+def spec_of(format_functions: FormatFunctions) -> Optional[FormatSpec]:
+    """
+    Returns the FormatSpec a FormatFunctions was made from, or None if it was
+    not made from one.
+    """
+
+    if isinstance(format_functions, SpecFormatFunctions):
+        return format_functions.spec
+
+    return None
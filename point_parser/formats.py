@@ -1,6 +1,7 @@
 import point_parser.parse as p
 import point_parser.standard_win_functions as swf
 from functools import partial
+from .format_spec import FormatSpec
 
 """
 This module contains the different match formats. They encode the different
@@ -106,3 +107,61 @@ us_open_format_ladies = p.FormatFunctions(
     # In tiebreak, we can find server and returner the standard way
     tiebreak_roles=swf.tiebreak_roles_standard
 )
+
+# The formats below are described declaratively [see format_spec.py].
+
+# The best of five format played at the slams since 2022, with a ten-point
+# tiebreak at 6-6 in the final set.
+slam_format_2022_men = FormatSpec(
+    best_of=5, final_set_tiebreak_points=10).to_format_functions()
+
+# The same, best of three sets.
+slam_format_2022_ladies = FormatSpec(
+    best_of=3, final_set_tiebreak_points=10).to_format_functions()
+
+# No-ad games, with a ten-point match tiebreak instead of a third set, as in
+# doubles on the ATP tour.
+no_ad_match_tiebreak = FormatSpec(
+    best_of=3, has_ad=False, final_set='match_tiebreak',
+    final_set_tiebreak_points=10).to_format_functions()
+
+# All the formats above, by name. A format's position in this dictionary is its
+# "format code", which is used where formats have to be stored compactly, such
+# as in batch.py. New formats must be added at the end, so that stored codes
+# keep their meaning.
+FORMATS = {
+    'classic_slam_format_men': classic_slam_format_men,
+    'standard_best_of_three': standard_best_of_three,
+    'us_open_format_men': us_open_format_men,
+    'classic_slam_format_ladies': classic_slam_format_ladies,
+    'us_open_format_ladies': us_open_format_ladies,
+    'slam_format_2022_men': slam_format_2022_men,
+    'slam_format_2022_ladies': slam_format_2022_ladies,
+    'no_ad_match_tiebreak': no_ad_match_tiebreak,
+}
+
+# The rules of each of the formats in FORMATS, as a FormatSpec. Those of the
+# formats written as functions give exactly the same results.
+FORMAT_SPECS = {
+    'classic_slam_format_men': FormatSpec(best_of=5, final_set='advantage'),
+    'standard_best_of_three': FormatSpec(best_of=3),
+    'us_open_format_men': FormatSpec(best_of=5),
+    'classic_slam_format_ladies': FormatSpec(best_of=3,
+                                             final_set='advantage'),
+    'us_open_format_ladies': FormatSpec(best_of=3),
+    'slam_format_2022_men': slam_format_2022_men.spec,
+    'slam_format_2022_ladies': slam_format_2022_ladies.spec,
+    'no_ad_match_tiebreak': no_ad_match_tiebreak.spec,
+}
+
+
+def format_code(format_functions: p.FormatFunctions) -> int:
+    """
+    Returns the format code of one of the formats in FORMATS.
+    """
+
+    for cur_code, cur_format in enumerate(FORMATS.values()):
+        if cur_format is format_functions:
+            return cur_code
+
+    raise ValueError('Format is not one of the formats in FORMATS.')
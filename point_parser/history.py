@@ -0,0 +1,227 @@
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
+from typing import Iterable, Iterator, List, Optional, Union
+from .match_state import MatchState, CompactMatchState
+from .format_functions import FormatFunctions
+from .manipulate_match_state import advance_compact_state
+from .transition_cache import TransitionCache
+
+"""
+This module stores the states of a match after every point compactly, as the
+changes made by each point, and rebuilds the states only when they are
+accessed.
+
+Each point takes one byte [see the flags below], and each game, set and
+completed set a few more, so a match takes a few bytes per point instead of
+a full MatchState per point.
+"""
+
+# The flags stored for each point.
+_WINNER_IS_P2 = 1
+_GAME_OVER = 2
+_SET_OVER = 4
+_MATCH_OVER = 8
+_IS_TIEBREAK = 16
+_SERVER_IS_P2 = 32
+
+
+class StateHistory(Sequence):
+    """
+    The states of a match after each point, with the same interface as the
+    list returned by process_win_loss_vector: indexing gives a MatchState,
+    slicing a list of them, and iterating gives them in order.
+
+    Example::
+
+        history = StateHistory(win_loss, start_state,
+                               fmts.classic_slam_format_men)
+
+        # The same as process_win_loss_vector(...)[100]:
+        state = history[100]
+    """
+
+    def __init__(self, win_loss_vector: Iterable[bool],
+                 match_state: MatchState,
+                 format_functions: FormatFunctions,
+                 transition_cache: Optional[TransitionCache] = None):
+        """
+        Args:
+            win_loss_vector: True and False indicating whether the server won
+                or lost each point.
+            match_state: The state of the match before the first point. Can
+                be a MatchState or a CompactMatchState.
+            format_functions: The functions encoding the rules of the match.
+            transition_cache: Optionally, a TransitionCache to speed up
+                parsing.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        self._start = match_state
+
+        # One byte of flags per point.
+        codes = bytearray()
+
+        # For each game which ends, its last point and the games won by the
+        # second player so far. For each set which ends, the number of games
+        # which had ended, and the sets won by the second player so far.
+        self._game_ends = array('I')
+        self._p2_games = array('I')
+        self._set_end_games = array('I')
+        self._p2_sets = array('I')
+
+        previous = match_state
+        p2_games = 0
+        p2_sets = 0
+
+        advance = (advance_compact_state if transition_cache is None
+                   else transition_cache.advance)
+
+        for cur_point, cur_win_loss in enumerate(win_loss_vector):
+
+            # The match better not be over if there are points left!
+            assert not previous.is_over
+
+            cur_state = advance(cur_win_loss, previous, format_functions)
+
+            winner = previous.server if cur_win_loss else 1 - previous.server
+            code = _WINNER_IS_P2 * winner
+
+            if cur_state.total_games_played != previous.total_games_played:
+
+                code |= _GAME_OVER
+                p2_games += winner
+                self._game_ends.append(cur_point)
+                self._p2_games.append(p2_games)
+
+            if len(cur_state.past_sets) != len(previous.past_sets):
+
+                code |= _SET_OVER
+                p2_sets += winner
+                self._set_end_games.append(len(self._game_ends))
+                self._p2_sets.append(p2_sets)
+
+            if cur_state.is_over:
+                code |= _MATCH_OVER
+
+            if cur_state.is_tiebreak:
+                code |= _IS_TIEBREAK
+
+            code |= _SERVER_IS_P2 * cur_state.server
+
+            codes.append(code)
+            previous = cur_state
+
+        self._codes = bytes(codes)
+
+        # The sets completed during the history.
+        self._past_sets = previous.past_sets[len(match_state.past_sets):]
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes used to store the points, games and sets."""
+
+        return (len(self._codes) +
+                sum(x.itemsize * len(x) for x in [
+                    self._game_ends, self._p2_games, self._set_end_games,
+                    self._p2_sets]))
+
+    def __len__(self) -> int:
+
+        return len(self._codes)
+
+    def compact_state(self, point: int) -> CompactMatchState:
+        """
+        Rebuilds the state after a point.
+
+        Args:
+            point: The index of the point. As with lists, negative indices
+                count from the end.
+
+        Returns:
+            The CompactMatchState after the point.
+        """
+
+        if point < 0:
+            point += len(self)
+
+        if not 0 <= point < len(self):
+            raise IndexError('Point out of range.')
+
+        start = self._start
+        code = self._codes[point]
+        is_over = bool(code & _MATCH_OVER)
+
+        n_games = bisect_right(self._game_ends, point)
+        n_sets = bisect_right(self._set_end_games, n_games)
+
+        # The sets won.
+        p2_sets = self._p2_sets[n_sets - 1] if n_sets > 0 else 0
+        sets_won = (start.sets_won[0] + n_sets - p2_sets,
+                    start.sets_won[1] + p2_sets)
+
+        # The games won in the current set, which is the last one if the
+        # match is over.
+        n_sets_before = n_sets - 1 if is_over else n_sets
+
+        if n_sets_before > 0:
+            set_start_games = self._set_end_games[n_sets_before - 1]
+            set_score = (0, 0)
+        else:
+            set_start_games = 0
+            set_score = start.cur_set_score
+
+        p2_games = self._games_won_by_p2(n_games) - self._games_won_by_p2(
+            set_start_games)
+        games_in_set = n_games - set_start_games
+
+        set_score = (set_score[0] + games_in_set - p2_games,
+                     set_score[1] + p2_games)
+
+        # The points won in the current game.
+        if code & _GAME_OVER:
+            game_score = (0, 0)
+        else:
+            if n_games > 0:
+                game_start = self._game_ends[n_games - 1] + 1
+                game_score = (0, 0)
+            else:
+                game_start = 0
+                game_score = start.cur_game_score
+
+            p2_points = sum(x & _WINNER_IS_P2
+                            for x in self._codes[game_start:point + 1])
+            game_score = (game_score[0] + point + 1 - game_start - p2_points,
+                          game_score[1] + p2_points)
+
+        return CompactMatchState(
+            players=start.players,
+            server=int(bool(code & _SERVER_IS_P2)),
+            is_tiebreak=bool(code & _IS_TIEBREAK),
+            set_num=start.set_num + n_sets - is_over,
+            total_games_played=start.total_games_played + n_games,
+            cur_set_score=set_score,
+            cur_game_score=game_score,
+            sets_won=sets_won,
+            past_sets=start.past_sets + self._past_sets[:n_sets],
+            is_over=is_over
+        )
+
+    def _games_won_by_p2(self, n_games: int) -> int:
+
+        return self._p2_games[n_games - 1] if n_games > 0 else 0
+
+    def __getitem__(self, point: Union[int, slice]) \
+            -> Union[MatchState, List[MatchState]]:
+
+        if isinstance(point, slice):
+            return [self[i] for i in range(*point.indices(len(self)))]
+
+        return self.compact_state(point).to_match_state()
+
+    def __iter__(self) -> Iterator[MatchState]:
+
+        for cur_point in range(len(self)):
+            yield self[cur_point]
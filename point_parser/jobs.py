@@ -0,0 +1,476 @@
+import io
+import json
+import os
+import socket
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, suppress
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .compare_with_sackmann import (SACKMANN_COLUMNS, iter_sackmann_data,
+                                    validate_match)
+from .transition_cache import TransitionCache
+from .triage import triage_match
+from .utils import ScoreRenderer
+
+"""
+This module validates archives of Jeff's data too big for one run of
+validate_all, as a batch job split into shards which any number of
+processes, on any number of machines sharing a filesystem, work through.
+
+A job is a directory. plan_job writes a manifest to it, splitting each input
+file into shards of consecutive rows by their byte offsets, so that a shard
+can be read without reading the rows before it. run_shards then processes
+the shards one by one: each is claimed with a lock file, validated [see
+validate_match] and triaged [see triage.triage_match], and its results are
+written to a file of their own, followed by a checkpoint marking it as done.
+Files are written under a temporary name and then renamed, so that they are
+either complete or missing. Shards which are done are skipped, so a job which
+crashed is resumed by running it again. Finally, merge_job combines the
+results of all the shards.
+
+Example::
+
+    plan_job(['pbp_matches_atp_main_archive.csv'], 'job')
+
+    # On each machine, or in each process:
+    run_shards('job')
+
+    matches, mismatches = merge_job('job')
+
+The shards are split at line ends, so each match must be on a line of its
+own, as in Jeff's files.
+"""
+
+_MANIFEST_FILE = 'manifest.json'
+_SHARD_DIR = 'shards'
+_MATCHES_FILE = 'matches.csv'
+_MISMATCHES_FILE = 'mismatches.csv'
+
+# The columns of the results of each shard, and of the merged matches. The
+# last five are only set for the mismatches [see triage.MatchTriage].
+RESULT_COLUMNS = ['file', 'row', 'pbp_id', 'date', 'tny_name', 'server1',
+                  'server2', 'score', 'parsed_score', 'matches_sack', 'cause',
+                  'divergence', 'point', 'other_format', 'swapped_game']
+
+
+def _write_atomically(path: str, write: Callable[[str], Any]):
+    # Writes a file under a temporary name, then renames it, so that the file
+    # is never seen half-written.
+
+    temporary_path = f'{path}.{socket.gethostname()}.{os.getpid()}.tmp'
+
+    write(temporary_path)
+    os.replace(temporary_path, path)
+
+
+def _write_json(path: str, contents: Dict[str, Any]):
+
+    def write(temporary_path: str):
+        with open(temporary_path, 'w') as json_file:
+            json.dump(contents, json_file, indent=2)
+
+    _write_atomically(path, write)
+
+
+def _shard_path(job_dir: str, shard_id: str, suffix: str) -> str:
+
+    return os.path.join(job_dir, _SHARD_DIR, f'{shard_id}.{suffix}')
+
+
+def plan_job(input_files: List[str], job_dir: str,
+             shard_size: int = 10000,
+             discard_unusual_events: bool = True) -> Dict[str, Any]:
+    """
+    Splits files of Jeff's data into shards and writes the manifest of the
+    job. If the job has been planned before with the same arguments, its
+    manifest is kept, so that the shards done so far are not redone.
+
+    Args:
+        input_files: Paths to the csvs with Jeff's data.
+        job_dir: The directory of the job. It is created if it does not
+            exist.
+        shard_size: The number of rows in each shard.
+        discard_unusual_events: If True, discards Davis Cup, Hopman Cup,
+            Fed Cup, Wildcard Playoffs [recommended].
+
+    Returns:
+        The manifest, with the "shards" as a list of dictionaries holding
+        the "id", "file", "first_row" and "n_rows" of each, and the "start"
+        and "stop" byte offsets of its rows in the file.
+    """
+
+    input_files = [os.path.abspath(x) for x in input_files]
+    options = {'input_files': input_files, 'shard_size': shard_size,
+               'discard_unusual_events': discard_unusual_events}
+
+    manifest_path = os.path.join(job_dir, _MANIFEST_FILE)
+
+    if os.path.exists(manifest_path):
+
+        manifest = read_manifest(job_dir)
+
+        if {x: manifest[x] for x in options} != options:
+            raise ValueError(f'The job in {job_dir} was planned with other '
+                             'arguments.')
+
+        return manifest
+
+    shards = list()
+
+    for cur_file in input_files:
+
+        with open(cur_file, 'rb') as csv_file:
+
+            # The header.
+            offset = len(csv_file.readline())
+            row = 0
+            start, first_row = offset, row
+
+            for cur_line in csv_file:
+
+                offset += len(cur_line)
+                row += 1
+
+                if row - first_row == shard_size:
+                    shards.append((cur_file, first_row, row, start, offset))
+                    start, first_row = offset, row
+
+            if row > first_row:
+                shards.append((cur_file, first_row, row, start, offset))
+
+    manifest = dict(options, shards=[
+        {'id': f'{i:05d}', 'file': cur_file, 'first_row': first_row,
+         'n_rows': stop_row - first_row, 'start': start, 'stop': stop}
+        for i, (cur_file, first_row, stop_row, start, stop)
+        in enumerate(shards)])
+
+    os.makedirs(os.path.join(job_dir, _SHARD_DIR), exist_ok=True)
+    _write_json(manifest_path, manifest)
+
+    return manifest
+
+
+def read_manifest(job_dir: str) -> Dict[str, Any]:
+    """Reads the manifest written by plan_job."""
+
+    with open(os.path.join(job_dir, _MANIFEST_FILE)) as manifest_file:
+        return json.load(manifest_file)
+
+
+def read_shard(shard: Dict[str, Any],
+               discard_unusual_events: bool = True) -> pd.DataFrame:
+    """
+    Reads the matches in a shard.
+
+    Args:
+        shard: The shard, from the manifest [see plan_job].
+        discard_unusual_events: If True, discards Davis Cup, Hopman Cup,
+            Fed Cup, Wildcard Playoffs [recommended].
+
+    Returns:
+        The matches, as returned by iter_sackmann_data, with the row number
+        in the file as the index.
+    """
+
+    with open(shard['file'], 'rb') as csv_file:
+        header = csv_file.readline()
+        csv_file.seek(shard['start'])
+        rows = csv_file.read(shard['stop'] - shard['start'])
+
+    chunks = list(iter_sackmann_data(
+        io.BytesIO(header + rows), chunk_size=max(1, shard['n_rows']),
+        discard_unusual_events=discard_unusual_events))
+
+    # Every row may have been discarded.
+    if len(chunks) == 0:
+        return pd.DataFrame(columns=list(SACKMANN_COLUMNS) + ['format'])
+
+    matches = pd.concat(chunks)
+    matches.index += shard['first_row']
+
+    return matches
+
+
+def process_shard(shard: Dict[str, Any],
+                  discard_unusual_events: bool = True,
+                  transition_cache: Optional[TransitionCache] = None) \
+        -> pd.DataFrame:
+    """
+    Validates and triages the matches in a shard.
+
+    Args:
+        shard: The shard, from the manifest [see plan_job].
+        discard_unusual_events: Passed on to read_shard.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+
+    Returns:
+        A DataFrame with the RESULT_COLUMNS, with one row per match.
+    """
+
+    matches = read_shard(shard, discard_unusual_events)
+    renderer = ScoreRenderer(score_only=True)
+    rows = list()
+
+    for cur_match in matches.itertuples():
+
+        validation_columns = (cur_match.server1, cur_match.server2,
+                              cur_match.pbp, cur_match.score,
+                              cur_match.tny_name)
+
+        matches_sack, final_state = validate_match(
+            *validation_columns, transition_cache=transition_cache)
+
+        if matches_sack:
+            triage_columns = (None, None, None, None, None)
+        else:
+            cur_triage = triage_match(*validation_columns,
+                                      transition_cache=transition_cache)
+            divergence = cur_triage.divergence
+
+            triage_columns = (
+                cur_triage.cause,
+                None if divergence is None else divergence.kind,
+                None if divergence is None else divergence.point,
+                cur_triage.other_format, cur_triage.swapped_game)
+
+        rows.append((
+            shard['file'], cur_match.Index, cur_match.pbp_id, cur_match.date,
+            cur_match.tny_name, cur_match.server1, cur_match.server2,
+            cur_match.score,
+            None if final_state is None
+            else renderer.render(final_state),
+            matches_sack, *triage_columns))
+
+    return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+
+def _lock_owner() -> str:
+    # What a process writes in the lock files it holds.
+
+    return f'{socket.gethostname()} {os.getpid()}'
+
+
+def _owns(lock_path: str) -> bool:
+    # Whether this process holds a lock, which another process may have
+    # taken over.
+
+    try:
+        with open(lock_path) as lock_file:
+            return lock_file.read() == _lock_owner()
+    except FileNotFoundError:
+        return False
+
+
+def _release(lock_path: str):
+    # Removes a lock, unless another process has taken it over.
+
+    if _owns(lock_path):
+        with suppress(FileNotFoundError):
+            os.remove(lock_path)
+
+
+def _claim(lock_path: str, stale_after: Optional[float]) -> bool:
+    # Creates the lock file of a shard, unless another process has. Locks
+    # not touched for stale_after seconds are left by processes which
+    # crashed, and are taken over.
+
+    try:
+        lock = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+
+        if stale_after is None:
+            return False
+
+        try:
+            age = time.time() - os.path.getmtime(lock_path)
+        except FileNotFoundError:
+            # The shard has just been finished.
+            return False
+
+        if age < stale_after:
+            return False
+
+        # Replace the lock rather than removing it, so that a lock created
+        # by another process in between is not lost. If several processes
+        # take it over at once, the last one holds it, although the others
+        # may process the shard too.
+        def write(temporary_path: str):
+            with open(temporary_path, 'w') as lock_file:
+                lock_file.write(_lock_owner())
+
+        _write_atomically(lock_path, write)
+
+        return _owns(lock_path)
+
+    with os.fdopen(lock, 'w') as lock_file:
+        lock_file.write(_lock_owner())
+
+    return True
+
+
+@contextmanager
+def _heartbeat(lock_path: str, interval: float):
+    # Touches a lock every interval seconds, so that other processes can
+    # tell it from the lock of a process which crashed.
+
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(interval):
+            with suppress(FileNotFoundError):
+                os.utime(lock_path)
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_shards(job_dir: str, stale_after: Optional[float] = None,
+               max_shards: Optional[int] = None,
+               heartbeat: float = 10) -> List[str]:
+    """
+    Processes the shards of a job which are neither done nor claimed by
+    another process, in the order of the manifest. Any number of processes
+    can run this at the same time.
+
+    Args:
+        job_dir: The directory of the job [see plan_job].
+        stale_after: If given, shards whose lock has not been touched for
+            this many seconds are taken to belong to a process which
+            crashed, and are processed again. It should be a few times the
+            heartbeat of all processes working on the job. Since results are
+            written atomically, a shard processed twice only costs time.
+        max_shards: If given, stop after processing this many shards.
+        heartbeat: How often to touch the lock of the shard being processed,
+            in seconds.
+
+    Returns:
+        The ids of the shards processed.
+    """
+
+    manifest = read_manifest(job_dir)
+    transition_cache = TransitionCache()
+
+    processed = list()
+
+    for cur_shard in manifest['shards']:
+
+        if max_shards is not None and len(processed) >= max_shards:
+            break
+
+        shard_id = cur_shard['id']
+        done_path = _shard_path(job_dir, shard_id, 'done')
+        lock_path = _shard_path(job_dir, shard_id, 'lock')
+
+        if os.path.exists(done_path) or not _claim(lock_path, stale_after):
+            continue
+
+        # The shard may have been finished after the first check.
+        if os.path.exists(done_path):
+            _release(lock_path)
+            continue
+
+        start_time = time.time()
+
+        with _heartbeat(lock_path, heartbeat):
+            results = process_shard(cur_shard,
+                                    manifest['discard_unusual_events'],
+                                    transition_cache)
+
+        _write_atomically(_shard_path(job_dir, shard_id, 'csv'),
+                          lambda x: results.to_csv(x, index=False))
+
+        # The checkpoint.
+        _write_json(done_path, {
+            'n_matches': len(results),
+            'n_mismatches': int((~results['matches_sack'].astype(bool))
+                                .sum()),
+            'seconds': time.time() - start_time,
+            'host': socket.gethostname(),
+            'pid': os.getpid()
+        })
+
+        _release(lock_path)
+        processed.append(shard_id)
+
+    return processed
+
+
+def run_local(job_dir: str, processes: int,
+              stale_after: Optional[float] = None,
+              heartbeat: float = 10) -> List[str]:
+    """
+    Runs a job with several processes on this machine, standing in for
+    several machines [see run_shards].
+
+    Args:
+        job_dir: The directory of the job [see plan_job].
+        processes: The number of processes.
+        stale_after: Passed on to run_shards.
+        heartbeat: Passed on to run_shards.
+
+    Returns:
+        The ids of the shards processed, by all processes.
+    """
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(run_shards, job_dir, stale_after,
+                                   heartbeat=heartbeat)
+                   for _ in range(processes)]
+
+        return [x for cur_future in futures for x in cur_future.result()]
+
+
+def pending_shards(job_dir: str) -> List[str]:
+    """Returns the ids of the shards of a job which are not done yet."""
+
+    return [x['id'] for x in read_manifest(job_dir)['shards']
+            if not os.path.exists(_shard_path(job_dir, x['id'], 'done'))]
+
+
+def merge_job(job_dir: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Combines the results of all the shards of a job, and writes them to
+    matches.csv and mismatches.csv in the job's directory.
+
+    Args:
+        job_dir: The directory of the job [see plan_job].
+
+    Returns:
+        A tuple with the results of all matches, and those of the matches
+        which did not parse to Jeff's score, with the RESULT_COLUMNS, in the
+        order of the manifest.
+    """
+
+    pending = pending_shards(job_dir)
+
+    if len(pending) > 0:
+        raise ValueError(f'{len(pending)} shards are not done yet, such as '
+                         f'{pending[0]}.')
+
+    shard_results = [
+        pd.read_csv(_shard_path(job_dir, x['id'], 'csv'),
+                    dtype={'point': 'Int64', 'swapped_game': 'Int64'})
+        for x in read_manifest(job_dir)['shards']]
+
+    if len(shard_results) > 0:
+        matches = pd.concat(shard_results, ignore_index=True)
+    else:
+        matches = pd.DataFrame(columns=RESULT_COLUMNS)
+
+    mismatches = matches[~matches['matches_sack'].astype(bool)] \
+        .reset_index(drop=True)
+
+    for cur_file, cur_results in [(_MATCHES_FILE, matches),
+                                  (_MISMATCHES_FILE, mismatches)]:
+        _write_atomically(os.path.join(job_dir, cur_file),
+                          lambda x: cur_results.to_csv(x, index=False))
+
+    return matches, mismatches
@@ -0,0 +1,461 @@
+import asyncio
+import random
+from typing import (AsyncIterable, AsyncIterator, Iterable, NamedTuple,
+                    Optional, Set)
+from .match_parser import MatchParser
+from .match_state import CompactMatchState
+from .format_functions import FormatFunctions
+from .transition_cache import TransitionCache
+from .utils import ScoreRenderer, create_start_match_state
+from .synthetic import random_win_loss
+import point_parser.formats as fmts
+
+"""
+This module scores many live matches at once with asyncio.
+
+A LiveScorer keeps one MatchParser per match. Point events are fed to it one
+at a time with publish, or from an async iterable with consume, and each
+updated state is sent to the subscribers of the match. Each subscriber has a
+bounded queue: once it is full, publishing waits until the subscriber has
+caught up, so that a slow subscriber slows down ingestion rather than using
+ever more memory.
+
+Example::
+
+    scorer = LiveScorer()
+    scorer.add_match('m1', 'Roger Federer', 'Rafael Nadal',
+                     fmts.classic_slam_format_men)
+
+    async def print_scores():
+        async with scorer.subscribe() as subscription:
+            async for cur_update in subscription:
+                print(cur_update.match_id, cur_update.score)
+
+    async def main():
+        printer = asyncio.create_task(print_scores())
+        await scorer.consume(point_events)
+        scorer.close()
+        await printer
+
+FeedSimulator produces point events for many random matches, for testing.
+"""
+
+
+class PointEvent(NamedTuple):
+    """A point played in a live match."""
+
+    match_id: str
+
+    # Whether or not the server won the point.
+    server_won: bool
+
+
+class StateUpdate(NamedTuple):
+    """The state of a match after a point, as sent to subscribers."""
+
+    match_id: str
+
+    # The number of points played so far.
+    n_points: int
+
+    state: CompactMatchState
+
+    # The score, as rendered by match_summary_string, or None if the scorer
+    # does not render scores.
+    score: Optional[str]
+
+
+# Put in a subscription's queue when it is closed, to wake up its reader.
+_CLOSED = None
+
+
+class Subscription:
+    """
+    The updates for some or all matches, as an async iterator. Once the
+    subscription or the scorer is closed, iteration ends after the updates
+    already in the queue.
+    """
+
+    def __init__(self, scorer: 'LiveScorer',
+                 match_ids: Optional[Set[str]], max_size: int):
+
+        self.match_ids = match_ids
+        self.queue = asyncio.Queue(maxsize=max_size)
+        self.closed = False
+
+        self._scorer = scorer
+
+        # Set when the subscription is closed, to release publishers waiting
+        # for room in the queue.
+        self._closed_event = asyncio.Event()
+
+    def __aiter__(self) -> 'Subscription':
+
+        return self
+
+    async def __anext__(self) -> StateUpdate:
+
+        if self.closed and self.queue.empty():
+            raise StopAsyncIteration
+
+        update = await self.queue.get()
+
+        if update is _CLOSED:
+            raise StopAsyncIteration
+
+        return update
+
+    def close(self):
+        """Stops receiving updates."""
+
+        if self.closed:
+            return
+
+        self.closed = True
+        self._closed_event.set()
+        self._scorer._unsubscribe(self)
+
+        # If the queue is full, the reader is not waiting for it, and will
+        # stop once it has read the updates left.
+        try:
+            self.queue.put_nowait(_CLOSED)
+        except asyncio.QueueFull:
+            pass
+
+    async def _put(self, update: StateUpdate):
+        # Waits for room in the queue to put the update in, unless the
+        # subscription is closed first.
+
+        put = asyncio.ensure_future(self.queue.put(update))
+        closed = asyncio.ensure_future(self._closed_event.wait())
+
+        _, pending = await asyncio.wait(
+            [put, closed], return_when=asyncio.FIRST_COMPLETED)
+
+        for cur_pending in pending:
+            cur_pending.cancel()
+
+    async def __aenter__(self) -> 'Subscription':
+
+        return self
+
+    async def __aexit__(self, *args):
+
+        self.close()
+
+
+class _LiveMatch:
+
+    __slots__ = ('parser', 'renderer', 'subscribers')
+
+    def __init__(self, parser: MatchParser,
+                 renderer: Optional[ScoreRenderer]):
+
+        self.parser = parser
+        self.renderer = renderer
+        self.subscribers = list()
+
+
+class LiveScorer:
+    """
+    Parses point events for many matches at once and publishes the updated
+    states to subscribers [see the module docstring].
+    """
+
+    def __init__(self, transition_cache: Optional[TransitionCache] = None,
+                 render_scores: bool = True, score_only: bool = False):
+        """
+        Args:
+            transition_cache: The TransitionCache shared by all the parsers.
+                By default, a new one.
+            render_scores: Whether to render the score of each update [see
+                StateUpdate].
+            score_only: If True, the scores do not include the names of the
+                server & returner.
+        """
+
+        self.transition_cache = (TransitionCache() if transition_cache is None
+                                 else transition_cache)
+        self.render_scores = render_scores
+        self.score_only = score_only
+
+        self.n_events = 0
+
+        self._matches = dict()
+
+        # All the subscriptions, and those to all matches.
+        self._subscriptions = list()
+        self._all_match_subscriptions = list()
+
+    def __len__(self) -> int:
+
+        return len(self._matches)
+
+    def __contains__(self, match_id: str) -> bool:
+
+        return match_id in self._matches
+
+    def add_match(self, match_id: str, first_server: str,
+                  first_returner: str,
+                  format_functions: FormatFunctions,
+                  match_state: Optional[CompactMatchState] = None):
+        """
+        Starts scoring a match.
+
+        Args:
+            match_id: The id used in the match's point events.
+            first_server: The first server in the match.
+            first_returner: The first returner in the match.
+            format_functions: The functions encoding the rules of the match.
+            match_state: Optionally, the current state of the match, if it
+                is already under way. Can also be a MatchState.
+        """
+
+        if match_id in self._matches:
+            raise ValueError(f'Match {match_id} is already being scored.')
+
+        if match_state is None:
+            match_state = create_start_match_state(first_server,
+                                                   first_returner)
+
+        parser = MatchParser(match_state, format_functions,
+                             self.transition_cache)
+        renderer = (ScoreRenderer(self.score_only) if self.render_scores
+                    else None)
+
+        live_match = _LiveMatch(parser, renderer)
+
+        # Subscribers to this match which subscribed before it was added.
+        live_match.subscribers = [
+            x for x in self._subscriptions
+            if x.match_ids is not None and match_id in x.match_ids]
+
+        self._matches[match_id] = live_match
+
+    def remove_match(self, match_id: str):
+        """Stops scoring a match."""
+
+        del self._matches[match_id]
+
+    def state(self, match_id: str) -> CompactMatchState:
+        """Returns the current state of a match."""
+
+        return self._matches[match_id].parser.state
+
+    def subscribe(self, match_ids: Optional[Iterable[str]] = None,
+                  max_size: int = 1024) -> Subscription:
+        """
+        Subscribes to updates.
+
+        Args:
+            match_ids: The matches to receive updates for. By default, all
+                of them, including those added later.
+            max_size: The number of updates which can be waiting in the
+                subscription's queue before publishing has to wait.
+
+        Returns:
+            The Subscription.
+        """
+
+        subscription = Subscription(
+            self, None if match_ids is None else set(match_ids), max_size)
+
+        self._subscriptions.append(subscription)
+
+        if match_ids is None:
+            self._all_match_subscriptions.append(subscription)
+        else:
+            for cur_match_id in subscription.match_ids:
+                if cur_match_id in self._matches:
+                    self._matches[cur_match_id].subscribers.append(
+                        subscription)
+
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+
+        self._subscriptions.remove(subscription)
+
+        if subscription.match_ids is None:
+            self._all_match_subscriptions.remove(subscription)
+        else:
+            for cur_match_id in subscription.match_ids:
+                if cur_match_id in self._matches:
+                    self._matches[cur_match_id].subscribers.remove(
+                        subscription)
+
+    async def publish(self, event: PointEvent) -> StateUpdate:
+        """
+        Parses a point and sends the updated state to the subscribers,
+        waiting for room in their queues if necessary. Matches are removed
+        once they are over.
+
+        Args:
+            event: The point.
+
+        Returns:
+            The update sent to the subscribers.
+        """
+
+        match_id, server_won = event
+        live_match = self._matches[match_id]
+
+        state = live_match.parser.push(server_won)
+
+        update = StateUpdate(
+            match_id, live_match.parser.n_points, state,
+            None if live_match.renderer is None
+            else live_match.renderer.render(state))
+
+        self.n_events += 1
+
+        if state.is_over:
+            del self._matches[match_id]
+
+        # Subscriptions can be closed while waiting below, so go through
+        # copies of the lists.
+        subscriptions = (list(self._all_match_subscriptions) +
+                         list(live_match.subscribers))
+
+        for cur_subscription in subscriptions:
+
+            if cur_subscription.closed:
+                continue
+
+            try:
+                cur_subscription.queue.put_nowait(update)
+            except asyncio.QueueFull:
+                # Wait for the subscriber to catch up, or to close.
+                await cur_subscription._put(update)
+
+        return update
+
+    async def consume(self, events: AsyncIterable[PointEvent]) -> int:
+        """
+        Publishes all the events of an async iterable [see queue_events to
+        consume an asyncio.Queue].
+
+        Args:
+            events: The point events.
+
+        Returns:
+            The number of events published.
+        """
+
+        n_events = 0
+
+        async for cur_event in events:
+            await self.publish(cur_event)
+            n_events += 1
+
+        return n_events
+
+    def close(self):
+        """Closes all the subscriptions [see Subscription.close]."""
+
+        for cur_subscription in list(self._subscriptions):
+            cur_subscription.close()
+
+
+async def queue_events(queue: asyncio.Queue) -> AsyncIterator[PointEvent]:
+    """
+    Yields the point events put in a queue, until None is put in it.
+    """
+
+    while True:
+
+        event = await queue.get()
+
+        if event is None:
+            return
+
+        yield event
+
+
+class FeedSimulator:
+    """
+    Random live matches, for testing a LiveScorer.
+
+    The points of the matches are interleaved at random, as if they were all
+    being played at the same time.
+
+    Example::
+
+        feeds = FeedSimulator(1000, seed=0)
+        feeds.add_matches(scorer)
+
+        await scorer.consume(feeds.events())
+    """
+
+    def __init__(self, n_matches: int,
+                 format_functions: FormatFunctions =
+                 fmts.standard_best_of_three,
+                 serve_prob: float = 0.63,
+                 seed: Optional[int] = None,
+                 points_per_yield: int = 100):
+        """
+        Args:
+            n_matches: The number of matches.
+            format_functions: The format of all the matches.
+            serve_prob: The probability of the server winning each point.
+            seed: The random seed. The same seed gives the same events.
+            points_per_yield: How often to hand control back to the event
+                loop, as a real feed would while waiting for data.
+        """
+
+        self.format_functions = format_functions
+        self.points_per_yield = points_per_yield
+
+        self._rng = random.Random(seed)
+
+        # The win/loss vector of each match, by match id.
+        self.matches = {
+            f'match_{i}': random_win_loss(serve_prob, format_functions,
+                                          self._rng)
+            for i in range(n_matches)}
+
+    @property
+    def n_points(self) -> int:
+
+        return sum(len(x) for x in self.matches.values())
+
+    def add_matches(self, scorer: LiveScorer):
+        """Adds all the matches to a scorer."""
+
+        for cur_match_id in self.matches:
+            scorer.add_match(cur_match_id, f'{cur_match_id}_p1',
+                             f'{cur_match_id}_p2', self.format_functions)
+
+    def iter_events(self) -> Iterable[PointEvent]:
+        """Yields the point events of all the matches, interleaved."""
+
+        positions = {x: 0 for x in self.matches}
+        live = list(self.matches)
+
+        while live:
+
+            # Pick a random match which is still going.
+            cur_index = self._rng.randrange(len(live))
+            cur_match_id = live[cur_index]
+
+            win_loss = self.matches[cur_match_id]
+            position = positions[cur_match_id]
+
+            yield PointEvent(cur_match_id, win_loss[position])
+
+            positions[cur_match_id] = position + 1
+
+            if position + 1 == len(win_loss):
+                live[cur_index] = live[-1]
+                live.pop()
+
+    async def events(self) -> AsyncIterator[PointEvent]:
+        """Yields the point events as an async iterator [see iter_events].
+        """
+
+        for cur_event_num, cur_event in enumerate(self.iter_events()):
+
+            if cur_event_num % self.points_per_yield == 0:
+                await asyncio.sleep(0)
+
+            yield cur_event
@@ -1,9 +1,27 @@
 from typing import Tuple
-from copy import deepcopy
-from .match_state import MatchState, CompletedSet
+from dataclasses import replace
+from .match_state import (MatchState, CompletedSet, CompactMatchState,
+                          CompactSet)
 from .format_functions import FormatFunctions
 
 
+def copy_match_state(match_state: MatchState) -> MatchState:
+    """
+    Copies a MatchState so that its scores can be updated without affecting
+    the original.
+
+    This is much cheaper than a deepcopy: only the score dictionaries and the
+    list of past sets are copied. The CompletedSets themselves are shared,
+    since they are never modified once created.
+    """
+
+    return replace(match_state,
+                   cur_set_score=dict(match_state.cur_set_score),
+                   cur_game_score=dict(match_state.cur_game_score),
+                   sets_won=dict(match_state.sets_won),
+                   past_sets=list(match_state.past_sets))
+
+
 def player_wins_set(
         match_state: MatchState,
         winning_player: str,
@@ -23,7 +41,7 @@ def player_wins_set(
         The updated MatchState.
     """
 
-    match_state = deepcopy(match_state)
+    match_state = copy_match_state(match_state)
 
     match_state.sets_won[winning_player] += 1
     match_state.past_sets.append(
@@ -63,7 +81,7 @@ def player_wins_game(match_state: MatchState,
         The updated MatchState.
     """
 
-    match_state = deepcopy(match_state)
+    match_state = copy_match_state(match_state)
 
     match_state.cur_set_score[winning_player] += 1
     match_state.total_games_played += 1
@@ -84,6 +102,9 @@ def player_wins_game(match_state: MatchState,
         match_state = player_wins_set(match_state, winning_player,
                                       losing_player, format_functions)
 
+        # A new set may start with a tiebreak, as in a match tiebreak.
+        is_final_set = format_functions.is_final_set(match_state.set_num)
+
     match_state.is_tiebreak = format_functions.is_tiebreak_fun(
         match_state.cur_set_score[winning_player],
         match_state.cur_set_score[losing_player],
@@ -110,7 +131,7 @@ def advance_tiebreak(server_won: bool,
         The updated MatchState.
     """
 
-    match_state = deepcopy(match_state)
+    match_state = copy_match_state(match_state)
 
     # Advance the game score
     if server_won:
@@ -174,7 +195,7 @@ def advance_service_game(server_won: bool,
         The updated MatchState.
     """
 
-    match_state = deepcopy(match_state)
+    match_state = copy_match_state(match_state)
 
     # Advance the game score
     if server_won:
@@ -194,3 +215,102 @@ def advance_service_game(server_won: bool,
                                        losing_player, format_functions)
 
     return match_state
+
+
+def advance_compact_state(server_won: bool,
+                          match_state: CompactMatchState,
+                          format_functions: FormatFunctions) \
+        -> CompactMatchState:
+    """
+    Advances a CompactMatchState, taking into account that the server has
+    either just won or lost the point.
+
+    This follows exactly the same rules as advance_service_game and
+    advance_tiebreak, but since the state is immutable, it only allocates the
+    few tuples that change rather than copying the whole state.
+
+    Args:
+        server_won: Whether or not the server won the point.
+        match_state: The current state of the match.
+        format_functions: The functions encoding the match format.
+
+    Returns:
+        The updated CompactMatchState.
+    """
+
+    (players, server, is_tiebreak, set_num, total_games_played,
+     cur_set_score, cur_game_score, sets_won, past_sets,
+     is_over) = match_state
+
+    returner = 1 - server
+    winner, loser = (server, returner) if server_won else (returner, server)
+
+    # Advance the game score
+    if winner == 0:
+        cur_game_score = (cur_game_score[0] + 1, cur_game_score[1])
+    else:
+        cur_game_score = (cur_game_score[0], cur_game_score[1] + 1)
+
+    if is_tiebreak:
+        game_over = format_functions.tiebreak_over(
+            cur_game_score[server], cur_game_score[returner],
+            format_functions.is_final_set(set_num))
+    else:
+        game_over = format_functions.service_game_over(
+            cur_game_score[server], cur_game_score[returner])
+
+    if not game_over:
+
+        if is_tiebreak:
+            # Adjust who's serving
+            start_server, start_returner = \
+                format_functions.roles_at_game_start(total_games_played, 0, 1)
+            server = format_functions.tiebreak_roles(
+                cur_game_score[0] + cur_game_score[1], start_server,
+                start_returner)[0]
+
+        return CompactMatchState(
+            players, server, is_tiebreak, set_num, total_games_played,
+            cur_set_score, cur_game_score, sets_won, past_sets, is_over)
+
+    # The winner has won the game
+    if winner == 0:
+        cur_set_score = (cur_set_score[0] + 1, cur_set_score[1])
+    else:
+        cur_set_score = (cur_set_score[0], cur_set_score[1] + 1)
+
+    total_games_played += 1
+
+    server = format_functions.roles_at_game_start(total_games_played, 0, 1)[0]
+
+    is_final_set = format_functions.is_final_set(set_num)
+
+    # Check whether the winner won the set
+    if format_functions.set_win_condition(
+            cur_set_score[winner], cur_set_score[loser], is_final_set):
+
+        if winner == 0:
+            sets_won = (sets_won[0] + 1, sets_won[1])
+        else:
+            sets_won = (sets_won[0], sets_won[1] + 1)
+
+        past_sets = past_sets + (CompactSet(
+            player_scores=cur_set_score,
+            tiebreak_score=cur_game_score if is_tiebreak else None),)
+
+        if not format_functions.match_over_fun(sets_won[winner],
+                                               sets_won[loser]):
+            set_num += 1
+            cur_set_score = (0, 0)
+
+            # A new set may start with a tiebreak, as in a match tiebreak.
+            is_final_set = format_functions.is_final_set(set_num)
+        else:
+            is_over = True
+
+    is_tiebreak = format_functions.is_tiebreak_fun(
+        cur_set_score[winner], cur_set_score[loser], is_final_set)
+
+    return CompactMatchState(
+        players, server, is_tiebreak, set_num, total_games_played,
+        cur_set_score, (0, 0), sets_won, past_sets, is_over)
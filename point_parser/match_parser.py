@@ -0,0 +1,212 @@
+import struct
+from typing import Iterable, List, Optional
+from .match_state import MatchState, CompactMatchState, CompactSet
+from .format_functions import FormatFunctions
+from .manipulate_match_state import advance_compact_state
+from .transition_cache import TransitionCache
+import point_parser.formats as fmts
+
+# Layout of a snapshot: a version number, the format code (255 if the format
+# is not in formats.FORMATS), the number of points parsed, the scoring fields
+# and the number of past sets. This is followed by each past set and then by
+# the two names, each preceded by its length.
+_HEADER = struct.Struct('<BBIB?BHHHHHBB?B')
+_PAST_SET = struct.Struct('<HH?HH')
+_NAME_LENGTH = struct.Struct('<H')
+
+_SNAPSHOT_VERSION = 1
+_NO_FORMAT_CODE = 255
+
+
+class MatchParser:
+    """
+    Parses a match incrementally, one point at a time, as is needed for live
+    scoring.
+
+    Each point costs the same as any other, regardless of how many points came
+    before it. The parser's state can be saved to bytes with snapshot() and
+    picked up again, for example by another process, with restore().
+
+    Example::
+
+        parser = MatchParser(
+            utils.create_start_match_state('Roger Federer', 'Rafael Nadal'),
+            fmts.standard_best_of_three)
+
+        parser.push(True)
+        state = parser.push(False)
+
+        data = parser.snapshot()
+        parser = MatchParser.restore(data)
+    """
+
+    def __init__(self, match_state: MatchState,
+                 format_functions: FormatFunctions,
+                 transition_cache: Optional[TransitionCache] = None):
+        """
+        Args:
+            match_state: The state of the match before the first point to be
+                pushed. Can be a MatchState or a CompactMatchState.
+            format_functions: The functions encoding the rules of the match
+                [see formats.py for examples].
+            transition_cache: Optionally, a TransitionCache to speed up
+                parsing.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        self.state = match_state
+        self.format_functions = format_functions
+        self.n_points = 0
+
+        self._advance = (advance_compact_state if transition_cache is None
+                         else transition_cache.advance)
+
+    @property
+    def match_state(self) -> MatchState:
+        """The current state, as a MatchState."""
+
+        return self.state.to_match_state()
+
+    def push(self, server_won: bool) -> CompactMatchState:
+        """
+        Advances the match by one point.
+
+        Args:
+            server_won: Whether or not the server won the point.
+
+        Returns:
+            The new state of the match. Use its to_match_state method to get a
+            MatchState.
+        """
+
+        # The match better not be over if there are points left!
+        assert not self.state.is_over
+
+        self.state = self._advance(server_won, self.state,
+                                   self.format_functions)
+        self.n_points += 1
+
+        return self.state
+
+    def push_many(self, win_loss_vector: Iterable[bool]) \
+            -> List[CompactMatchState]:
+        """
+        Advances the match by several points.
+
+        Args:
+            win_loss_vector: True and False indicating whether the server won
+                or lost each point.
+
+        Returns:
+            The new state of the match after each point.
+        """
+
+        return [self.push(x) for x in win_loss_vector]
+
+    def snapshot(self) -> bytes:
+        """
+        Saves the parser's state in a compact binary form.
+
+        The format itself cannot be saved, so only its code is stored if it is
+        one of formats.FORMATS. Otherwise, it has to be passed to restore.
+
+        Returns:
+            The snapshot, to be passed to restore.
+        """
+
+        try:
+            format_code = fmts.format_code(self.format_functions)
+        except ValueError:
+            format_code = _NO_FORMAT_CODE
+
+        state = self.state
+
+        data = [_HEADER.pack(
+            _SNAPSHOT_VERSION, format_code, self.n_points, state.server,
+            state.is_tiebreak, state.set_num, state.total_games_played,
+            *state.cur_set_score, *state.cur_game_score, *state.sets_won,
+            state.is_over, len(state.past_sets))]
+
+        for cur_set in state.past_sets:
+            data.append(_PAST_SET.pack(
+                *cur_set.player_scores, cur_set.tiebreak_score is not None,
+                *(cur_set.tiebreak_score or (0, 0))))
+
+        for cur_name in state.players:
+            encoded = cur_name.encode('utf-8')
+            data.append(_NAME_LENGTH.pack(len(encoded)) + encoded)
+
+        return b''.join(data)
+
+    @classmethod
+    def restore(cls, data: bytes,
+                format_functions: Optional[FormatFunctions] = None,
+                transition_cache: Optional[TransitionCache] = None) \
+            -> 'MatchParser':
+        """
+        Creates a parser from a snapshot.
+
+        Args:
+            data: The bytes returned by snapshot.
+            format_functions: The format of the match. Only needed if it is
+                not one of formats.FORMATS.
+            transition_cache: Optionally, a TransitionCache to speed up
+                parsing.
+
+        Returns:
+            A MatchParser in the same state as the one which took the
+            snapshot.
+        """
+
+        (version, format_code, n_points, server, is_tiebreak, set_num,
+         total_games_played, set_p1, set_p2, game_p1, game_p2, sets_p1,
+         sets_p2, is_over, n_past_sets) = _HEADER.unpack_from(data)
+
+        assert version == _SNAPSHOT_VERSION
+
+        if format_functions is None:
+            assert format_code != _NO_FORMAT_CODE
+            format_functions = list(fmts.FORMATS.values())[format_code]
+
+        offset = _HEADER.size
+        past_sets = list()
+
+        for _ in range(n_past_sets):
+
+            (games_p1, games_p2, had_tiebreak, tiebreak_p1,
+             tiebreak_p2) = _PAST_SET.unpack_from(data, offset)
+            offset += _PAST_SET.size
+
+            past_sets.append(CompactSet(
+                player_scores=(games_p1, games_p2),
+                tiebreak_score=((tiebreak_p1, tiebreak_p2) if had_tiebreak
+                                else None)))
+
+        players = list()
+
+        for _ in range(2):
+
+            length, = _NAME_LENGTH.unpack_from(data, offset)
+            offset += _NAME_LENGTH.size
+            players.append(data[offset:offset + length].decode('utf-8'))
+            offset += length
+
+        state = CompactMatchState(
+            players=tuple(players),
+            server=server,
+            is_tiebreak=is_tiebreak,
+            set_num=set_num,
+            total_games_played=total_games_played,
+            cur_set_score=(set_p1, set_p2),
+            cur_game_score=(game_p1, game_p2),
+            sets_won=(sets_p1, sets_p2),
+            past_sets=tuple(past_sets),
+            is_over=is_over
+        )
+
+        parser = cls(state, format_functions, transition_cache)
+        parser.n_points = n_points
+
+        return parser
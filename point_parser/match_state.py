@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import List, Dict, NamedTuple, Optional, Tuple
 
 
 @dataclass
@@ -41,3 +41,108 @@ class MatchState:
         self.cur_set_score = {self.server: 0, self.returner: 0}
 
     is_over: bool
+
+
+class CompactSet(NamedTuple):
+    """A completed set, with scores indexed by player [see CompactMatchState].
+    """
+
+    player_scores: Tuple[int, int]
+    tiebreak_score: Optional[Tuple[int, int]]
+
+
+class CompactMatchState(NamedTuple):
+    """
+    An immutable and compact counterpart to MatchState.
+
+    Players are referred to by their index into `players`: 0 is the first
+    server and 1 the first returner. All the scores are pairs indexed in the
+    same way. Since nothing is ever mutated, consecutive states share
+    everything that did not change; in particular, all states within a set
+    share the same `past_sets` tuple, which is only extended when a set ends.
+    """
+
+    players: Tuple[str, str]
+    server: int
+    is_tiebreak: bool
+
+    set_num: int
+    total_games_played: int
+
+    cur_set_score: Tuple[int, int]
+    cur_game_score: Tuple[int, int]
+
+    sets_won: Tuple[int, int]
+    past_sets: Tuple[CompactSet, ...]
+
+    is_over: bool
+
+    @property
+    def returner(self) -> int:
+
+        return 1 - self.server
+
+    def to_match_state(self) -> MatchState:
+        """
+        Expands the compact state into the equivalent MatchState.
+        """
+
+        p1, p2 = self.players
+
+        past_sets = [
+            CompletedSet(
+                player_scores={p1: cur_set.player_scores[0],
+                               p2: cur_set.player_scores[1]},
+                tiebreak_score=(None if cur_set.tiebreak_score is None else
+                                {p1: cur_set.tiebreak_score[0],
+                                 p2: cur_set.tiebreak_score[1]}))
+            for cur_set in self.past_sets]
+
+        return MatchState(
+            server=self.players[self.server],
+            returner=self.players[1 - self.server],
+            is_tiebreak=self.is_tiebreak,
+            first_server=p1,
+            first_returner=p2,
+            set_num=self.set_num,
+            total_games_played=self.total_games_played,
+            cur_set_score={p1: self.cur_set_score[0],
+                           p2: self.cur_set_score[1]},
+            cur_game_score={p1: self.cur_game_score[0],
+                            p2: self.cur_game_score[1]},
+            sets_won={p1: self.sets_won[0], p2: self.sets_won[1]},
+            past_sets=past_sets,
+            is_over=self.is_over
+        )
+
+    @classmethod
+    def from_match_state(cls, match_state: MatchState) \
+            -> 'CompactMatchState':
+        """
+        Creates the compact equivalent of a MatchState.
+        """
+
+        players = (match_state.first_server, match_state.first_returner)
+
+        def to_pair(scores):
+            return (scores[players[0]], scores[players[1]])
+
+        past_sets = tuple(
+            CompactSet(
+                player_scores=to_pair(cur_set.player_scores),
+                tiebreak_score=(None if cur_set.tiebreak_score is None else
+                                to_pair(cur_set.tiebreak_score)))
+            for cur_set in match_state.past_sets)
+
+        return cls(
+            players=players,
+            server=players.index(match_state.server),
+            is_tiebreak=match_state.is_tiebreak,
+            set_num=match_state.set_num,
+            total_games_played=match_state.total_games_played,
+            cur_set_score=to_pair(match_state.cur_set_score),
+            cur_game_score=to_pair(match_state.cur_game_score),
+            sets_won=to_pair(match_state.sets_won),
+            past_sets=past_sets,
+            is_over=match_state.is_over
+        )
@@ -1,14 +1,142 @@
-from typing import List
-from .match_state import MatchState
+from typing import Iterable, Iterator, List, Optional
+from .match_state import MatchState, CompactMatchState
 from .format_functions import FormatFunctions
-from .manipulate_match_state import advance_tiebreak, advance_service_game
+from .manipulate_match_state import advance_compact_state
 from .utils import match_summary_string
+from .transition_cache import TransitionCache
 
 
-def process_win_loss_vector(win_loss_vector: List[bool],
+def iter_compact_states(win_loss_vector: Iterable[bool],
+                        match_state: CompactMatchState,
+                        format_functions: FormatFunctions,
+                        transition_cache: Optional[TransitionCache] = None) \
+        -> Iterator[CompactMatchState]:
+    """
+    Lazily parses a boolean sequence of wins and losses, yielding the
+    CompactMatchState implied by each point in turn.
+
+    This is the engine behind iter_match_states. Use it directly when the
+    expanded MatchStates are not needed, since it avoids creating them.
+
+    Args:
+        win_loss_vector: An iterable of True and False indicating whether the
+            server won or lost the point.
+        match_state: The state of the match before the updates in the vector.
+        format_functions: The functions encoding the rules of the match [see
+            formats.py for examples].
+        transition_cache: Optionally, a TransitionCache to look the updates
+            up in rather than re-evaluating the format functions each time.
+
+    Yields:
+        The CompactMatchState after each point.
+    """
+
+    advance = (advance_compact_state if transition_cache is None else
+               transition_cache.advance)
+
+    for cur_win_loss in win_loss_vector:
+
+        # The match better not be over if there are points left!
+        assert not match_state.is_over
+
+        match_state = advance(cur_win_loss, match_state, format_functions)
+
+        yield match_state
+
+
+def final_compact_state(win_loss_vector: Iterable[bool],
+                        match_state: CompactMatchState,
+                        format_functions: FormatFunctions,
+                        transition_cache: Optional[TransitionCache] = None) \
+        -> CompactMatchState:
+    """
+    Parses a boolean sequence of wins and losses, keeping only the state
+    after the last point. This is the same as the last state yielded by
+    iter_compact_states, but faster, and its memory use does not depend on
+    the length of the match.
+
+    Args:
+        win_loss_vector: An iterable of True and False indicating whether the
+            server won or lost the point.
+        match_state: The state of the match before the updates in the vector.
+        format_functions: The functions encoding the rules of the match [see
+            formats.py for examples].
+        transition_cache: Optionally, a TransitionCache to look the updates
+            up in rather than re-evaluating the format functions each time.
+
+    Returns:
+        The CompactMatchState after the last point, or match_state if there
+        are no points.
+    """
+
+    advance = (advance_compact_state if transition_cache is None else
+               transition_cache.advance)
+
+    for cur_win_loss in win_loss_vector:
+
+        # The match better not be over if there are points left!
+        assert not match_state.is_over
+
+        match_state = advance(cur_win_loss, match_state, format_functions)
+
+    return match_state
+
+
+def iter_match_states(win_loss_vector: Iterable[bool],
+                      match_state: MatchState,
+                      format_functions: FormatFunctions,
+                      debug_print_each_point: bool = False,
+                      transition_cache: Optional[TransitionCache] = None) \
+        -> Iterator[MatchState]:
+    """
+    Lazily parses a boolean sequence of wins and losses, yielding the
+    MatchState implied by each point in turn.
+
+    This runs in linear time and constant stack depth, so it can be used on
+    matches of any length, and on vectors which are still being produced
+    (e.g. a generator).
+
+    Args:
+        win_loss_vector: An iterable of True and False indicating whether the
+            server won or lost the point.
+        match_state: The state of the match before the updates in the vector.
+        format_functions: The functions encoding the rules of the match [see
+            formats.py for examples].
+        debug_print_each_point: Optionally print the result of each update for
+            debugging purposes.
+        transition_cache: Optionally, a TransitionCache to look the updates
+            up in rather than re-evaluating the format functions each time.
+
+    Yields:
+        The MatchState after each point.
+    """
+
+    advance = (advance_compact_state if transition_cache is None else
+               transition_cache.advance)
+
+    compact_state = CompactMatchState.from_match_state(match_state)
+
+    for cur_win_loss in win_loss_vector:
+
+        # The match better not be over if there are points left!
+        assert not compact_state.is_over
+
+        compact_state = advance(cur_win_loss, compact_state, format_functions)
+        match_state = compact_state.to_match_state()
+
+        if debug_print_each_point:
+            print(cur_win_loss)
+            print(match_summary_string(match_state))
+
+        yield match_state
+
+
+def process_win_loss_vector(win_loss_vector: Iterable[bool],
                             match_state: MatchState,
                             format_functions: FormatFunctions,
-                            debug_print_each_point: bool = False) \
+                            debug_print_each_point: bool = False,
+                            transition_cache:
+                            Optional[TransitionCache] = None) \
         -> List[MatchState]:
     """
     Parses a boolean sequence of wins and losses and returns the sequence of
@@ -22,6 +150,8 @@ def process_win_loss_vector(win_loss_vector: List[bool],
             formats.py for examples].
         debug_print_each_point: Optionally print the result of each update for
             debugging purposes.
+        transition_cache: Optionally, a TransitionCache to look the updates
+            up in rather than re-evaluating the format functions each time.
 
     Returns:
         A list of MatchStates, each representing the result of each update
@@ -48,29 +178,6 @@ def process_win_loss_vector(win_loss_vector: List[bool],
 
     """
 
-    # TODO: Check whether base case etc. really make sense.
-
-    # We're done if there are no more points to advance.
-    if len(win_loss_vector) == 0:
-        return []
-
-    # Otherwise, the match better not be over!
-    assert not match_state.is_over
-
-    cur_win_loss = win_loss_vector[0]
-
-    if match_state.is_tiebreak:
-        match_state = advance_tiebreak(cur_win_loss, match_state,
-                                       format_functions)
-    else:
-        match_state = advance_service_game(cur_win_loss, match_state,
-                                           format_functions)
-
-    if debug_print_each_point:
-        print(cur_win_loss)
-        print(match_summary_string(match_state))
-
-    # Recurse
-    return [match_state] + process_win_loss_vector(
-        win_loss_vector[1:], match_state, format_functions,
-        debug_print_each_point)
+    return list(iter_match_states(win_loss_vector, match_state,
+                                  format_functions, debug_print_each_point,
+                                  transition_cache))
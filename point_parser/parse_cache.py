@@ -0,0 +1,271 @@
+import os
+import pickle
+import sqlite3
+import zlib
+from hashlib import sha256
+from typing import Any, Callable, Dict, Optional
+from .format_functions import FormatFunctions
+from .format_spec import spec_of
+import point_parser.formats as fmts
+
+
+class ParseCache:
+    """
+    A persistent cache of parsed matches, stored in an SQLite file.
+
+    Entries are keyed on a hash of the pbp string, the players in the order
+    in which they served and the format, so a match is only ever parsed once
+    for a given input, no matter how many runs. The keys also include
+    SCHEMA_VERSION, so that entries stored by an older version of the
+    parser are not used. Once the file grows beyond
+    max_bytes, the least recently used entries are evicted.
+
+    Only the formats in formats.FORMATS and those made from a FormatSpec can
+    be cached, since other formats have no stable identity. Matches in other
+    formats are simply parsed.
+
+    Example::
+
+        parse_cache = ParseCache('parse_cache.sqlite')
+
+        validate_all(sackmann_df, parse_cache=parse_cache)
+        print(parse_cache.stats())
+
+        parse_cache.close()
+    """
+
+    # Part of every key. Bump it whenever what is stored, or how matches are
+    # parsed, changes. 2: is_tiebreak_fun is given the is_final_set flag of
+    # the set played after the game, so that sets can start in a tiebreak.
+    SCHEMA_VERSION = 2
+
+    # Hits are recorded in memory and written out in batches of this size.
+    _TOUCH_BATCH_SIZE = 256
+
+    def __init__(self, path: str, max_bytes: int = 2 ** 30):
+        """
+        Args:
+            path: The SQLite file to use. It is created if it does not exist.
+            max_bytes: The maximum total size of the stored results.
+        """
+
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._connection = sqlite3.connect(self.path, timeout=60)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, value BLOB, failed INTEGER, '
+            'size INTEGER, last_used INTEGER)')
+        self._connection.execute(
+            'CREATE INDEX IF NOT EXISTS entries_last_used '
+            'ON entries (last_used)')
+        self._connection.commit()
+
+        self._clock = self._query_one(
+            'SELECT COALESCE(MAX(last_used), 0) FROM entries')
+        self._pending_touches = dict()
+
+        # Kept up to date in memory, so that the table need not be summed
+        # after every insert.
+        self._bytes = self.stored_bytes()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Send only the location to other processes; they open their own
+        # connection.
+
+        return {'path': self.path, 'max_bytes': self.max_bytes}
+
+    def __setstate__(self, state: Dict[str, Any]):
+
+        self.__init__(state['path'], state['max_bytes'])
+
+    def __enter__(self) -> 'ParseCache':
+
+        return self
+
+    def __exit__(self, *args):
+
+        self.close()
+
+    def _query_one(self, query: str, *args) -> Any:
+
+        return self._connection.execute(query, args).fetchone()[0]
+
+    @staticmethod
+    def match_key(kind: str, first_server: str, first_returner: str,
+                  pbp: str, format_functions: FormatFunctions) \
+            -> Optional[str]:
+        """
+        Computes the key of a parsed match.
+
+        Args:
+            kind: What was stored, e.g. "states" or "final_state".
+            first_server: The first server in the match.
+            first_returner: The first returner in the match.
+            pbp: The coded string from Jeff's data.
+            format_functions: The format of the match.
+
+        Returns:
+            The key, or None if the format is neither one of formats.FORMATS
+            nor made from a FormatSpec, or if the players or pbp are not
+            strings (e.g. NaN, for missing names).
+        """
+
+        if not all(isinstance(x, str) for x in [first_server, first_returner,
+                                                  pbp]):
+            return None
+
+        try:
+            format_name = list(fmts.FORMATS)[
+                fmts.format_code(format_functions)]
+        except ValueError:
+
+            # Formats made from a FormatSpec are identified by their spec.
+            spec = spec_of(format_functions)
+
+            if spec is None:
+                return None
+
+            format_name = repr(spec)
+
+        to_hash = '\0'.join([str(ParseCache.SCHEMA_VERSION), kind,
+                             format_name, first_server, first_returner, pbp])
+
+        return sha256(to_hash.encode('utf-8')).hexdigest()
+
+    def get_or_compute(self, key: Optional[str],
+                       compute: Callable[[], Any]) -> Any:
+        """
+        Returns the value stored under key, or computes and stores it.
+
+        If compute raises an AssertionError (meaning that the match could
+        not be parsed), this is stored too, and raised again on later calls.
+
+        Args:
+            key: The key [see match_key]. If None, compute is simply called.
+            compute: Computes the value if it is not in the cache.
+
+        Returns:
+            The value.
+        """
+
+        if key is None:
+            return compute()
+
+        row = self._connection.execute(
+            'SELECT value, failed FROM entries WHERE key = ?',
+            (key,)).fetchone()
+
+        if row is not None:
+
+            self.hits += 1
+            self._touch(key)
+
+            value, failed = row
+
+            if failed:
+                raise AssertionError('Cached parse failure.')
+
+            return pickle.loads(zlib.decompress(value))
+
+        self.misses += 1
+
+        try:
+            value = compute()
+        except AssertionError:
+            self._store(key, b'', True)
+            raise
+
+        self._store(key, zlib.compress(
+            pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)), False)
+
+        return value
+
+    def _tick(self) -> int:
+
+        self._clock += 1
+
+        return self._clock
+
+    def _touch(self, key: str):
+
+        self._pending_touches[key] = self._tick()
+
+        if len(self._pending_touches) >= self._TOUCH_BATCH_SIZE:
+            self.flush()
+
+    def _store(self, key: str, value: bytes, failed: bool):
+
+        self._connection.execute(
+            'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)',
+            (key, value, int(failed), len(value), self._tick()))
+        self._connection.commit()
+
+        self._bytes += len(value)
+
+        if self._bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+
+        self.flush()
+
+        # Other processes may be using the same file, so check the actual
+        # size each time.
+        while self.stored_bytes() > self.max_bytes:
+
+            self._connection.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries '
+                'ORDER BY last_used LIMIT ?)',
+                (max(1, len(self) // 10),))
+
+        self._connection.commit()
+
+        self._bytes = self.stored_bytes()
+
+    def flush(self):
+        """Writes out the recorded hits."""
+
+        if len(self._pending_touches) > 0:
+
+            self._connection.executemany(
+                'UPDATE entries SET last_used = MAX(last_used, ?) '
+                'WHERE key = ?',
+                [(x, key) for key, x in self._pending_touches.items()])
+            self._connection.commit()
+
+            self._pending_touches.clear()
+
+    def close(self):
+        """Writes out the recorded hits and closes the file."""
+
+        self.flush()
+        self._connection.close()
+
+    def __len__(self) -> int:
+
+        return self._query_one('SELECT COUNT(*) FROM entries')
+
+    def stored_bytes(self) -> int:
+        """The total size of the stored results."""
+
+        return self._query_one('SELECT COALESCE(SUM(size), 0) FROM entries')
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the number of hits and misses so far, and the number of
+        entries and bytes stored.
+        """
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self),
+            'bytes': self.stored_bytes()
+        }
@@ -0,0 +1,207 @@
+import atexit
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Any, Callable, Dict, Iterator, Optional
+from .format_functions import FormatFunctions
+
+"""
+This module records where the time goes when parsing and validating matches.
+
+Profiling is off by default, in which case the hooks do next to nothing. It
+is switched on either with the profile context manager:
+
+    with profiling.profile() as cur_profile:
+        validate_all(sackmann_df)
+
+    print(cur_profile.to_json())
+
+or for a whole run by setting the environment variable POINT_PARSER_PROFILE.
+The report is then written when the process exits, as JSON, to the file named
+by the variable, or to stderr if it is set to "1".
+
+Stages can be nested, and the time of each includes that of the stages
+inside it. Only the current process is profiled, so work done by the worker
+processes of validate_all is not included.
+"""
+
+PROFILE_ENV_VAR = 'POINT_PARSER_PROFILE'
+
+
+class Profile:
+    """
+    The wall time and number of calls of each stage, and the number of calls
+    of each FormatFunctions field.
+    """
+
+    def __init__(self):
+
+        self.stage_calls = dict()
+        self.stage_seconds = dict()
+        self.callback_calls = {x.name: 0 for x in fields(FormatFunctions)}
+
+        # The instrumented version of each format [see instrument].
+        self._instrumented = dict()
+
+    def add_stage(self, name: str, seconds: float):
+
+        self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+        self.stage_seconds[name] = self.stage_seconds.get(name, 0.) + seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns the report as a dictionary with entries "stages", giving the
+        calls and seconds of each stage, and "callbacks", giving the calls of
+        each FormatFunctions field.
+        """
+
+        return {
+            'stages': {x: {'calls': self.stage_calls[x],
+                           'seconds': self.stage_seconds[x]}
+                       for x in self.stage_calls},
+            'callbacks': dict(self.callback_calls)
+        }
+
+    def to_json(self) -> str:
+        """Returns the report [see to_dict] as JSON."""
+
+        return json.dumps(self.to_dict(), indent=2)
+
+
+# The profile being recorded, if any.
+_active_profile = None
+
+
+class _Stage:
+    # Times a stage, as a context manager.
+
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile: Profile, name: str):
+
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+
+        self.profile.add_stage(self.name, time.perf_counter() - self.start)
+
+
+class _NoStage:
+    # Used when profiling is off.
+
+    __slots__ = ()
+
+    def __enter__(self):
+
+        pass
+
+    def __exit__(self, *args):
+
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """
+    Returns a context manager recording the time spent in a stage, if
+    profiling is on.
+
+    Example::
+
+        with stage('load_csv'):
+            data = pd.read_csv(sackmann_csv_file)
+    """
+
+    if _active_profile is None:
+        return _NO_STAGE
+
+    return _Stage(_active_profile, name)
+
+
+def _count_calls(fun: Callable, counts: Dict[str, int],
+                 name: str) -> Callable:
+
+    def counted(*args):
+        counts[name] += 1
+        return fun(*args)
+
+    return counted
+
+
+def instrument(format_functions: FormatFunctions) -> FormatFunctions:
+    """
+    If profiling is on, returns a copy of the format whose functions count
+    their calls. Otherwise, returns the format itself.
+
+    The same copy is returned for the same format throughout a profile, so
+    that it can be used with a TransitionCache.
+    """
+
+    if _active_profile is None:
+        return format_functions
+
+    instrumented = _active_profile._instrumented
+    key = id(format_functions)
+
+    if key not in instrumented:
+
+        counts = _active_profile.callback_calls
+
+        # Keep the format alive, so that its id is not reused.
+        instrumented[key] = (format_functions, FormatFunctions(**{
+            x.name: _count_calls(getattr(format_functions, x.name), counts,
+                                 x.name)
+            for x in fields(FormatFunctions)}))
+
+    return instrumented[key][1]
+
+
+@contextmanager
+def profile() -> Iterator[Profile]:
+    """
+    Records a profile of everything run inside the context.
+
+    Yields:
+        The Profile, which is complete once the context is left.
+    """
+
+    global _active_profile
+
+    previous_profile = _active_profile
+    _active_profile = Profile()
+
+    try:
+        yield _active_profile
+    finally:
+        _active_profile = previous_profile
+
+
+def _write_profile_at_exit(cur_profile: Profile, destination: str):
+
+    if destination == '1':
+        print(cur_profile.to_json(), file=sys.stderr)
+    else:
+        with open(destination, 'w') as profile_file:
+            profile_file.write(cur_profile.to_json())
+
+
+def _start_from_environment(destination: Optional[str]):
+
+    global _active_profile
+
+    if destination:
+        _active_profile = Profile()
+        atexit.register(_write_profile_at_exit, _active_profile, destination)
+
+
+_start_from_environment(os.environ.get(PROFILE_ENV_VAR))
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from .batch import BatchStates, advance_batch, empty_batch_states
+from .columnar import batch_states_to_columns
+from .format_functions import FormatFunctions
+
+"""
+This module simulates matches in which each player wins a fixed share of the
+points on their serve. All matches are played at once, point by point, using
+advance_batch, so they follow exactly the same rules as parsed matches.
+
+As elsewhere, player 0 is the first server and player 1 the first returner.
+"""
+
+
+@dataclass
+class SimulationResult:
+    """
+    The outcome of simulate_matches, with one row per match.
+    """
+
+    # The winner of each match (0 or 1).
+    winner: np.ndarray
+
+    # The number of sets won by each player.
+    sets_won: np.ndarray
+
+    # The games won by each player in each set, with shape (n_matches,
+    # max_sets, 2). Sets which were not played are -1.
+    set_scores: np.ndarray
+
+    # The points won by each player in each set's tiebreak, in the same
+    # shape as set_scores. Sets without a tiebreak are -1.
+    tiebreak_scores: np.ndarray
+
+    # The number of points played in each match.
+    n_points: np.ndarray
+
+    # If requested, one row per point, with the columns of
+    # columnar.match_to_columns and "match" and "point" columns. The rows of
+    # each match are together and in order.
+    points: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+
+        return len(self.winner)
+
+    def score_string(self, match_num: int) -> str:
+        """
+        Returns the final score of a match, in the same form as
+        match_summary_string with score_only=True.
+        """
+
+        first = self.winner[match_num]
+        scores = list()
+
+        for cur_games, cur_tiebreak in zip(self.set_scores[match_num],
+                                           self.tiebreak_scores[match_num]):
+
+            if cur_games[0] < 0:
+                break
+
+            cur_score = f'{cur_games[first]}-{cur_games[1 - first]}'
+
+            if cur_tiebreak[0] >= 0:
+                cur_score += f'({cur_tiebreak.min()})'
+
+            scores.append(cur_score)
+
+        return ' '.join(scores)
+
+
+def _max_sets(format_functions: FormatFunctions) -> int:
+    # The most sets a match can have.
+
+    sets_needed = 1
+
+    while not format_functions.match_over_fun(sets_needed, 0):
+        sets_needed += 1
+
+    return 2 * sets_needed - 1
+
+
+def _select(states: BatchStates, rows: np.ndarray) -> BatchStates:
+
+    return BatchStates(**{x: getattr(states, x)[rows]
+                          for x in BatchStates.__dataclass_fields__})
+
+
+def simulate_matches(format_functions: FormatFunctions,
+                     serve_probs: Tuple[float, float],
+                     n_matches: int,
+                     seed: Optional[int] = None,
+                     point_columns: bool = False,
+                     max_points: int = 100000) -> SimulationResult:
+    """
+    Simulates many matches at once.
+
+    Args:
+        format_functions: The functions encoding the rules of the match. Must
+            support arrays of scores [see batch.py].
+        serve_probs: The probability of each player winning a point on their
+            serve. Player 0 serves first.
+        n_matches: The number of matches to simulate.
+        seed: The random seed. The same seed gives the same matches.
+        point_columns: If True, also returns the state after every point.
+        max_points: Raises a ValueError if any match is still going after this
+            many points. This can happen if, for example, both players always
+            win their serve and the format has tiebreaks.
+
+    Returns:
+        The SimulationResult.
+    """
+
+    rng = np.random.default_rng(seed)
+    serve_probs = np.asarray(serve_probs, dtype=float)
+
+    max_sets = _max_sets(format_functions)
+
+    set_scores = np.full((n_matches, max_sets, 2), -1, dtype=np.int16)
+    tiebreak_scores = np.full((n_matches, max_sets, 2), -1, dtype=np.int16)
+    n_points = np.zeros(n_matches, dtype=np.int64)
+    final_sets_won = np.zeros((n_matches, 2), dtype=np.int8)
+
+    # The states of the matches still being played, and their numbers.
+    # Matches which are over are only removed from time to time, since
+    # advance_batch leaves them alone anyway.
+    states = empty_batch_states(n_matches)
+    match_nums = np.arange(n_matches)
+
+    fields = list(BatchStates.__dataclass_fields__)
+    point_matches, point_won, point_states = list(), list(), list()
+
+    cur_point = 0
+
+    while len(match_nums) > 0:
+
+        if cur_point >= max_points:
+            raise ValueError(f'{len(match_nums)} matches did not finish '
+                             f'within {max_points} points.')
+
+        server = states.server.copy()
+        server_won = rng.random(len(match_nums)) < serve_probs[server]
+
+        # The winner of the point also wins the game or set, if either ends.
+        point_winner = np.where(server_won, server, 1 - server)
+
+        set_score_before = states.cur_set_score.copy()
+        game_score_before = states.cur_game_score.copy()
+        was_tiebreak = states.is_tiebreak.copy()
+        set_num_before = states.set_num.copy()
+        sets_before = states.sets_won[:, 0] + states.sets_won[:, 1]
+
+        already_over = advance_batch(states, server_won, format_functions)
+
+        cur_point += 1
+
+        if point_columns:
+            played = ~already_over
+            point_matches.append(match_nums[played])
+            point_won.append(server_won[played])
+            point_states.append({x: getattr(states, x)[played]
+                                 for x in fields})
+
+        # Record the sets which just ended.
+        set_over = np.flatnonzero(
+            states.sets_won[:, 0] + states.sets_won[:, 1] > sets_before)
+
+        if len(set_over) > 0:
+
+            winner = point_winner[set_over]
+            set_matches = match_nums[set_over]
+            set_nums = set_num_before[set_over]
+
+            games = set_score_before[set_over]
+            games[np.arange(len(set_over)), winner] += 1
+            set_scores[set_matches, set_nums] = games
+
+            tiebreak = was_tiebreak[set_over]
+            points = game_score_before[set_over][tiebreak]
+            points[np.arange(len(points)), winner[tiebreak]] += 1
+            tiebreak_scores[set_matches[tiebreak], set_nums[tiebreak]] = \
+                points
+
+            match_over = set_over[states.is_over[set_over]]
+            n_points[match_nums[match_over]] = cur_point
+            final_sets_won[match_nums[match_over]] = \
+                states.sets_won[match_over]
+
+        if np.count_nonzero(states.is_over) > len(match_nums) // 4:
+            playing = ~states.is_over
+            states = _select(states, playing)
+            match_nums = match_nums[playing]
+
+    result = SimulationResult(
+        winner=(final_sets_won[:, 1] > final_sets_won[:, 0]).astype(np.int8),
+        sets_won=final_sets_won,
+        set_scores=set_scores,
+        tiebreak_scores=tiebreak_scores,
+        n_points=n_points
+    )
+
+    if point_columns:
+        result.points = _points_frame(point_matches, point_won,
+                                      point_states)
+
+    return result
+
+
+def _points_frame(point_matches: List[np.ndarray],
+                  point_won: List[np.ndarray],
+                  point_states: List[Dict[str, np.ndarray]]) -> pd.DataFrame:
+    # Puts the states collected point by point in match order.
+
+    if len(point_matches) == 0:
+        point_matches, point_won = [np.zeros(0, dtype=np.int64)], [[]]
+        point_states = [vars(empty_batch_states(0))]
+
+    match_nums = np.concatenate(point_matches)
+    point_nums = np.concatenate([np.full(len(x), i, dtype=np.int16)
+                                 for i, x in enumerate(point_matches)])
+
+    # Within each match, the points were collected in order.
+    order = np.argsort(match_nums, kind='stable')
+
+    states = BatchStates(**{
+        x: np.concatenate([y[x] for y in point_states])[order]
+        for x in BatchStates.__dataclass_fields__})
+
+    return pd.DataFrame({
+        'match': match_nums[order],
+        'point': point_nums[order],
+        **batch_states_to_columns(states, np.concatenate(point_won)[order])
+    })
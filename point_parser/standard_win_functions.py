@@ -1,12 +1,19 @@
 from typing import Tuple
 
+"""
+The scoring rules used by the formats in formats.py.
+
+The functions taking scores only use elementwise operations, so that they can
+be applied to NumPy arrays of scores as well as to integers [see batch.py].
+"""
+
 
 def set_win_condition_ad_set(games_p1: int, games_p2: int) -> bool:
 
-    enough_games = max(games_p1, games_p2) >= 6
+    enough_games = (games_p1 >= 6) | (games_p2 >= 6)
     enough_margin = abs(games_p1 - games_p2) >= 2
 
-    return enough_games and enough_margin
+    return enough_games & enough_margin
 
 
 def set_win_condition_tb_set(games_p1: int, games_p2: int) -> bool:
@@ -14,7 +21,7 @@ def set_win_condition_tb_set(games_p1: int, games_p2: int) -> bool:
     ad_set_condition = set_win_condition_ad_set(games_p1, games_p2)
     tb_won = (games_p1 + games_p2) == 13
 
-    return ad_set_condition or tb_won
+    return ad_set_condition | tb_won
 
 
 def set_win_condition_ad_final_set(games_p1: int, games_p2: int,
@@ -31,26 +38,21 @@ def match_over_best_of(sets_won_p1: int, sets_won_p2: int,
 
     assert best_of in [3, 5]
 
-    max_sets = max(sets_won_p1, sets_won_p2)
+    sets_needed = 2 if best_of == 3 else 3
 
-    if best_of == 3:
-        return max_sets == 2
-
-    else:
-        return max_sets == 3
+    return (sets_won_p1 == sets_needed) | (sets_won_p2 == sets_needed)
 
 
 def standard_service_game_over(points_p1: int, points_p2: int,
                                has_ad: bool = True) -> bool:
 
     diff = abs(points_p1 - points_p2)
-    max_pts = max(points_p1, points_p2)
 
-    enough_points = max_pts >= 4
+    enough_points = (points_p1 >= 4) | (points_p2 >= 4)
     enough_diff = diff >= 2
 
     if has_ad:
-        return enough_points and enough_diff
+        return enough_points & enough_diff
     else:
         return enough_points
 
@@ -70,7 +72,7 @@ def roles_at_game_start(total_games_played: int, first_server: str,
 def is_tiebreak_fun_uso_style(games_p1: int, games_p2: int,
                               is_final_set: bool) -> bool:
 
-    return games_p1 == 6 and games_p2 == 6
+    return (games_p1 == 6) & (games_p2 == 6)
 
 
 def is_tiebreak_fun_no_tb_final_set(games_p1: int, games_p2: int,
@@ -84,10 +86,10 @@ def is_tiebreak_fun_no_tb_final_set(games_p1: int, games_p2: int,
 
 def tiebreak_over_standard(points_p1: int, points_p2: int) -> bool:
 
-    enough_points = max(points_p1, points_p2) >= 7
+    enough_points = (points_p1 >= 7) | (points_p2 >= 7)
     enough_diff = abs(points_p1 - points_p2) >= 2
 
-    return enough_points and enough_diff
+    return enough_points & enough_diff
 
 
 def tiebreak_roles_standard(total_points: int, first_server: str,
@@ -0,0 +1,336 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Tuple
+from .batch import by_final_set
+from .format_functions import FormatFunctions
+from .columnar import sackmann_to_frame
+from .compare_with_sackmann import get_format_codes
+import point_parser.formats as fmts
+
+"""
+This module computes match statistics, such as break points saved, hold
+rates and set points, from the points of parsed matches [see columnar.py].
+
+Everything is done with array operations over all the points at once: first
+each point is flagged (was it a break point? a set point for either player?)
+using the rules of its format, and the flags are then summed per match and
+player.
+
+As elsewhere, "p1" is the first server of the match and "p2" the first
+returner. The rows of the points hold the state after each point; the flags
+describe the point itself, i.e. the state before it.
+"""
+
+# The columns added by flag_points.
+FLAG_COLUMNS = ['point_server', 'point_winner', 'was_tiebreak', 'game_over',
+                'break_point', 'set_point_p1', 'set_point_p2',
+                'match_point_p1', 'match_point_p2']
+
+
+def _states_before(points: pd.DataFrame) -> Dict[str, np.ndarray]:
+    # The state before each point, which is in the row before, or the start
+    # of the match for the first point of each match.
+
+    if 'point' in points:
+        first_point = points['point'].to_numpy() == 0
+    else:
+        first_point = np.arange(len(points)) == 0
+
+    before = dict()
+
+    for cur_column in ['server', 'is_tiebreak', 'set_num',
+                       'total_games_played', 'games_p1', 'games_p2',
+                       'points_p1', 'points_p2', 'sets_won_p1',
+                       'sets_won_p2']:
+
+        after = points[cur_column].to_numpy()
+
+        cur_before = np.zeros_like(after)
+        cur_before[1:] = after[:-1]
+        cur_before[first_point] = 0
+
+        before[cur_column] = cur_before
+
+    return before
+
+
+def _flag_rows(points: pd.DataFrame,
+               format_functions: FormatFunctions) -> Dict[str, np.ndarray]:
+    # Computes the flags for points played in the same format.
+
+    before = _states_before(points)
+
+    server = before['server'].astype(np.int8)
+    was_tiebreak = before['is_tiebreak'].astype(bool)
+    server_won = points['server_won'].to_numpy(dtype=bool)
+
+    point_winner = np.where(server_won, server, 1 - server).astype(np.int8)
+    game_over = (points['total_games_played'].to_numpy() >
+                 before['total_games_played'])
+
+    is_final_set = np.asarray(
+        format_functions.is_final_set(before['set_num']), dtype=bool)
+    is_final_set = np.broadcast_to(is_final_set, server.shape)
+
+    points_by_player = np.stack([before['points_p1'], before['points_p2']],
+                                axis=1).astype(np.int64)
+    games_by_player = np.stack([before['games_p1'], before['games_p2']],
+                               axis=1).astype(np.int64)
+    sets_by_player = np.stack([before['sets_won_p1'], before['sets_won_p2']],
+                              axis=1).astype(np.int64)
+
+    rows = np.arange(len(points))
+    points_server = points_by_player[rows, server]
+    points_returner = points_by_player[rows, 1 - server]
+
+    def wins_game(player_serves: np.ndarray) -> np.ndarray:
+        # Whether the player would win the game by winning the point. The
+        # format functions take the server's score first.
+
+        new_server = points_server + player_serves
+        new_returner = points_returner + ~player_serves
+
+        result = np.zeros(len(points), dtype=bool)
+
+        result[~was_tiebreak] = format_functions.service_game_over(
+            new_server[~was_tiebreak], new_returner[~was_tiebreak])
+        result[was_tiebreak] = by_final_set(
+            format_functions.tiebreak_over, new_server[was_tiebreak],
+            new_returner[was_tiebreak], is_final_set[was_tiebreak])
+
+        return result
+
+    flags = {
+        'point_server': server,
+        'point_winner': point_winner,
+        'was_tiebreak': was_tiebreak,
+        'game_over': game_over,
+        'break_point': ~was_tiebreak & wins_game(
+            np.zeros(len(points), dtype=bool))
+    }
+
+    for cur_player in [0, 1]:
+
+        game_point = wins_game(server == cur_player)
+
+        set_point = game_point & by_final_set(
+            format_functions.set_win_condition,
+            games_by_player[:, cur_player] + 1,
+            games_by_player[:, 1 - cur_player], is_final_set)
+
+        match_point = set_point & np.broadcast_to(np.asarray(
+            format_functions.match_over_fun(
+                sets_by_player[:, cur_player] + 1,
+                sets_by_player[:, 1 - cur_player]),
+            dtype=bool), set_point.shape)
+
+        flags[f'set_point_p{cur_player + 1}'] = set_point
+        flags[f'match_point_p{cur_player + 1}'] = match_point
+
+    return flags
+
+
+def flag_points(points: pd.DataFrame,
+                format_functions: FormatFunctions) -> pd.DataFrame:
+    """
+    Flags the break points, set points and match points among the points of
+    matches played in the same format.
+
+    Args:
+        points: The points, as returned by columnar.match_to_frame. Several
+            matches can be given if there is a "point" column numbering the
+            points of each match, as in columnar.sackmann_to_frame.
+        format_functions: The format of the matches.
+
+    Returns:
+        A copy of points with the FLAG_COLUMNS: "point_server" and
+        "point_winner" (0 for p1, 1 for p2), "was_tiebreak" (the point was
+        played in a tiebreak), "game_over" (the point ended a game),
+        "break_point" (the returner would have won the service game by
+        winning the point), and "set_point_p1" etc. (the player would have
+        won the set, or the match, by winning the point).
+    """
+
+    return points.assign(**_flag_rows(points, format_functions))
+
+
+def flag_sackmann_points(points: pd.DataFrame,
+                         sackmann_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Flags the points of all the matches in Jeff's data [see flag_points].
+
+    Args:
+        points: The points, as returned by columnar.sackmann_to_frame.
+        sackmann_df: The data passed to sackmann_to_frame, used to find the
+            format of each match.
+
+    Returns:
+        A copy of points with the FLAG_COLUMNS.
+    """
+
+    formats = list(fmts.FORMATS.values())
+
+    format_codes = pd.Series(get_format_codes(sackmann_df['tny_name']),
+                             index=sackmann_df.index)
+    point_codes = format_codes.loc[points['match']].to_numpy()
+
+    columns = {x: np.zeros(len(points), dtype=np.int8 if x in [
+        'point_server', 'point_winner'] else bool) for x in FLAG_COLUMNS}
+
+    for cur_code in np.unique(point_codes):
+
+        cur_rows = np.flatnonzero(point_codes == cur_code)
+
+        for cur_column, cur_values in _flag_rows(
+                points.iloc[cur_rows], formats[cur_code]).items():
+            columns[cur_column][cur_rows] = cur_values
+
+    return points.assign(**columns)
+
+
+def player_stats(flagged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums up the flagged points of each match for each player.
+
+    Args:
+        flagged: The points, as returned by flag_points or
+            flag_sackmann_points.
+
+    Returns:
+        A DataFrame with one row per match and player, in the order of the
+        matches and with p1 first. The columns are "match" (if flagged has
+        one), "player" (the name, if flagged has "player_1" and "player_2"
+        columns), "player_num" (0 for p1, 1 for p2), the counts
+        "points_won", "serve_points", "serve_points_won", "service_games",
+        "service_games_held", "break_points_faced", "break_points_saved",
+        "break_points", "break_points_won", "set_points", "set_points_won",
+        "match_points", "match_points_won", "tiebreak_points" and
+        "tiebreak_points_won", and the "hold_rate" (NaN without any
+        service games).
+    """
+
+    if 'match' in flagged:
+        match_codes, matches = pd.factorize(flagged['match'], sort=False)
+    else:
+        match_codes = np.zeros(len(flagged), dtype=np.int64)
+        matches = None
+
+    server = flagged['point_server'].to_numpy()
+    winner = flagged['point_winner'].to_numpy()
+    server_won = flagged['server_won'].to_numpy(dtype=bool)
+    was_tiebreak = flagged['was_tiebreak'].to_numpy(dtype=bool)
+    service_game_over = (flagged['game_over'].to_numpy(dtype=bool) &
+                         ~was_tiebreak)
+    break_point = flagged['break_point'].to_numpy(dtype=bool)
+
+    per_player = list()
+
+    for cur_player in [0, 1]:
+
+        serves = server == cur_player
+        won = winner == cur_player
+        set_point = flagged[f'set_point_p{cur_player + 1}'].to_numpy(
+            dtype=bool)
+        match_point = flagged[f'match_point_p{cur_player + 1}'].to_numpy(
+            dtype=bool)
+
+        indicators = pd.DataFrame({
+            'points_won': won,
+            'serve_points': serves,
+            'serve_points_won': serves & server_won,
+            'service_games': serves & service_game_over,
+            'service_games_held': serves & service_game_over & won,
+            'break_points_faced': serves & break_point,
+            'break_points_saved': serves & break_point & won,
+            'break_points': ~serves & break_point,
+            'break_points_won': ~serves & break_point & won,
+            'set_points': set_point,
+            'set_points_won': set_point & won,
+            'match_points': match_point,
+            'match_points_won': match_point & won,
+            'tiebreak_points': was_tiebreak,
+            'tiebreak_points_won': was_tiebreak & won
+        })
+
+        cur_stats = indicators.groupby(match_codes, sort=True).sum()
+        cur_stats.insert(0, 'player_num', np.int8(cur_player))
+
+        if 'player_1' in flagged:
+            names = flagged[f'player_{cur_player + 1}'].groupby(
+                match_codes, sort=True, observed=True).first()
+            cur_stats.insert(0, 'player', names.astype(object).to_numpy())
+
+        per_player.append(cur_stats)
+
+    # Interleave the players, so that the rows of each match are together.
+    stats = pd.concat(per_player).sort_index(kind='stable')
+
+    stats['hold_rate'] = (stats['service_games_held'] /
+                          stats['service_games'].where(
+                              stats['service_games'] > 0))
+
+    if matches is not None:
+        stats.insert(0, 'match', np.asarray(matches)[stats.index])
+
+    return stats.reset_index(drop=True)
+
+
+def match_stats(flagged: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums up the flagged points of each match.
+
+    Args:
+        flagged: The points, as returned by flag_points or
+            flag_sackmann_points.
+
+    Returns:
+        A DataFrame with one row per match, in order, with the columns
+        "match" (if flagged has one), "points", "games", "tiebreaks",
+        "service_game_points" (the points played outside tiebreaks) and
+        "points_per_game" (the mean number of points per service game).
+    """
+
+    if 'match' in flagged:
+        match_codes, matches = pd.factorize(flagged['match'], sort=False)
+    else:
+        match_codes = np.zeros(len(flagged), dtype=np.int64)
+        matches = None
+
+    was_tiebreak = flagged['was_tiebreak'].to_numpy(dtype=bool)
+    game_over = flagged['game_over'].to_numpy(dtype=bool)
+
+    stats = pd.DataFrame({
+        'points': np.ones(len(flagged), dtype=np.int64),
+        'games': game_over,
+        'tiebreaks': game_over & was_tiebreak,
+        'service_game_points': ~was_tiebreak
+    }).groupby(match_codes, sort=True).sum()
+
+    stats['points_per_game'] = (stats['service_game_points'] /
+                                (stats['games'] - stats['tiebreaks']).where(
+                                    stats['games'] > stats['tiebreaks']))
+
+    if matches is not None:
+        stats.insert(0, 'match', np.asarray(matches)[stats.index])
+
+    return stats.reset_index(drop=True)
+
+
+def sackmann_stats(sackmann_df: pd.DataFrame) \
+        -> Tuple[pd.DataFrame, pd.DataFrame, pd.Index]:
+    """
+    Parses all the matches in Jeff's data and computes their statistics.
+
+    Args:
+        sackmann_df: The data, as loaded by load_sackmann_data.
+
+    Returns:
+        A tuple with the player_stats, the match_stats, and the index of the
+        matches which could not be parsed [see columnar.sackmann_to_frame],
+        which are left out of both.
+    """
+
+    points, failed = sackmann_to_frame(sackmann_df)
+    flagged = flag_sackmann_points(points, sackmann_df)
+
+    return player_stats(flagged), match_stats(flagged), failed
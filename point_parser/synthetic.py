@@ -0,0 +1,221 @@
+import random
+from typing import Callable, List, Tuple, TYPE_CHECKING
+from .format_functions import FormatFunctions
+from .match_state import CompactMatchState
+from .manipulate_match_state import advance_compact_state
+from .utils import create_start_match_state, match_summary_string
+import point_parser.formats as fmts
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+"""
+This module creates synthetic matches, for benchmarks and for tests which
+cannot rely on Jeff Sackmann's data being present. Given the same seed, the
+same matches are created every time.
+"""
+
+# The tournaments used by make_sackmann_frame, with their formats.
+SYNTHETIC_TOURNAMENTS = [
+    ('MensFrenchOpen', fmts.classic_slam_format_men),
+    ('WomensUSOpen', fmts.us_open_format_ladies),
+    ('ATPMiami', fmts.standard_best_of_three),
+    ('GentlemensWimbledonSingles', fmts.classic_slam_format_men)
+]
+
+
+def _start_state() -> CompactMatchState:
+
+    return CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+
+def play_match(choose_point: Callable[[CompactMatchState], bool],
+               format_functions: FormatFunctions) -> List[bool]:
+    """
+    Plays a match point by point until it is over.
+
+    Args:
+        choose_point: Called with the state before each point. Returns
+            whether the server wins it.
+        format_functions: The functions encoding the rules of the match.
+
+    Returns:
+        The win/loss vector of the match.
+    """
+
+    state = _start_state()
+    win_loss = list()
+
+    while not state.is_over:
+        win_loss.append(bool(choose_point(state)))
+        state = advance_compact_state(win_loss[-1], state, format_functions)
+
+    return win_loss
+
+
+def random_win_loss(serve_prob: float, format_functions: FormatFunctions,
+                    rng: random.Random = random) -> List[bool]:
+    """
+    Creates a match in which the server wins each point with the same
+    probability.
+
+    Args:
+        serve_prob: The probability that the server wins a point.
+        format_functions: The functions encoding the rules of the match.
+        rng: The random number generator to use.
+
+    Returns:
+        The win/loss vector of the match.
+    """
+
+    return play_match(lambda _: rng.random() < serve_prob, format_functions)
+
+
+def long_final_set_win_loss(format_functions: FormatFunctions,
+                            final_set_games: int = 40) -> List[bool]:
+    """
+    Creates a match which goes to a final set of at least final_set_games
+    games. Every service game is held to love, the players take turns
+    winning the sets (in tiebreaks, if there are any), and once the final
+    set has final_set_games games, the first server wins every point.
+
+    In formats with an advantage final set, the final set therefore ends
+    final_set_games + 2 games or so after it started.
+
+    Args:
+        format_functions: The functions encoding the rules of the match.
+        final_set_games: The number of games after which the final set is
+            decided.
+
+    Returns:
+        The win/loss vector of the match.
+    """
+
+    def choose_point(state):
+
+        if state.is_tiebreak:
+            return state.server == state.set_num % 2
+
+        if (format_functions.is_final_set(state.set_num) and
+                sum(state.cur_set_score) >= final_set_games):
+            return state.server == 0
+
+        return True
+
+    return play_match(choose_point, format_functions)
+
+
+def to_pbp(win_loss: List[bool], format_functions: FormatFunctions) -> str:
+    """
+    Encodes a win/loss vector the way Jeff does: "S" and "R" for points won by
+    server and returner, ";" between games, "." between sets and "/" when
+    the server changes in a tiebreak.
+    """
+
+    state = _start_state()
+    pbp = ''
+
+    for cur_win_loss in win_loss:
+
+        next_state = advance_compact_state(cur_win_loss, state,
+                                           format_functions)
+
+        pbp += 'S' if cur_win_loss else 'R'
+
+        if next_state.is_over:
+            pass
+        elif len(next_state.past_sets) > len(state.past_sets):
+            pbp += '.'
+        elif next_state.total_games_played > state.total_games_played:
+            pbp += ';'
+        elif next_state.is_tiebreak and next_state.server != state.server:
+            pbp += '/'
+
+        state = next_state
+
+    return pbp
+
+
+def final_score(win_loss: List[bool],
+                format_functions: FormatFunctions) -> str:
+    """
+    Returns the final score of a match, as in Jeff's "score" column.
+    """
+
+    state = _start_state()
+
+    for cur_win_loss in win_loss:
+        state = advance_compact_state(cur_win_loss, state, format_functions)
+
+    return match_summary_string(state.to_match_state(), score_only=True)
+
+
+def make_sackmann_frame(n_matches: int, seed: int = 0) -> 'pd.DataFrame':
+    """
+    Creates a DataFrame like the one returned by load_sackmann_data, cycling
+    through SYNTHETIC_TOURNAMENTS.
+
+    Args:
+        n_matches: The number of matches to create.
+        seed: The random seed.
+
+    Returns:
+        The DataFrame.
+    """
+
+    import pandas as pd
+
+    rng = random.Random(seed)
+    rows = list()
+
+    for cur_match in range(n_matches):
+
+        cur_tournament, cur_format = SYNTHETIC_TOURNAMENTS[
+            cur_match % len(SYNTHETIC_TOURNAMENTS)]
+
+        win_loss = random_win_loss(rng.uniform(0.55, 0.75), cur_format, rng)
+
+        rows.append({
+            'pbp_id': cur_match,
+            'date': '2017-01-01',
+            'tny_name': cur_tournament,
+            'server1': f'Player {rng.randrange(20)}',
+            'server2': f'Opponent {rng.randrange(20)}',
+            'pbp': to_pbp(win_loss, cur_format),
+            'score': final_score(win_loss, cur_format)
+        })
+
+    return pd.DataFrame(rows)
+
+
+def make_matches(n_per_format: int, seed: int = 0,
+                 final_set_games: int = 40) \
+        -> List[Tuple[str, List[bool]]]:
+    """
+    Creates matches in each of the formats in formats.FORMATS. For each
+    format, there are n_per_format random matches and one with a long final
+    set [see long_final_set_win_loss].
+
+    Args:
+        n_per_format: The number of random matches per format.
+        seed: The random seed.
+        final_set_games: Passed on to long_final_set_win_loss.
+
+    Returns:
+        A list of tuples of the format name and the win/loss vector.
+    """
+
+    rng = random.Random(seed)
+    matches = list()
+
+    for cur_name, cur_format in fmts.FORMATS.items():
+
+        for _ in range(n_per_format):
+            matches.append((cur_name, random_win_loss(
+                rng.uniform(0.55, 0.75), cur_format, rng)))
+
+        matches.append((cur_name, long_final_set_win_loss(
+            cur_format, final_set_games)))
+
+    return matches
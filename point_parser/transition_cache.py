@@ -0,0 +1,139 @@
+from functools import lru_cache
+from typing import Tuple
+from .match_state import CompactMatchState
+from .format_functions import FormatFunctions
+from .manipulate_match_state import advance_compact_state
+
+# Placeholder names used for the states stored in the cache; the real names
+# are put back on every lookup.
+_NO_PLAYERS = ('', '')
+
+_new_state = tuple.__new__
+
+
+class TransitionCache:
+    """
+    A bounded LRU cache of point-by-point state transitions.
+
+    Within a format, the scoring part of a CompactMatchState (who serves, set
+    and game scores, sets won, and so on) only takes a small number of values,
+    so once the cache is warm, advancing a state is mostly a dictionary
+    lookup rather than a series of FormatFunctions calls.
+
+    The cache is keyed on the scoring state with total_games_played reduced
+    to its parity. It is therefore only valid for formats whose
+    roles_at_game_start depends on the parity of the games played alone, as
+    is the case for standard_win_functions.roles_at_game_start and all the
+    formats in formats.py.
+
+    Example::
+
+        cache = TransitionCache()
+
+        states = process_win_loss_vector(win_loss, start_state,
+                                         fmts.standard_best_of_three,
+                                         transition_cache=cache)
+
+        print(cache.hits, cache.misses)
+    """
+
+    def __init__(self, max_size: int = 2 ** 16):
+        """
+        Args:
+            max_size: The maximum number of transitions to keep. Once full,
+                the least recently used transition is evicted.
+        """
+
+        self.max_size = max_size
+
+        # Keep the formats alive so that their ids are not reused.
+        self._formats = dict()
+
+        self._lookup = lru_cache(maxsize=max_size)(self._compute_transition)
+
+    def __len__(self) -> int:
+
+        return self._lookup.cache_info().currsize
+
+    @property
+    def hits(self) -> int:
+
+        return self._lookup.cache_info().hits
+
+    @property
+    def misses(self) -> int:
+
+        return self._lookup.cache_info().misses
+
+    @property
+    def hit_rate(self) -> float:
+
+        hits, misses, _, _ = self._lookup.cache_info()
+        lookups = hits + misses
+
+        return hits / lookups if lookups > 0 else 0.
+
+    def clear(self):
+        """Empties the cache and resets the counters."""
+
+        self._lookup.cache_clear()
+        self._formats.clear()
+
+    def _compute_transition(self, key: Tuple) -> Tuple:
+
+        (format_id, server_won, server, is_tiebreak, set_num, parity,
+         cur_set_score, cur_game_score, sets_won) = key
+
+        next_state = advance_compact_state(
+            server_won,
+            CompactMatchState(
+                _NO_PLAYERS, server, is_tiebreak, set_num, parity,
+                cur_set_score, cur_game_score, sets_won, (), False),
+            self._formats[format_id])
+
+        # Store what is needed to rebuild the state, with the games played
+        # as an increment.
+        return (next_state.server, next_state.is_tiebreak, next_state.set_num,
+                next_state.total_games_played - parity,
+                next_state.cur_set_score, next_state.cur_game_score,
+                next_state.sets_won, next_state.past_sets,
+                next_state.is_over)
+
+    def advance(self, server_won: bool,
+                match_state: CompactMatchState,
+                format_functions: FormatFunctions) -> CompactMatchState:
+        """
+        A drop-in replacement for advance_compact_state which looks the
+        transition up in the cache first.
+
+        Args:
+            server_won: Whether or not the server won the point.
+            match_state: The current state of the match. It must not be over.
+            format_functions: The functions encoding the match format.
+
+        Returns:
+            The updated CompactMatchState.
+        """
+
+        (players, server, is_tiebreak, set_num, total_games_played,
+         cur_set_score, cur_game_score, sets_won, past_sets,
+         _) = match_state
+
+        format_id = id(format_functions)
+
+        if format_id not in self._formats:
+            self._formats[format_id] = format_functions
+
+        (server, is_tiebreak, set_num, games_delta, cur_set_score,
+         cur_game_score, sets_won, new_sets, is_over) = self._lookup(
+             (format_id, bool(server_won), server, is_tiebreak, set_num,
+              total_games_played % 2, cur_set_score, cur_game_score,
+              sets_won))
+
+        if new_sets:
+            past_sets = past_sets + new_sets
+
+        return _new_state(CompactMatchState, (
+            players, server, is_tiebreak, set_num,
+            total_games_played + games_delta, cur_set_score, cur_game_score,
+            sets_won, past_sets, is_over))
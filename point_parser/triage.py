@@ -0,0 +1,351 @@
+import numpy as np
+import pandas as pd
+from typing import List, NamedTuple, Optional
+from .compare_with_sackmann import (DecodedPbp, SLAM_FORMATS,
+                                    compact_state_matches_score, decode_pbp,
+                                    VALIDATION_COLUMNS, validate_match)
+from .format_functions import FormatFunctions
+from .match_state import CompactMatchState
+from .manipulate_match_state import advance_compact_state
+from .transition_cache import TransitionCache
+from .utils import create_start_match_state, match_summary_string
+import point_parser.formats as fmts
+
+"""
+This module finds out why matches in Jeff's data do not parse to the score
+he gives [see compare_with_sackmann.validate_all].
+
+Jeff's pbp strings mark the end of each game with ";", the end of each set
+with "." and the changes of server in tiebreaks with "/". The parser does not
+need these, since it works out the boundaries from the format, but comparing
+the two pinpoints the first point where they disagree. Parsing stops there,
+and the mismatch is put down to a cause by checking whether another format,
+or a different order of service, would make the two agree.
+"""
+
+# How the parsed boundaries can disagree with Jeff's delimiters.
+DIVERGENCE_KINDS = [
+    'game_end',  # The parser ends a game, but Jeff does not.
+    'missing_game_end',  # Jeff ends a game, but the parser does not.
+    'set_end',  # The parser ends a set, but Jeff does not.
+    'missing_set_end',  # Jeff ends a set, but the parser does not.
+    'tiebreak_serve_change',  # The server changes in one but not the other.
+    'points_after_end',  # The match is over, but there are points left.
+    'unfinished'  # There are no points left, but the match is not over.
+]
+
+# The causes triage_match puts mismatches down to.
+CAUSES = [
+    'ok',  # There is no mismatch.
+    'invalid_pbp',  # The pbp string could not be decoded.
+    'retirement',  # The boundaries agree but the match stops early.
+    'format',  # The boundaries agree in another format.
+    'server_order',  # They agree if the server is swapped from some game.
+    'score_mismatch',  # The boundaries agree, but not Jeff's score.
+    'unknown'
+]
+
+
+class Divergence(NamedTuple):
+    """Where the parsed boundaries first disagree with Jeff's delimiters."""
+
+    # The point where they disagree, or the number of points if the match
+    # is unfinished, or None if they agree.
+    point: Optional[int]
+
+    # One of DIVERGENCE_KINDS, or None if they agree.
+    kind: Optional[str]
+
+    # The parsed state after the point, or after the last point if they
+    # agree or the match is unfinished.
+    state: CompactMatchState
+
+
+def first_divergence(decoded: DecodedPbp, match_state: CompactMatchState,
+                     format_functions: FormatFunctions,
+                     transition_cache: Optional[TransitionCache] = None) \
+        -> Divergence:
+    """
+    Parses a match until the games, sets or tiebreak serve changes it finds
+    first disagree with the delimiters in Jeff's pbp string.
+
+    Args:
+        decoded: The decoded pbp string [see decode_pbp].
+        match_state: The state before the first point.
+        format_functions: The format of the match.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+
+    Returns:
+        The Divergence.
+    """
+
+    n_points = len(decoded.server_won)
+
+    def flags(points: np.ndarray) -> List[bool]:
+        result = np.zeros(n_points, dtype=bool)
+        result[points] = True
+        return result.tolist()
+
+    game_ends = flags(decoded.game_ends)
+    set_ends = flags(decoded.set_ends)
+    serve_changes = flags(decoded.tiebreak_serve_changes)
+
+    advance = (advance_compact_state if transition_cache is None
+               else transition_cache.advance)
+
+    previous = match_state
+
+    for cur_point, cur_won in enumerate(decoded.server_won.tolist()):
+
+        cur_state = advance(cur_won, previous, format_functions)
+
+        game_over = (cur_state.total_games_played !=
+                     previous.total_games_played)
+        set_over = len(cur_state.past_sets) != len(previous.past_sets)
+
+        serve_change = (previous.is_tiebreak and not game_over and
+                        cur_state.server != previous.server)
+
+        # Jeff does not put a delimiter after the last point, so the parser
+        # is right to end a game there, or change the server, without one.
+        is_last = cur_point == n_points - 1
+        expect_game = game_ends[cur_point] or (is_last and game_over)
+        expect_set = set_ends[cur_point] or (is_last and set_over and
+                                             not game_ends[cur_point])
+        expect_change = serve_changes[cur_point] or (is_last and
+                                                     serve_change)
+
+        kind = None
+
+        if game_over != expect_game:
+            kind = 'game_end' if game_over else 'missing_game_end'
+        elif set_over != expect_set:
+            kind = 'set_end' if set_over else 'missing_set_end'
+        elif serve_change != expect_change:
+            kind = 'tiebreak_serve_change'
+        elif cur_state.is_over and not is_last:
+            kind = 'points_after_end'
+
+        if kind is not None:
+            return Divergence(cur_point, kind, cur_state)
+
+        previous = cur_state
+
+    if not previous.is_over:
+        return Divergence(n_points, 'unfinished', previous)
+
+    return Divergence(None, None, previous)
+
+
+class MatchTriage(NamedTuple):
+    """Why a match does not parse to Jeff's score [see triage_match]."""
+
+    # One of CAUSES.
+    cause: str
+
+    # The first divergence in the match's format, or None if the pbp string
+    # could not be decoded.
+    divergence: Optional[Divergence]
+
+    # The number of points in the pbp string, or None if it could not be
+    # decoded.
+    n_points: Optional[int] = None
+
+    # The name of the format in formats.FORMATS in which the boundaries
+    # agree, if the cause is "format".
+    other_format: Optional[str] = None
+
+    # The game from which swapping the server makes the boundaries agree, if
+    # the cause is "server_order".
+    swapped_game: Optional[int] = None
+
+
+def _agrees(divergence: Divergence) -> bool:
+    # Whether the boundaries agree, allowing the match to be unfinished.
+
+    return divergence.kind in [None, 'unfinished']
+
+
+def triage_match(first_server: str,
+                 first_returner: str,
+                 sackmann_str: str,
+                 sackmann_score: str,
+                 tny_name: str,
+                 transition_cache: Optional[TransitionCache] = None) \
+        -> MatchTriage:
+    """
+    Finds out why a match from Jeff's data does or does not parse to his
+    score.
+
+    First, the match is parsed in its format until the boundaries disagree
+    with Jeff's delimiters [see first_divergence]. If they never do, the
+    match is "ok" or a "score_mismatch". If it stops before the end, it is
+    a "format" mismatch if another format in formats.FORMATS finishes it
+    with Jeff's score (as for a best of three match filed under a best of
+    five tournament), and a "retirement" otherwise. If the boundaries
+    disagree, it is parsed again in each of the other formats ("format"),
+    and with the server swapped from each game of the set in which the
+    boundaries disagree, as when Jeff has the order of service wrong
+    ("server_order").
+
+    Args:
+        first_server: The first server in the match.
+        first_returner: The first returner in the match.
+        sackmann_str: The coded string from Jeff's data.
+        sackmann_score: The string score in Jeff's dataset.
+        tny_name: The tournament name, used to find the format.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+
+    Returns:
+        The MatchTriage.
+    """
+
+    try:
+        decoded = decode_pbp(sackmann_str)
+    except AssertionError:
+        return MatchTriage('invalid_pbp', None)
+
+    n_points = len(decoded.server_won)
+
+    cur_format = SLAM_FORMATS.get(tny_name, fmts.standard_best_of_three)
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state(first_server, first_returner))
+
+    def diverge(decoded: DecodedPbp,
+                format_functions: FormatFunctions) -> Divergence:
+        return first_divergence(decoded, start_state, format_functions,
+                                transition_cache)
+
+    divergence = diverge(decoded, cur_format)
+
+    if divergence.kind is None:
+        if compact_state_matches_score(divergence.state, sackmann_score):
+            return MatchTriage('ok', divergence, n_points)
+        return MatchTriage('score_mismatch', divergence, n_points)
+
+    if divergence.kind == 'unfinished':
+
+        # Only a retirement if no other format finishes the match with
+        # Jeff's score, which then ends in "RET".
+        for cur_format_name, cur_other_format in fmts.FORMATS.items():
+
+            if cur_other_format is cur_format:
+                continue
+
+            other_divergence = diverge(decoded, cur_other_format)
+
+            if other_divergence.kind is None and compact_state_matches_score(
+                    other_divergence.state, sackmann_score):
+                return MatchTriage('format', divergence, n_points,
+                                   other_format=cur_format_name)
+
+        return MatchTriage('retirement', divergence, n_points)
+
+    for cur_format_name, cur_other_format in fmts.FORMATS.items():
+        if cur_other_format is not cur_format and _agrees(
+                diverge(decoded, cur_other_format)):
+            return MatchTriage('format', divergence, n_points,
+                               other_format=cur_format_name)
+
+    # The games from which the server may have been swapped: each game of
+    # the set in which the boundaries disagree, latest first, and then the
+    # first game of each set before, since swapping the server for whole
+    # sets only changes who wins them. Swapping the server from a game on
+    # means the other player won each of the points after.
+    first_points = np.concatenate([[0], decoded.game_ends + 1])
+    set_ends = decoded.set_ends[decoded.set_ends < divergence.point]
+    set_starts = [0] + np.searchsorted(decoded.game_ends, set_ends,
+                                       side='right').tolist()
+    diverging_game = int(np.searchsorted(decoded.game_ends,
+                                         divergence.point))
+
+    candidates = dict.fromkeys(
+        list(range(diverging_game, set_starts[-1] - 1, -1)) +
+        set_starts[::-1])
+
+    for cur_game in candidates:
+
+        server_won = decoded.server_won.copy()
+        server_won[first_points[cur_game]:] ^= True
+
+        if _agrees(diverge(decoded._replace(server_won=server_won),
+                           cur_format)):
+            return MatchTriage('server_order', divergence, n_points,
+                               swapped_game=cur_game)
+
+    return MatchTriage('unknown', divergence, n_points)
+
+
+# The columns of the DataFrame returned by triage_all.
+TRIAGE_COLUMNS = ['cause', 'divergence', 'point', 'n_points', 'parsed_score',
+                  'score', 'other_format', 'swapped_game']
+
+
+def triage_all(sackmann_df: pd.DataFrame,
+               transition_cache: Optional[TransitionCache] = None,
+               include_ok: bool = False) -> pd.DataFrame:
+    """
+    Triages all the matches in Jeff's data which do not parse to his score.
+    Matches are first checked quickly as in validate_all, and only those
+    which fail are triaged [see triage_match].
+
+    Args:
+        sackmann_df: The loaded data.
+        transition_cache: Optionally, a TransitionCache to speed up parsing.
+            By default, a new one.
+        include_ok: If True, the matches which parse to Jeff's score are
+            included too, with cause "ok".
+
+    Returns:
+        A DataFrame with the same index as the triaged matches and the
+        TRIAGE_COLUMNS: the "cause", the "divergence" kind and the "point"
+        where it happens, the "n_points" of the match, the "parsed_score"
+        at that point and Jeff's "score", and the "other_format" and
+        "swapped_game" as in MatchTriage.
+    """
+
+    if transition_cache is None:
+        transition_cache = TransitionCache()
+
+    index = list()
+    rows = list()
+
+    for cur_index, *cur_columns in zip(
+            sackmann_df.index, *[sackmann_df[x].tolist()
+                                 for x in VALIDATION_COLUMNS]):
+
+        matches_sack, _ = validate_match(
+            *cur_columns, transition_cache=transition_cache)
+
+        if matches_sack:
+            if include_ok:
+                index.append(cur_index)
+                rows.append(('ok', None, None, None, None, cur_columns[3],
+                             None, None))
+            continue
+
+        cur_triage = triage_match(*cur_columns,
+                                  transition_cache=transition_cache)
+        divergence = cur_triage.divergence
+
+        if divergence is None:
+            kind, point, parsed_score = None, None, None
+        else:
+            kind, point = divergence.kind, divergence.point
+            parsed_score = match_summary_string(
+                divergence.state.to_match_state(), score_only=True)
+
+        index.append(cur_index)
+        rows.append((cur_triage.cause, kind, point, cur_triage.n_points,
+                     parsed_score, cur_columns[3], cur_triage.other_format,
+                     cur_triage.swapped_game))
+
+    triaged = pd.DataFrame(rows, columns=TRIAGE_COLUMNS,
+                           index=pd.Index(index, name=sackmann_df.index.name))
+
+    for cur_column in ['point', 'n_points', 'swapped_game']:
+        triaged[cur_column] = triaged[cur_column].astype('Int64')
+
+    triaged['cause'] = pd.Categorical(triaged['cause'], categories=CAUSES)
+
+    return triaged
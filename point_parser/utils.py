@@ -1,4 +1,15 @@
-from .match_state import MatchState
+from typing import Iterable, List, Tuple, Union
+from .match_state import (MatchState, CompactMatchState, CompactSet,
+                          CompletedSet)
+
+# The names of the points in a service game.
+_POINT_NAMES = {
+    0: '0',
+    1: '15',
+    2: '30',
+    3: '40',
+    4: 'AD',
+}
 
 
 def transform_to_score_format(points_p1: int, points_p2: int) -> str:
@@ -15,13 +26,7 @@ def transform_to_score_format(points_p1: int, points_p2: int) -> str:
         points_p2=0.
     """
 
-    lookup = {
-        0: '0',
-        1: '15',
-        2: '30',
-        3: '40',
-        4: 'AD',
-    }
+    lookup = _POINT_NAMES
 
     if max(points_p1, points_p2) > 3:
 
@@ -125,3 +130,199 @@ def create_start_match_state(first_server: str, first_returner: str,
         past_sets=list(),
         is_over=False
     )
+
+
+# The score in a service game for each pair of points won up to deuce.
+# Longer games are added as they come up [see ScoreRenderer].
+_GAME_SCORES = {(x, y): transform_to_score_format(x, y)
+                for x in range(5) for y in range(5)
+                if max(x, y) <= 3 or abs(x - y) <= 1}
+
+
+class ScoreRenderer:
+    """
+    Renders the same strings as match_summary_string, but faster when called
+    on consecutive states of a match.
+
+    The completed sets are only formatted once, when the set ends, and
+    scores in service games are looked up in a table. This works best with
+    CompactMatchStates from iter_compact_states, which all share the same
+    past_sets within a set, but MatchStates are supported too.
+
+    Example::
+
+        renderer = ScoreRenderer()
+
+        for cur_state in p.iter_compact_states(win_loss, start_state, fmt):
+            print(renderer.render(cur_state))
+    """
+
+    def __init__(self, score_only: bool = False):
+        """
+        Args:
+            score_only: If True, only renders the score, not the names of
+                the server & returner.
+        """
+
+        self.score_only = score_only
+
+        self._past_sets = ()
+        self._players = None
+
+        # The completed sets, from the point of view of each player.
+        self._prefixes = ('', '')
+
+    def _set_string(self, cur_set: CompactSet, first: int) -> str:
+
+        to_add = (f' {cur_set.player_scores[first]}-'
+                  f'{cur_set.player_scores[1 - first]}')
+
+        if cur_set.tiebreak_score is not None:
+            to_add += f'({min(cur_set.tiebreak_score)})'
+
+        return to_add
+
+    def _update_prefixes(self, past_sets: Tuple[CompactSet, ...]):
+
+        n_cached = len(self._past_sets)
+
+        if past_sets[:n_cached] != self._past_sets:
+            n_cached = 0
+            self._prefixes = ('', '')
+
+        self._prefixes = tuple(
+            cur_prefix + ''.join(self._set_string(x, cur_first)
+                                 for x in past_sets[n_cached:])
+            for cur_first, cur_prefix in enumerate(self._prefixes))
+
+        self._past_sets = past_sets
+
+    def render(self, match_state: Union[MatchState, CompactMatchState]) \
+            -> str:
+        """
+        Summarises the match state in the usual scoring format.
+
+        Args:
+            match_state: The current state of the match.
+
+        Returns:
+            The same string as match_summary_string.
+        """
+
+        if isinstance(match_state, MatchState):
+            return self._render_match_state(match_state)
+
+        if match_state.past_sets is not self._past_sets:
+            self._update_prefixes(match_state.past_sets)
+
+        if match_state.is_over:
+            first = int(match_state.sets_won[1] > match_state.sets_won[0])
+        else:
+            first = match_state.server
+
+        return self._render(match_state.players, first, match_state.is_over,
+                            match_state.is_tiebreak, match_state.cur_set_score,
+                            match_state.cur_game_score)
+
+    def _render_match_state(self, match_state: MatchState) -> str:
+        # Renders a MatchState without converting all of it.
+
+        p1, p2 = players = (match_state.first_server,
+                            match_state.first_returner)
+
+        if not self._same_sets(players, match_state.past_sets):
+            self._update_prefixes(
+                CompactMatchState.from_match_state(match_state).past_sets)
+            self._players = players
+
+        if match_state.is_over:
+            sets_won = match_state.sets_won
+            first = int(sets_won[p2] > sets_won[p1])
+        else:
+            first = int(match_state.server == p2)
+
+        cur_set_score = match_state.cur_set_score
+        cur_game_score = match_state.cur_game_score
+
+        return self._render(players, first, match_state.is_over,
+                            match_state.is_tiebreak,
+                            (cur_set_score[p1], cur_set_score[p2]),
+                            (cur_game_score[p1], cur_game_score[p2]))
+
+    def _same_sets(self, players: Tuple[str, str],
+                   past_sets: List[CompletedSet]) -> bool:
+        # Whether the completed sets are those cached.
+
+        if players != self._players or len(past_sets) != len(
+                self._past_sets):
+            return False
+
+        p1, p2 = players
+
+        for cur_set, cur_cached in zip(past_sets, self._past_sets):
+
+            scores = cur_set.player_scores
+            tiebreak_score = cur_set.tiebreak_score
+
+            if (scores[p1], scores[p2]) != cur_cached.player_scores:
+                return False
+
+            if tiebreak_score is None:
+                if cur_cached.tiebreak_score is not None:
+                    return False
+            elif (tiebreak_score[p1], tiebreak_score[p2]) != \
+                    cur_cached.tiebreak_score:
+                return False
+
+        return True
+
+    def _render(self, players: Tuple[str, str], first: int, is_over: bool,
+                is_tiebreak: bool, cur_set_score: Tuple[int, int],
+                cur_game_score: Tuple[int, int]) -> str:
+
+        second = 1 - first
+
+        if self.score_only:
+            string = self._prefixes[first]
+        else:
+            string = (f'{players[first]} - {players[second]}:' +
+                      self._prefixes[first])
+
+        if is_over:
+            return string.strip()
+
+        game_score = (cur_game_score[first], cur_game_score[second])
+
+        if is_tiebreak:
+            game_string = f'{game_score[0]}:{game_score[1]}'
+        elif game_score in _GAME_SCORES:
+            game_string = _GAME_SCORES[game_score]
+        else:
+            game_string = transform_to_score_format(*game_score)
+            _GAME_SCORES[game_score] = game_string
+
+        string += (f' {cur_set_score[first]}-{cur_set_score[second]} '
+                   f'{game_string}')
+
+        return string.strip()
+
+
+def match_summary_strings(
+        match_states: Iterable[Union[MatchState, CompactMatchState]],
+        score_only: bool = False) -> List[str]:
+    """
+    Renders the summary string of each state of a match [see
+    match_summary_string and ScoreRenderer].
+
+    Args:
+        match_states: The states, in order.
+        score_only: If True, only returns the scores, not the names of the
+            server & returner.
+
+    Returns:
+        A list with the summary of each state.
+    """
+
+    renderer = ScoreRenderer(score_only)
+
+    return [renderer.render(x) for x in match_states]
@@ -0,0 +1,531 @@
+import numpy as np
+import pandas as pd
+from functools import lru_cache
+from typing import Callable, Dict, Tuple, Union
+from .format_functions import FormatFunctions
+from .match_state import MatchState, CompactMatchState
+from .manipulate_match_state import advance_compact_state
+from .compare_with_sackmann import get_format_codes
+import point_parser.formats as fmts
+
+"""
+This module computes the probability of each player winning a match from any
+score, if each player wins a fixed share of the points on their serve, and
+how important each point is.
+
+The probabilities are found level by level: the chance of holding serve from
+any score in a game, of winning a tiebreak, a set, and finally the match.
+Each level is a memoised recursion over the scores which can be reached, and
+uses the format functions in the same way as advance_compact_state. Wherever
+a tied score can repeat forever (deuce, a tiebreak at 6-6, an advantage
+final set), the recursion is closed with the chance of winning two in a row
+first: if x and y are the chances of each player winning both of the next
+two, the first player wins with probability x / (x + y).
+
+As in TransitionCache, the server is assumed to change after every game, as
+it does in all the formats in formats.py.
+"""
+
+# How far beyond a tied score the rules are checked to see whether it can
+# repeat forever.
+_LOOKAHEAD = 50
+
+
+def _endless_tie(score: int, over: Callable[[int, int], bool],
+                 also: Callable[[int], bool] = lambda _: True) -> bool:
+    # Whether, from a tie at score-score, a player has to win two in a row,
+    # and a split brings back the same situation, one higher.
+
+    for cur_score in range(score, score + _LOOKAHEAD):
+
+        if (over(cur_score + 1, cur_score) or over(cur_score, cur_score + 1)
+                or not over(cur_score + 2, cur_score)
+                or not over(cur_score, cur_score + 2)
+                or not also(cur_score)):
+            return False
+
+    return True
+
+
+def _first_to_two(x: float, y: float) -> float:
+
+    if x + y == 0:
+        raise ValueError('With these serve probabilities, the match can '
+                         'never end.')
+
+    return x / (x + y)
+
+
+class WinProbabilityTable:
+    """
+    The probability of the first server winning the match from any score,
+    and the importance of each point, for one format and one pair of serve
+    probabilities.
+
+    The tables for all the scores which can be reached from the start of a
+    match are filled in when the table is created, so that each lookup only
+    combines a handful of table entries.
+
+    Example::
+
+        table = WinProbabilityTable(fmts.standard_best_of_three, (0.65, 0.6))
+
+        table.win_probability(state)
+        table.importance(state)
+    """
+
+    def __init__(self, format_functions: FormatFunctions,
+                 serve_probs: Tuple[float, float]):
+        """
+        Args:
+            format_functions: The functions encoding the rules of the match.
+            serve_probs: The probability of each player winning a point on
+                their serve. Player 0 is the first server.
+        """
+
+        self.format_functions = format_functions
+        self.serve_probs = tuple(float(x) for x in serve_probs)
+
+        self._hold = lru_cache(maxsize=None)(self._compute_hold)
+        self._tiebreak = lru_cache(maxsize=None)(self._compute_tiebreak)
+        self._set = lru_cache(maxsize=None)(self._compute_set)
+        self._match = lru_cache(maxsize=None)(self._compute_match)
+
+        # Scores which have been looked up before.
+        self._state = lru_cache(maxsize=2 ** 16)(self._compute_state)
+
+        # Fill in the tables.
+        self._match(0, 0, 0)
+
+    def _compute_hold(self, points_server: int, points_returner: int,
+                      server: int) -> float:
+        # The probability of the server winning the game.
+
+        service_game_over = self.format_functions.service_game_over
+        prob = self.serve_probs[server]
+
+        if service_game_over(points_server, points_returner):
+            return float(points_server > points_returner)
+
+        if (points_server == points_returner and
+                _endless_tie(points_server, service_game_over)):
+            return _first_to_two(prob ** 2, (1 - prob) ** 2)
+
+        return (prob * self._hold(points_server + 1, points_returner, server)
+                + (1 - prob) * self._hold(points_server, points_returner + 1,
+                                          server))
+
+    def _tiebreak_server(self, total_points: int, start_server: int) -> int:
+
+        if total_points == 0:
+            return start_server
+
+        return self.format_functions.tiebreak_roles(
+            total_points, start_server, 1 - start_server)[0]
+
+    def _compute_tiebreak(self, points_p1: int, points_p2: int,
+                          start_server: int, is_final_set: bool) -> float:
+        # The probability of player 0 winning the tiebreak.
+
+        total_points = points_p1 + points_p2
+        server = self._tiebreak_server(total_points, start_server)
+
+        # The chance of player 0 winning each of the next two points.
+        win_next = [
+            self.serve_probs[0] if x == 0 else 1 - self.serve_probs[1]
+            for x in [server, self._tiebreak_server(total_points + 1,
+                                                    start_server)]]
+
+        def over(score_p1, score_p2):
+            return self.format_functions.tiebreak_over(score_p1, score_p2,
+                                                       is_final_set)
+
+        def same_servers(score):
+            # The next two points are served as they are now.
+            return sorted(
+                self._tiebreak_server(2 * score + x, start_server)
+                for x in range(2)) == sorted(
+                    self._tiebreak_server(total_points + x, start_server)
+                    for x in range(2))
+
+        if points_p1 == points_p2 and _endless_tie(points_p1, over,
+                                                   same_servers):
+            return _first_to_two(win_next[0] * win_next[1],
+                                 (1 - win_next[0]) * (1 - win_next[1]))
+
+        result = 0.
+
+        for cur_winner, cur_prob in [(0, win_next[0]), (1, 1 - win_next[0])]:
+
+            new_p1 = points_p1 + (cur_winner == 0)
+            new_p2 = points_p2 + (cur_winner == 1)
+
+            # The function is called with the score of the point's server
+            # first, as in advance_compact_state.
+            new_scores = (new_p1, new_p2) if server == 0 else (new_p2, new_p1)
+
+            if self.format_functions.tiebreak_over(*new_scores,
+                                                   is_final_set):
+                result += cur_prob * (cur_winner == 0)
+            else:
+                result += cur_prob * self._tiebreak(new_p1, new_p2,
+                                                    start_server,
+                                                    is_final_set)
+
+        return result
+
+    def _game_win_prob(self, server: int, is_tiebreak: bool,
+                       is_final_set: bool) -> float:
+        # The probability of player 0 winning a game from its start.
+
+        if is_tiebreak:
+            return self._tiebreak(0, 0, server, is_final_set)
+
+        hold = self._hold(0, 0, server)
+
+        return hold if server == 0 else 1 - hold
+
+    def _after_game(self, games_p1: int, games_p2: int, winner: int,
+                    next_server: int, is_final_set: bool) \
+            -> Dict[Tuple[int, int], float]:
+        # The outcome of the set once a game has been won, as for _set.
+
+        games = [games_p1, games_p2]
+        games[winner] += 1
+
+        if self.format_functions.set_win_condition(
+                games[winner], games[1 - winner], is_final_set):
+            return {(winner, next_server): 1.}
+
+        is_tiebreak = bool(self.format_functions.is_tiebreak_fun(
+            games[winner], games[1 - winner], is_final_set))
+
+        return self._set(games[0], games[1], next_server, is_tiebreak,
+                         is_final_set)
+
+    def _compute_set(self, games_p1: int, games_p2: int, server: int,
+                     is_tiebreak: bool, is_final_set: bool) \
+            -> Dict[Tuple[int, int], float]:
+        # The probability of each player winning the set, together with who
+        # serves first in the next one, as a dictionary from (winner,
+        # next_server) to the probability.
+
+        rules = self.format_functions
+
+        def over(score_p1, score_p2):
+            return rules.set_win_condition(score_p1, score_p2, is_final_set)
+
+        def no_tiebreak(score):
+            return not any(rules.is_tiebreak_fun(score + x, score + y,
+                                                 is_final_set)
+                           for x, y in [(0, 0), (1, 0), (0, 1)])
+
+        if (games_p1 == games_p2 and not is_tiebreak and
+                _endless_tie(games_p1, over, no_tiebreak)):
+
+            # Each player serves one of the next two games, after which the
+            # same player serves again.
+            win_first = self._game_win_prob(server, False, is_final_set)
+            win_second = self._game_win_prob(1 - server, False, is_final_set)
+
+            prob_p1 = _first_to_two(win_first * win_second,
+                                    (1 - win_first) * (1 - win_second))
+
+            return {(0, server): prob_p1, (1, server): 1 - prob_p1}
+
+        win_game = self._game_win_prob(server, is_tiebreak, is_final_set)
+
+        result = dict()
+
+        for cur_winner, cur_prob in [(0, win_game), (1, 1 - win_game)]:
+            for cur_outcome, cur_outcome_prob in self._after_game(
+                    games_p1, games_p2, cur_winner, 1 - server,
+                    is_final_set).items():
+                result[cur_outcome] = (result.get(cur_outcome, 0.) +
+                                       cur_prob * cur_outcome_prob)
+
+        return result
+
+    def _after_set(self, sets_p1: int, sets_p2: int,
+                   set_outcomes: Dict[Tuple[int, int], float]) -> float:
+        # The probability of player 0 winning the match, given the
+        # probabilities of the outcomes of the current set.
+
+        result = 0.
+
+        for (cur_winner, cur_next_server), cur_prob in set_outcomes.items():
+
+            sets = [sets_p1, sets_p2]
+            sets[cur_winner] += 1
+
+            if self.format_functions.match_over_fun(sets[cur_winner],
+                                                    sets[1 - cur_winner]):
+                result += cur_prob * (cur_winner == 0)
+            else:
+                result += cur_prob * self._match(sets[0], sets[1],
+                                                 cur_next_server)
+
+        return result
+
+    def _compute_match(self, sets_p1: int, sets_p2: int,
+                       server: int) -> float:
+        # The probability of player 0 winning the match from the start of a
+        # set.
+
+        is_final_set = bool(self.format_functions.is_final_set(
+            sets_p1 + sets_p2))
+
+        # The set may start with a tiebreak, as in a match tiebreak.
+        is_tiebreak = bool(self.format_functions.is_tiebreak_fun(
+            0, 0, is_final_set))
+
+        return self._after_set(
+            sets_p1, sets_p2, self._set(0, 0, server, is_tiebreak,
+                                        is_final_set))
+
+    def win_probability(self, match_state: Union[MatchState,
+                                                 CompactMatchState]) \
+            -> float:
+        """
+        Returns the probability of the first server winning the match.
+
+        Args:
+            match_state: The current state of the match.
+
+        Returns:
+            The probability.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        (_, server, is_tiebreak, set_num, total_games_played, set_score,
+         game_score, sets_won, _, is_over) = match_state
+
+        return self._state(server, is_tiebreak, set_num, total_games_played,
+                           set_score, game_score, sets_won, is_over)
+
+    def _compute_state(self, server: int, is_tiebreak: bool, set_num: int,
+                       total_games_played: int, set_score: Tuple[int, int],
+                       game_score: Tuple[int, int], sets_won: Tuple[int, int],
+                       is_over: bool) -> float:
+        # The probability of player 0 winning the match from any score.
+
+        if is_over:
+            return float(sets_won[0] > sets_won[1])
+
+        rules = self.format_functions
+        is_final_set = bool(rules.is_final_set(set_num))
+
+        # The current game...
+        if is_tiebreak:
+            start_server = rules.roles_at_game_start(total_games_played, 0,
+                                                     1)[0]
+            win_game = self._tiebreak(game_score[0], game_score[1],
+                                      start_server, is_final_set)
+        else:
+            hold = self._hold(game_score[server], game_score[1 - server],
+                              server)
+            win_game = hold if server == 0 else 1 - hold
+
+        # ...then the rest of the set and the match.
+        next_server = rules.roles_at_game_start(total_games_played + 1, 0,
+                                                1)[0]
+
+        set_outcomes = dict()
+
+        for cur_winner, cur_prob in [(0, win_game), (1, 1 - win_game)]:
+            for cur_outcome, cur_outcome_prob in self._after_game(
+                    set_score[0], set_score[1], cur_winner, next_server,
+                    is_final_set).items():
+                set_outcomes[cur_outcome] = (
+                    set_outcomes.get(cur_outcome, 0.) +
+                    cur_prob * cur_outcome_prob)
+
+        return self._after_set(sets_won[0], sets_won[1], set_outcomes)
+
+    def hold_probability(self, server: int,
+                         points: Tuple[int, int] = (0, 0)) -> float:
+        """
+        Returns the probability of a player holding serve in a game which is
+        not a tiebreak.
+
+        Args:
+            server: The player serving, 0 for the first server.
+            points: The points won in the game by the server and by the
+                returner, in that order.
+
+        Returns:
+            The probability.
+        """
+
+        return self._hold(points[0], points[1], server)
+
+    def server_win_probability(self, match_state: Union[MatchState,
+                                                        CompactMatchState]) \
+            -> float:
+        """
+        Returns the probability of the player about to serve winning the
+        match.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        win_prob = self.win_probability(match_state)
+
+        return win_prob if match_state.server == 0 else 1 - win_prob
+
+    def importance(self, match_state: Union[MatchState, CompactMatchState]) \
+            -> float:
+        """
+        Returns the importance of the next point: how much more likely the
+        server is to win the match if they win the point than if they lose
+        it.
+
+        Args:
+            match_state: The current state of the match.
+
+        Returns:
+            The importance, between 0 and 1.
+        """
+
+        if isinstance(match_state, MatchState):
+            match_state = CompactMatchState.from_match_state(match_state)
+
+        if match_state.is_over:
+            return 0.
+
+        difference = (
+            self.win_probability(advance_compact_state(
+                True, match_state, self.format_functions)) -
+            self.win_probability(advance_compact_state(
+                False, match_state, self.format_functions)))
+
+        return difference if match_state.server == 0 else -difference
+
+
+# The columns of the points frames needed to find the state.
+_STATE_COLUMNS = ['server', 'is_tiebreak', 'set_num', 'total_games_played',
+                  'games_p1', 'games_p2', 'points_p1', 'points_p2',
+                  'sets_won_p1', 'sets_won_p2', 'is_over']
+
+
+def _annotate_rows(points: pd.DataFrame,
+                   table: WinProbabilityTable) -> Dict[str, np.ndarray]:
+    # Computes the new columns for points played in the table's format.
+
+    keys = np.stack([points[x].to_numpy(dtype=np.int64)
+                     for x in _STATE_COLUMNS], axis=1)
+
+    # Only look up each distinct state once.
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    start_state = CompactMatchState(
+        ('', ''), 0, False, 0, 0, (0, 0), (0, 0), (0, 0), (), False)
+
+    win_prob = np.zeros(len(unique_keys))
+    next_importance = np.zeros(len(unique_keys))
+
+    for cur_row, (server, is_tiebreak, set_num, total_games_played, games_p1,
+                  games_p2, points_p1, points_p2, sets_p1, sets_p2,
+                  is_over) in enumerate(unique_keys.tolist()):
+
+        cur_state = CompactMatchState(
+            ('', ''), server, bool(is_tiebreak), set_num, total_games_played,
+            (games_p1, games_p2), (points_p1, points_p2), (sets_p1, sets_p2),
+            (), bool(is_over))
+
+        win_prob[cur_row] = table.win_probability(cur_state)
+        next_importance[cur_row] = table.importance(cur_state)
+
+    win_prob = win_prob[inverse]
+    next_importance = next_importance[inverse]
+
+    # Each row holds the state after its point, so the point was played from
+    # the state in the row before, or from the start of the match.
+    if 'point' in points:
+        first_point = points['point'].to_numpy() == 0
+    else:
+        first_point = np.arange(len(points)) == 0
+
+    importance = np.empty(len(points))
+    importance[1:] = next_importance[:-1]
+    importance[first_point] = table.importance(start_state)
+
+    server = points['server'].to_numpy()
+
+    return {
+        'win_prob_p1': win_prob,
+        'win_prob_server': np.where(server == 0, win_prob, 1 - win_prob),
+        'importance': importance
+    }
+
+
+def annotate(points: pd.DataFrame, format_functions: FormatFunctions,
+             serve_probs: Tuple[float, float]) -> pd.DataFrame:
+    """
+    Adds win probabilities and importances to the points of matches played
+    in the same format.
+
+    Args:
+        points: The points, as returned by columnar.match_to_frame. Several
+            matches can be given if there is a "point" column numbering the
+            points of each match, as in columnar.sackmann_to_frame.
+        format_functions: The format of the matches.
+        serve_probs: The probability of each player winning a point on their
+            serve, with the first server first.
+
+    Returns:
+        A copy of points with the columns "win_prob_p1", the probability of
+        the first server winning the match after the point, "win_prob_server",
+        the same for the player serving next (as in the "server" column), and
+        "importance", the importance of the point [see
+        WinProbabilityTable.importance].
+    """
+
+    table = WinProbabilityTable(format_functions, serve_probs)
+
+    return points.assign(**_annotate_rows(points, table))
+
+
+def annotate_sackmann_points(points: pd.DataFrame,
+                             sackmann_df: pd.DataFrame,
+                             serve_probs: Tuple[float, float]) \
+        -> pd.DataFrame:
+    """
+    Adds win probabilities and importances to the points of all the matches
+    in Jeff's data [see annotate].
+
+    Args:
+        points: The points, as returned by columnar.sackmann_to_frame.
+        sackmann_df: The data passed to sackmann_to_frame, used to find the
+            format of each match.
+        serve_probs: The probability of each player winning a point on their
+            serve, with the first server first. The same probabilities are
+            used for all matches.
+
+    Returns:
+        A copy of points with the columns added by annotate.
+    """
+
+    formats = list(fmts.FORMATS.values())
+
+    format_codes = pd.Series(get_format_codes(sackmann_df['tny_name']),
+                             index=sackmann_df.index)
+    point_codes = format_codes.loc[points['match']].to_numpy()
+
+    columns = {x: np.zeros(len(points))
+               for x in ['win_prob_p1', 'win_prob_server', 'importance']}
+
+    for cur_code in np.unique(point_codes):
+
+        cur_rows = np.flatnonzero(point_codes == cur_code)
+        table = WinProbabilityTable(formats[cur_code], serve_probs)
+
+        for cur_column, cur_values in _annotate_rows(
+                points.iloc[cur_rows], table).items():
+            columns[cur_column][cur_rows] = cur_values
+
+    return points.assign(**columns)
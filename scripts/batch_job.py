@@ -0,0 +1,67 @@
+import argparse
+import json
+from point_parser.jobs import (plan_job, run_shards, run_local, merge_job,
+                               pending_shards)
+
+"""
+Validates archives of Jeff's data as a sharded batch job [see
+point_parser/jobs.py], for example:
+
+    python scripts/batch_job.py plan job pbp_matches_atp_main_archive.csv
+    python scripts/batch_job.py run job --processes 8
+    python scripts/batch_job.py merge job
+
+The run step can be started on any number of machines sharing the job
+directory, and started again to resume a job which crashed.
+"""
+
+parser = argparse.ArgumentParser(description='Validates Jeff\'s data in '
+                                 'shards.')
+subparsers = parser.add_subparsers(dest='command', required=True)
+
+plan_parser = subparsers.add_parser('plan', help='Writes the manifest.')
+plan_parser.add_argument('job_dir')
+plan_parser.add_argument('input_files', nargs='+')
+plan_parser.add_argument('--shard-size', type=int, default=10000,
+                         help='Rows in each shard.')
+plan_parser.add_argument('--keep-unusual-events', action='store_true',
+                         help='Keep Davis Cup, Hopman Cup etc.')
+
+run_parser = subparsers.add_parser('run', help='Processes the shards.')
+run_parser.add_argument('job_dir')
+run_parser.add_argument('--processes', type=int, default=1)
+run_parser.add_argument('--stale-after', type=float,
+                        help='Seconds after which shards claimed by another '
+                        'process are processed again.')
+
+merge_parser = subparsers.add_parser('merge', help='Merges the results.')
+merge_parser.add_argument('job_dir')
+
+args = parser.parse_args()
+
+if args.command == 'plan':
+
+    manifest = plan_job(args.input_files, args.job_dir,
+                        shard_size=args.shard_size,
+                        discard_unusual_events=not args.keep_unusual_events)
+    print(f'{len(manifest["shards"])} shards.')
+
+elif args.command == 'run':
+
+    if args.processes > 1:
+        processed = run_local(args.job_dir, args.processes,
+                              stale_after=args.stale_after)
+    else:
+        processed = run_shards(args.job_dir, stale_after=args.stale_after)
+
+    print(f'Processed {len(processed)} shards, '
+          f'{len(pending_shards(args.job_dir))} left.')
+
+else:
+
+    matches, mismatches = merge_job(args.job_dir)
+    print(json.dumps({
+        'matches': len(matches),
+        'mismatches': len(mismatches),
+        'causes': mismatches['cause'].value_counts().to_dict()
+    }, indent=2))
@@ -0,0 +1,33 @@
+import argparse
+import json
+from point_parser.benchmark import run_benchmarks
+
+"""
+Runs the benchmarks in point_parser/benchmark.py and writes the results as
+JSON, for example:
+
+    python scripts/benchmark.py --output before.json
+"""
+
+parser = argparse.ArgumentParser(description='Benchmarks the point parser.')
+parser.add_argument('--matches-per-format', type=int, default=20,
+                    help='Random matches to create in each format.')
+parser.add_argument('--final-set-games', type=int, default=40,
+                    help='Games in the long final sets.')
+parser.add_argument('--validation-matches', type=int, default=200,
+                    help='Matches to run validate_all on.')
+parser.add_argument('--seed', type=int, default=0)
+parser.add_argument('--output', help='File to write to, instead of stdout.')
+
+args = parser.parse_args()
+
+results = run_benchmarks(n_per_format=args.matches_per_format,
+                         seed=args.seed,
+                         final_set_games=args.final_set_games,
+                         n_validation_matches=args.validation_matches)
+
+if args.output is None:
+    print(json.dumps(results, indent=2))
+else:
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
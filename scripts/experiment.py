@@ -1,12 +1,10 @@
-import sys
 import numpy as np
 import point_parser.parse as p
+import point_parser.utils as utils
 from point_parser.formats import classic_slam_format_men
 
 
-sys.setrecursionlimit(10000)
-
-start_state = p.create_start_match_state('Roger Federer', 'Rafael Nadal')
+start_state = utils.create_start_match_state('Roger Federer', 'Rafael Nadal')
 
 wl_vector = np.random.choice([True, False], size=300, p=[0.95, 0.05])
 
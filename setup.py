@@ -7,5 +7,10 @@ setup(
     name='tennis-point-parser',
     version=getenv("VERSION", "LOCAL"),
     description='Parses tennis points',
-    packages=find_packages()
+    packages=find_packages(),
+    entry_points={
+        'console_scripts': [
+            'tennis-point-parser = point_parser.cli:main'
+        ]
+    }
 )
@@ -16,7 +16,7 @@ def test_against_sackmann():
                   'pbp_matches_wta_main_archive.csv',
                   'pbp_matches_wta_main_current.csv']
 
-    # TODO: 36 seems high. Check them in detail!
+    # TODO: 36 seems high. Check them in detail [see triage.triage_all]!
     expected_wrong = [4, 36, 2, 0]
 
     for cur_sack_file, cur_expected in zip(sack_files, expected_wrong):
@@ -0,0 +1,81 @@
+import random
+import numpy as np
+import point_parser.parse as p
+import point_parser.batch as batch
+import point_parser.formats as fmts
+from point_parser.match_state import CompactMatchState
+from point_parser.synthetic import random_win_loss
+from point_parser.utils import create_start_match_state
+
+
+def test_parse_batch_matches_iter_compact_states():
+
+    rng = random.Random(3)
+
+    vectors, codes = list(), list()
+
+    for cur_code, cur_format in enumerate(fmts.FORMATS.values()):
+        for _ in range(15):
+            vectors.append(random_win_loss(rng.uniform(0.5, 0.9),
+                                           cur_format, rng))
+            codes.append(cur_code)
+
+    # Unfinished matches should work, too.
+    vectors.append(vectors[0][:50])
+    codes.append(codes[0])
+    vectors.append([])
+    codes.append(1)
+
+    win_loss, offsets = batch.concatenate_matches(vectors)
+    states, failed = batch.parse_batch(win_loss, offsets, codes)
+
+    assert(not failed.any())
+
+    formats = list(fmts.FORMATS.values())
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    for cur_match, (cur_vector, cur_code) in enumerate(zip(vectors, codes)):
+
+        expected = p.iter_compact_states(cur_vector, start_state,
+                                         formats[cur_code])
+
+        for cur_row, cur_expected in enumerate(expected,
+                                               offsets[cur_match]):
+
+            assert(states.server[cur_row] == cur_expected.server)
+            assert(states.is_tiebreak[cur_row] == cur_expected.is_tiebreak)
+            assert(states.set_num[cur_row] == cur_expected.set_num)
+            assert(states.total_games_played[cur_row] ==
+                   cur_expected.total_games_played)
+            assert(tuple(states.cur_set_score[cur_row]) ==
+                   cur_expected.cur_set_score)
+            assert(tuple(states.cur_game_score[cur_row]) ==
+                   cur_expected.cur_game_score)
+            assert(tuple(states.sets_won[cur_row]) == cur_expected.sets_won)
+            assert(states.is_over[cur_row] == cur_expected.is_over)
+
+
+def test_parse_batch_flags_points_after_match_end():
+
+    # Two 6-0 sets, then two extra points.
+    win_loss = ([True] * 4 + [False] * 4) * 6 + [True, True]
+
+    states, failed = batch.parse_batch(
+        *batch.concatenate_matches([win_loss, win_loss[:-2]]),
+        [fmts.format_code(fmts.standard_best_of_three)] * 2)
+
+    assert(list(failed) == [True, False])
+    assert(states.is_over[len(win_loss) - 1])
+    assert(tuple(states.sets_won[len(win_loss) - 1]) == (2, 0))
+
+
+def test_standard_win_functions_on_arrays():
+
+    games_p1 = np.array([6, 7, 5, 6])
+    games_p2 = np.array([4, 6, 5, 6])
+
+    assert(list(fmts.standard_best_of_three.set_win_condition(
+        games_p1, games_p2, False)) == [True, True, False, False])
+    assert(list(fmts.standard_best_of_three.is_tiebreak_fun(
+        games_p1, games_p2, False)) == [False, False, False, True])
@@ -0,0 +1,28 @@
+import json
+from point_parser.benchmark import measure, run_benchmarks
+
+
+def test_measure():
+
+    result = measure(sum, [[1, 2], [3]], 3)
+
+    assert(result['calls'] == 2)
+    assert(result['points'] == 3)
+    assert(result['seconds'] >= 0)
+
+
+def test_run_benchmarks():
+
+    results = run_benchmarks(n_per_format=1, final_set_games=12,
+                             n_validation_matches=4)
+
+    assert(set(results['results']) == {
+        'process_win_loss_vector', 'convert_to_boolean',
+        'match_summary_string', 'match_summary_strings', 'validate_all'})
+
+    for cur_result in results['results'].values():
+        assert(cur_result['points_per_second'] > 0)
+        assert(cur_result['peak_memory_bytes'] > 0)
+
+    # The results can be saved as JSON.
+    json.dumps(results)
@@ -0,0 +1,54 @@
+import random
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.checkpoints import CheckpointIndex
+from point_parser.transition_cache import TransitionCache
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import long_final_set_win_loss, random_win_loss
+
+
+@pytest.mark.parametrize('transition_cache', [None, TransitionCache()])
+def test_checkpoint_index(transition_cache):
+
+    format_functions = fmts.classic_slam_format_men
+    win_loss = random_win_loss(0.6, format_functions, random.Random(5))
+    start_state = create_start_match_state('Roger Federer', 'Rafael Nadal')
+
+    states = p.process_win_loss_vector(win_loss, start_state,
+                                       format_functions)
+    index = CheckpointIndex(win_loss, start_state, format_functions,
+                            transition_cache=transition_cache)
+
+    assert(len(index) == len(states))
+    assert(index.n_checkpoints == states[-1].total_games_played)
+    assert([index[x] for x in range(len(states))] == states)
+    assert(index[-1] == states[-1])
+
+    with pytest.raises(IndexError):
+        index.state_at(len(states))
+
+
+def test_checkpoint_index_long_final_set():
+
+    format_functions = fmts.classic_slam_format_men
+    win_loss = long_final_set_win_loss(format_functions, 60)
+    start_state = create_start_match_state('p1', 'p2')
+
+    final_state = p.process_win_loss_vector(win_loss, start_state,
+                                            format_functions)[-1]
+    index = CheckpointIndex(win_loss, start_state, format_functions)
+
+    assert(index[len(win_loss) - 1] == final_state)
+
+
+def test_checkpoint_index_over():
+
+    win_loss = long_final_set_win_loss(fmts.standard_best_of_three)
+
+    # Points after the end of the match are an error, as in
+    # process_win_loss_vector.
+    with pytest.raises(AssertionError):
+        CheckpointIndex(win_loss + [True],
+                        create_start_match_state('p1', 'p2'),
+                        fmts.standard_best_of_three)
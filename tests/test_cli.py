@@ -0,0 +1,105 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import point_parser.cli as cli
+import point_parser.compare_with_sackmann as cws
+from point_parser.synthetic import make_sackmann_frame
+
+
+def run(argv, capsys):
+
+    status = cli.main(argv)
+    output = capsys.readouterr().out
+
+    return status, [json.loads(x) for x in output.splitlines()]
+
+
+def test_csv_and_jsonl(tmp_path, capsys):
+
+    sackmann_df = make_sackmann_frame(10)
+    sackmann_df.loc[2, 'score'] = '6-0 6-0'
+
+    csv_path = os.path.join(tmp_path, 'matches.csv')
+    jsonl_path = os.path.join(tmp_path, 'matches.jsonl')
+
+    sackmann_df.to_csv(csv_path, index=False)
+    sackmann_df.to_json(jsonl_path, orient='records', lines=True)
+
+    status, from_csv = run([csv_path, '--final-only'], capsys)
+
+    assert(status == 0)
+    assert([x['pbp_id'] for x in from_csv] ==
+           [str(x) for x in sackmann_df['pbp_id']])
+    assert([x['final_score'] for i, x in enumerate(from_csv) if i != 2] ==
+           list(sackmann_df['score'].drop(index=2)))
+    assert([x['matches_score'] for x in from_csv] ==
+           [i != 2 for i in range(10)])
+    assert(all('scores' not in x for x in from_csv))
+
+    status, from_jsonl = run([jsonl_path, '--workers', '2'], capsys)
+
+    assert(status == 0)
+    assert([x['final_score'] for x in from_jsonl] ==
+           [x['final_score'] for x in from_csv])
+    assert([x['format'] for x in from_jsonl] ==
+           [x['format'] for x in from_csv])
+
+    for cur_result, cur_match in zip(from_jsonl,
+                                     sackmann_df.itertuples()):
+
+        states = cws.process_match(
+            cur_match.server1, cur_match.server2, cur_match.pbp,
+            cws.SLAM_FORMATS.get(cur_match.tny_name,
+                                 cws.fmts.standard_best_of_three))
+
+        assert(cur_result['pbp_id'] == cur_match.pbp_id)
+        assert(cur_result['n_points'] == len(states))
+        assert(cur_result['scores'] == [
+            cws.match_summary_string(x, score_only=True) for x in states])
+
+
+def test_stdin_and_errors(monkeypatch, capsys):
+
+    won_set = ';'.join(['SSSS', 'RRRR'] * 3)
+
+    records = [{'id': 'a', 'pbp': 'SSSS;RRRR'},
+               {'id': 'b', 'pbp': 'SSXS'},
+               {'id': 'c'},
+               {'id': 'd', 'pbp': 'SSSS'},
+               {'id': 'e', 'pbp': f'{won_set}.{won_set}.S'}]
+
+    monkeypatch.setattr(sys, 'stdin', io.StringIO(
+        '\n'.join(json.dumps(x) for x in records) + '\n\n'))
+
+    status, results = run(['--format', 'no_ad_match_tiebreak'], capsys)
+
+    assert(status == 1)
+    assert([x['id'] for x in results] == ['a', 'b', 'c', 'd', 'e'])
+    assert(results[0]['format'] == 'no_ad_match_tiebreak')
+    assert(results[0]['scores'][-1] == '2-0 0:0')
+    assert(not results[0]['is_over'])
+
+    # Partial matches in which only the server has won points are fine.
+    assert(results[3]['scores'] == ['0-0 15:0', '0-0 30:0', '0-0 40:0',
+                                    '0-1 0:0'])
+
+    assert(results[1]['error'] == 'invalid_pbp: The pbp string has '
+           'characters other than "SARD;./".')
+    assert(results[2]['error'] == 'invalid_pbp: The record has no "pbp" '
+           'string.')
+    assert(results[4]['error'].startswith('points_after_end: '))
+
+
+def test_imports_without_pandas():
+
+    code = ('import sys, point_parser.cli, point_parser.parse, '
+            'point_parser.compare_with_sackmann; '
+            'print(any(x in sys.modules for x in ["pandas", "tqdm"]))')
+
+    output = subprocess.run([sys.executable, '-c', code],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(__file__)))
+
+    assert(output.stdout.strip() == 'False')
@@ -0,0 +1,75 @@
+import numpy as np
+import point_parser.parse as p
+import point_parser.columnar as columnar
+import point_parser.compare_with_sackmann as cws
+import point_parser.formats as fmts
+from point_parser.match_state import CompactMatchState
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import make_sackmann_frame, random_win_loss
+
+
+def check_columns(columns, rows, win_loss, format_functions):
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    states = p.iter_compact_states(win_loss, start_state, format_functions)
+
+    for cur_row, cur_state in zip(rows, states):
+
+        assert(columns['server'][cur_row] == cur_state.server)
+        assert(columns['is_tiebreak'][cur_row] == cur_state.is_tiebreak)
+        assert(columns['set_num'][cur_row] == cur_state.set_num)
+        assert((columns['games_p1'][cur_row], columns['games_p2'][cur_row])
+               == cur_state.cur_set_score)
+        assert((columns['points_p1'][cur_row], columns['points_p2'][cur_row])
+               == cur_state.cur_game_score)
+        assert((columns['sets_won_p1'][cur_row],
+                columns['sets_won_p2'][cur_row]) == cur_state.sets_won)
+        assert(columns['is_over'][cur_row] == cur_state.is_over)
+
+
+def test_match_to_frame():
+
+    win_loss = random_win_loss(0.65, fmts.classic_slam_format_men)
+
+    frame = columnar.match_to_frame(win_loss, 'Roger Federer',
+                                    'Rafael Nadal',
+                                    fmts.classic_slam_format_men)
+
+    assert(len(frame) == len(win_loss))
+    assert(frame['games_p1'].dtype == np.int16)
+    assert(list(frame['player_1'].cat.categories) ==
+           ['Roger Federer', 'Rafael Nadal'])
+    assert((frame['player_2'] == 'Rafael Nadal').all())
+
+    check_columns(frame, range(len(frame)), win_loss,
+                  fmts.classic_slam_format_men)
+
+
+def test_sackmann_to_frame():
+
+    sackmann_df = make_sackmann_frame(12)
+
+    # Not a valid pbp string
+    sackmann_df.loc[3, 'pbp'] = 'SSSS'
+    # Points after the end of the match
+    sackmann_df.loc[5, 'pbp'] += ';SSSS'
+
+    frame, failed = columnar.sackmann_to_frame(sackmann_df)
+
+    assert(list(failed) == [3, 5])
+    assert(set(frame['match']) == set(range(12)) - {3, 5})
+
+    for cur_match, cur_row in sackmann_df.drop(index=[3, 5]).iterrows():
+
+        rows = np.flatnonzero(frame['match'] == cur_match)
+        win_loss = cws.convert_to_boolean(cur_row.pbp)
+        cur_format = cws.SLAM_FORMATS.get(cur_row.tny_name,
+                                          fmts.standard_best_of_three)
+
+        assert(len(rows) == len(win_loss))
+        assert(list(frame['point'][rows]) == list(range(len(win_loss))))
+        assert((frame['player_1'][rows] == cur_row.server1).all())
+
+        check_columns(frame.to_dict('series'), rows, win_loss, cur_format)
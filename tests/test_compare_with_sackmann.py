@@ -0,0 +1,208 @@
+import random
+import numpy as np
+import pandas as pd
+import pytest
+import point_parser.parse as p
+import point_parser.compare_with_sackmann as cws
+import point_parser.formats as fmts
+from point_parser.match_state import CompactMatchState
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import (make_sackmann_frame, random_win_loss,
+                                    to_pbp)
+
+
+def make_frame_with_problems():
+
+    sackmann_df = make_sackmann_frame(40, seed=1)
+
+    # Wrong score, invalid pbp string, and points after the match is over.
+    sackmann_df.loc[4, 'score'] = '6-0 6-0'
+    sackmann_df.loc[17, 'pbp'] = 'SSSS'
+    sackmann_df.loc[31, 'pbp'] += ';SSSS'
+
+    return sackmann_df
+
+
+def test_convert_to_boolean():
+
+    assert(cws.convert_to_boolean('SRAD;RS/SR.S') ==
+           [True, False, True, False, False, True, True, False, True])
+
+
+def test_decode_pbp():
+
+    decoded = cws.decode_pbp('SRAD;RS/SR.S')
+
+    assert(decoded.server_won.tolist() ==
+           [True, False, True, False, False, True, True, False, True])
+    assert(decoded.game_ends.tolist() == [3, 7])
+    assert(decoded.set_ends.tolist() == [7])
+    assert(decoded.tiebreak_serve_changes.tolist() == [5])
+
+
+def test_decode_pbp_boundaries():
+
+    fmt = fmts.classic_slam_format_men
+    win_loss = random_win_loss(0.6, fmt, random.Random(3))
+
+    decoded = cws.decode_pbp(to_pbp(win_loss, fmt))
+    states = list(p.iter_compact_states(
+        win_loss, CompactMatchState.from_match_state(
+            create_start_match_state('p1', 'p2')), fmt))
+
+    games = np.array([x.total_games_played for x in states])
+    sets = np.array([len(x.past_sets) for x in states])
+
+    # The last game and set have no delimiter.
+    assert(decoded.server_won.tolist() == list(win_loss))
+    assert(decoded.game_ends.tolist() ==
+           np.flatnonzero(np.diff(games, prepend=0) != 0).tolist()[:-1])
+    assert(decoded.set_ends.tolist() ==
+           np.flatnonzero(np.diff(sets, prepend=0) != 0).tolist()[:-1])
+
+
+@pytest.mark.parametrize('pbp', ['SSSS', 'RRR;RRRR', 'SRX;SR', ''])
+def test_decode_pbp_invalid(pbp):
+
+    with pytest.raises(AssertionError):
+        cws.decode_pbp(pbp)
+
+
+def test_validate_all():
+
+    sackmann_df = make_frame_with_problems()
+
+    problematic = cws.validate_all(sackmann_df)
+
+    assert([x['match_tuple'].Index for x in problematic] == [4, 17, 31])
+    assert(problematic[0]['final_state'].is_over)
+    assert(problematic[1]['final_state'] is None)
+    assert(problematic[2]['final_state'] is None)
+
+
+def test_parse_sackmann_score():
+
+    assert(cws.parse_sackmann_score('6-4 3-6 7-6(5)') ==
+           ((6, 4, None), (3, 6, None), (7, 6, 5)))
+    assert(cws.parse_sackmann_score('7-6(10) 0-6 14-12') ==
+           ((7, 6, 10), (0, 6, None), (14, 12, None)))
+
+    for cur_score in ['6-4 2-1 RET', 'W/O', '06-4', '6-4  6-4', '', None]:
+        assert(cws.parse_sackmann_score(cur_score) is None)
+
+
+def test_compact_state_matches_score():
+
+    win_loss = random_win_loss(0.65, fmts.classic_slam_format_men,
+                               random.Random(3))
+    states = list(p.iter_compact_states(
+        win_loss, CompactMatchState.from_match_state(
+            create_start_match_state('a', 'b')),
+        fmts.classic_slam_format_men))
+
+    for cur_state in [states[-1], states[len(states) // 2]]:
+
+        summary = cws.match_summary_string(cur_state.to_match_state(),
+                                           score_only=True)
+
+        for cur_score in [summary, summary + ' RET', summary.replace(
+                '-', '-1', 1), summary.rsplit(' ', 1)[0]]:
+            assert(cws.compact_state_matches_score(cur_state, cur_score) ==
+                   (cur_score == summary))
+
+
+def test_validate_all_final_state_only():
+
+    sackmann_df = make_frame_with_problems()
+
+    # Tiebreak, retirement and formatting errors.
+    tiebreak = sackmann_df.index[sackmann_df['score'].str.contains(
+        '(', regex=False)][0]
+    sackmann_df.loc[tiebreak, 'score'] = sackmann_df.loc[
+        tiebreak, 'score'].replace(')', '0)', 1)
+    sackmann_df.loc[9, 'score'] += ' RET'
+    sackmann_df.loc[10, 'score'] = sackmann_df.loc[10, 'score'].replace(
+        ' ', '  ', 1)
+
+    expected = cws.validate_all(sackmann_df, final_state_only=False)
+    problematic = cws.validate_all(sackmann_df)
+
+    assert(problematic == expected)
+    assert({tiebreak, 9, 10} <= {x['match_tuple'].Index
+                                 for x in problematic})
+
+
+def test_validate_all_in_parallel():
+
+    sackmann_df = make_frame_with_problems()
+
+    expected = cws.validate_all(sackmann_df)
+    problematic = cws.validate_all(sackmann_df, workers=2, chunk_size=3)
+
+    assert(problematic == expected)
+
+
+def write_sackmann_csv(path):
+
+    sackmann_df = make_frame_with_problems()
+
+    # Make the file look more like Jeff's.
+    sackmann_df['tny_name'] = sackmann_df['tny_name'] + '2013.html'
+    sackmann_df.loc[7, 'tny_name'] = 'DavisCupWorldGroup'
+    sackmann_df['tour'] = 'ATP'
+    sackmann_df['winner'] = 1
+    sackmann_df['wh_minutes'] = 100
+
+    sackmann_df.to_csv(path, index=False)
+
+
+def test_iter_sackmann_data(tmp_path):
+
+    csv_file = tmp_path / 'pbp.csv'
+    write_sackmann_csv(csv_file)
+
+    expected = cws.load_sackmann_data(csv_file)
+    chunks = list(cws.iter_sackmann_data(csv_file, chunk_size=16))
+
+    # One of the first 16 rows is from the Davis Cup.
+    assert([len(x) for x in chunks] == [15, 16, 8])
+
+    loaded = pd.concat(chunks)
+
+    assert(list(loaded.columns) ==
+           list(cws.SACKMANN_COLUMNS) + ['format'])
+    assert(list(loaded.index) == list(expected.index))
+
+    for cur_column in cws.SACKMANN_COLUMNS:
+        assert((loaded[cur_column] == expected[cur_column]).all())
+
+    assert(loaded.loc[0, 'tny_name'] == 'MensFrenchOpen')
+    assert(loaded.loc[0, 'format'] == 'classic_slam_format_men')
+    assert(loaded.loc[2, 'format'] == 'standard_best_of_three')
+
+
+def test_missing_tny_name(tmp_path):
+
+    csv_file = tmp_path / 'pbp.csv'
+    write_sackmann_csv(csv_file)
+
+    sackmann_df = pd.read_csv(csv_file)
+    sackmann_df.loc[3, 'tny_name'] = None
+    sackmann_df.to_csv(csv_file, index=False)
+
+    loaded = cws.load_sackmann_data(csv_file)
+    chunks = pd.concat(cws.iter_sackmann_data(csv_file, chunk_size=16))
+
+    assert(pd.isna(loaded.loc[3, 'tny_name']))
+    assert(list(chunks.index) == list(loaded.index))
+    assert(chunks.loc[3, 'format'] == 'standard_best_of_three')
+
+
+def test_validate_sackmann_file(tmp_path):
+
+    csv_file = tmp_path / 'pbp.csv'
+    write_sackmann_csv(csv_file)
+
+    problematic = cws.validate_sackmann_file(csv_file, chunk_size=16)
+
+    assert([x['match_tuple'].Index for x in problematic] == [4, 17, 31])
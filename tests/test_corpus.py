@@ -0,0 +1,79 @@
+import numpy as np
+import point_parser.compare_with_sackmann as cws
+from point_parser.corpus import Corpus, write_corpus, validate_corpus
+from point_parser.synthetic import make_sackmann_frame
+
+
+def test_write_and_read_corpus(tmp_path):
+
+    sackmann_df = make_sackmann_frame(30, seed=4)
+    sackmann_df.loc[7, 'pbp'] = 'SSSS'
+
+    failed = write_corpus(sackmann_df, tmp_path / 'corpus')
+
+    assert(list(failed) == [7])
+
+    corpus = Corpus(tmp_path / 'corpus')
+    kept = sackmann_df.drop(index=7)
+
+    assert(len(corpus) == 29)
+
+    for cur_match, cur_row in zip(corpus, kept.itertuples()):
+
+        assert(cur_match.win_loss.tolist() ==
+               cws.convert_to_boolean(cur_row.pbp))
+        assert(cur_match.first_server == cur_row.server1)
+        assert(cur_match.first_returner == cur_row.server2)
+        assert(cur_match.tny_name == cur_row.tny_name)
+        assert(cur_match.score == cur_row.score)
+        assert(cur_match.pbp_id == cur_row.pbp_id)
+        assert(cur_match.format_functions is cws.SLAM_FORMATS.get(
+            cur_row.tny_name, cws.fmts.standard_best_of_three))
+
+    # The packed points are a view of the file.
+    assert(isinstance(corpus.packed(3).base, np.memmap))
+
+    row = kept.iloc[12]
+    states = corpus.process_match(12)
+
+    assert(states == cws.process_match(
+        row.server1, row.server2, row.pbp,
+        cws.SLAM_FORMATS.get(row.tny_name, cws.fmts.standard_best_of_three)))
+
+
+def test_write_corpus_in_chunks(tmp_path):
+
+    sackmann_df = make_sackmann_frame(25, seed=5)
+    chunks = [sackmann_df.iloc[i:i + 10] for i in range(0, 25, 10)]
+
+    write_corpus(sackmann_df, tmp_path / 'whole')
+    write_corpus(chunks, tmp_path / 'chunked')
+
+    whole = Corpus(tmp_path / 'whole')
+    chunked = Corpus(tmp_path / 'chunked')
+
+    assert(np.array_equal(whole.points, chunked.points))
+
+    for cur_whole, cur_chunked in zip(whole, chunked):
+        assert(cur_whole._replace(win_loss=None) ==
+               cur_chunked._replace(win_loss=None))
+
+
+def test_validate_corpus(tmp_path):
+
+    sackmann_df = make_sackmann_frame(40, seed=1)
+    sackmann_df.loc[4, 'score'] = '6-0 6-0'
+    sackmann_df.loc[31, 'pbp'] += ';SSSS'
+
+    write_corpus(sackmann_df, tmp_path / 'corpus')
+
+    problematic = validate_corpus(Corpus(tmp_path / 'corpus'))
+
+    assert([x['match_num'] for x in problematic] == [4, 31])
+    assert(problematic[1]['final_state'] is None)
+
+    # The same results as validate_all.
+    expected = cws.validate_all(sackmann_df)
+
+    assert([x['final_state'] for x in problematic] ==
+           [x['final_state'] for x in expected])
@@ -0,0 +1,141 @@
+import pickle
+import random
+import numpy as np
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.format_spec import FormatSpec, spec_of
+from point_parser.match_state import CompactMatchState
+from point_parser.parse_cache import ParseCache
+from point_parser.utils import create_start_match_state, match_summary_string
+from point_parser.synthetic import play_match, random_win_loss
+
+
+def parse(win_loss, format_functions):
+
+    return list(p.iter_compact_states(
+        win_loss, CompactMatchState.from_match_state(
+            create_start_match_state('p1', 'p2')),
+        format_functions))
+
+
+def test_spec_is_hashable():
+
+    spec = FormatSpec(best_of=5, final_set_tiebreak_points=10)
+
+    assert(spec == FormatSpec(best_of=5, final_set_tiebreak_points=10))
+    assert(len({spec, FormatSpec(best_of=5, final_set_tiebreak_points=10),
+                FormatSpec(best_of=5)}) == 2)
+    assert(spec.to_format_functions() is spec.to_format_functions())
+    assert(spec_of(spec.to_format_functions()) == spec)
+    assert(spec_of(fmts.classic_slam_format_men) is None)
+
+
+@pytest.mark.parametrize('arguments', [
+    {'best_of': 4}, {'final_set': 'sudden_death'},
+    {'best_of': 1, 'final_set': 'match_tiebreak'}, {'tiebreak_points': 0},
+    {'final_set_tiebreak_at': 4}])
+def test_invalid_spec(arguments):
+
+    with pytest.raises(ValueError):
+        FormatSpec(**arguments)
+
+
+@pytest.mark.parametrize('format_name', list(fmts.FORMAT_SPECS))
+def test_specs_match_formats(format_name):
+
+    format_functions = fmts.FORMATS[format_name]
+    from_spec = fmts.FORMAT_SPECS[format_name].to_format_functions()
+
+    rng = random.Random(4)
+
+    for cur_serve_prob in [0.5, 0.65, 0.8]:
+        for _ in range(10):
+
+            win_loss = random_win_loss(cur_serve_prob, format_functions, rng)
+
+            assert(parse(win_loss, from_spec) ==
+                   parse(win_loss, format_functions))
+
+
+def test_tables_beyond_their_size():
+
+    format_functions = FormatSpec(final_set='advantage').to_format_functions()
+
+    # Long deuce games and advantage sets.
+    assert(not format_functions.service_game_over(40, 39))
+    assert(format_functions.service_game_over(40, 42))
+    assert(format_functions.set_win_condition(70, 68, True))
+    assert(not format_functions.set_win_condition(69, 68, True))
+    assert(not format_functions.is_tiebreak_fun(50, 50, True))
+    assert(not format_functions.set_win_condition(9, 8, False))
+
+    scores_p1 = np.array([0, 4, 40, 40, 70, 7])
+    scores_p2 = np.array([0, 2, 39, 42, 68, 6])
+
+    assert(format_functions.service_game_over(
+        scores_p1, scores_p2).tolist() == [
+            format_functions.service_game_over(x, y)
+            for x, y in zip(scores_p1.tolist(), scores_p2.tolist())])
+    assert(format_functions.set_win_condition(
+        scores_p1, scores_p2, False).tolist() == [
+            format_functions.set_win_condition(x, y, False)
+            for x, y in zip(scores_p1.tolist(), scores_p2.tolist())])
+
+
+def test_pickle():
+
+    format_functions = fmts.no_ad_match_tiebreak
+
+    assert(pickle.loads(pickle.dumps(format_functions)) is format_functions)
+    assert(len(pickle.dumps(format_functions)) < 500)
+
+
+def test_no_ad_and_match_tiebreak():
+
+    format_functions = fmts.no_ad_match_tiebreak
+
+    # The deciding point wins the game.
+    states = parse([True, False] * 3 + [False], format_functions)
+    assert(states[-1].total_games_played == 1)
+
+    def choose_point(state):
+
+        # One set each, without dropping a point...
+        if state.set_num < 2:
+            return state.server == state.set_num
+
+        # ...then a match tiebreak to ten, which is 8-8 after 16 points.
+        if sum(state.cur_game_score) < 16:
+            return True
+
+        return state.server == 0
+
+    win_loss = play_match(choose_point, format_functions)
+    states = parse(win_loss, format_functions)
+
+    assert(states[47].is_tiebreak)
+    assert(len(win_loss) == 48 + 18)
+    assert(states[-1].past_sets[-1].player_scores == (1, 0))
+    assert(states[-1].past_sets[-1].tiebreak_score == (10, 8))
+
+    match_states = p.process_win_loss_vector(
+        win_loss, create_start_match_state('p1', 'p2'), format_functions)
+
+    assert([CompactMatchState.from_match_state(x) for x in match_states] ==
+           states)
+    assert(match_summary_string(match_states[-1], score_only=True) ==
+           '6-0 0-6 1-0(8)')
+
+
+def test_parse_cache_key():
+
+    spec = FormatSpec(best_of=5, final_set_tiebreak_at=12)
+
+    key = ParseCache.match_key('states', 'p1', 'p2', 'SSSS',
+                               spec.to_format_functions())
+
+    assert(key is not None)
+    assert(key != ParseCache.match_key('states', 'p1', 'p2', 'SSSS',
+                                       FormatSpec(best_of=5)
+                                       .to_format_functions()))
@@ -0,0 +1,55 @@
+import random
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.history import StateHistory
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import long_final_set_win_loss, random_win_loss
+
+
+@pytest.mark.parametrize('format_name', list(fmts.FORMATS))
+def test_state_history(format_name):
+
+    format_functions = fmts.FORMATS[format_name]
+    rng = random.Random(6)
+    start_state = create_start_match_state('Roger Federer', 'Rafael Nadal')
+
+    for cur_win_loss in [random_win_loss(0.6, format_functions, rng),
+                         long_final_set_win_loss(format_functions)]:
+
+        states = p.process_win_loss_vector(cur_win_loss, start_state,
+                                           format_functions)
+        history = StateHistory(iter(cur_win_loss), start_state,
+                               format_functions)
+
+        assert(len(history) == len(states))
+        assert(list(history) == states)
+        assert(history[-1] == states[-1])
+        assert(history[10:40:3] == states[10:40:3])
+        assert(history[::-1] == states[::-1])
+
+        # Starting part of the way through the match.
+        middle = len(states) // 2
+
+        history = StateHistory(cur_win_loss[middle + 1:], states[middle],
+                               format_functions)
+
+        assert(history[:] == states[middle + 1:])
+
+
+def test_state_history_size():
+
+    format_functions = fmts.classic_slam_format_men
+    win_loss = long_final_set_win_loss(format_functions)
+
+    history = StateHistory(win_loss, create_start_match_state('a', 'b'),
+                           format_functions)
+
+    assert(history.nbytes < 4 * len(history))
+
+    with pytest.raises(IndexError):
+        history.compact_state(len(history))
+
+    with pytest.raises(AssertionError):
+        StateHistory(win_loss + [True], create_start_match_state('a', 'b'),
+                     format_functions)
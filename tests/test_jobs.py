@@ -0,0 +1,172 @@
+import os
+import time
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import point_parser.jobs as jobs
+import point_parser.compare_with_sackmann as cws
+from point_parser.synthetic import make_sackmann_frame
+
+
+def write_files(directory):
+
+    # Two files of Jeff's data, with a few matches which do not parse.
+
+    paths = list()
+
+    for cur_file, cur_n_matches in enumerate([23, 12]):
+
+        sackmann_df = make_sackmann_frame(cur_n_matches, seed=cur_file)
+
+        sackmann_df.loc[3, 'pbp'] = sackmann_df.loc[3, 'pbp'][:40].rstrip(
+            ';.')
+        sackmann_df.loc[5, 'score'] = '6-4 6-5'
+
+        # Discarded.
+        sackmann_df.loc[7, 'tny_name'] = 'DavisCupWorldGroup'
+
+        path = os.path.join(directory, f'pbp_{cur_file}.csv')
+        sackmann_df.to_csv(path, index=False)
+        paths.append(path)
+
+    return paths
+
+
+def test_plan_job(tmp_path):
+
+    paths = write_files(tmp_path)
+    job_dir = os.path.join(tmp_path, 'job')
+
+    manifest = jobs.plan_job(paths, job_dir, shard_size=5)
+
+    assert([x['n_rows'] for x in manifest['shards']] ==
+           [5, 5, 5, 5, 3, 5, 5, 2])
+    assert(jobs.plan_job(paths, job_dir, shard_size=5) == manifest)
+
+    with pytest.raises(ValueError):
+        jobs.plan_job(paths, job_dir, shard_size=10)
+
+    # Each shard reads the same rows as reading the whole file.
+    shard_rows = [jobs.read_shard(x) for x in manifest['shards']
+                  if x['file'] == os.path.abspath(paths[0])]
+    whole_file = next(cws.iter_sackmann_data(paths[0]))
+
+    assert(list(shard_rows[1].index) == [5, 6, 8, 9])
+    assert(list(sum((list(x['pbp']) for x in shard_rows), [])) ==
+           list(whole_file['pbp']))
+
+
+def test_run_and_merge(tmp_path):
+
+    paths = write_files(tmp_path)
+    job_dir = os.path.join(tmp_path, 'job')
+
+    manifest = jobs.plan_job(paths, job_dir, shard_size=4)
+    shard_ids = [x['id'] for x in manifest['shards']]
+
+    # A crash after two shards, and in the middle of another one, which is
+    # left claimed.
+    assert(jobs.run_shards(job_dir, max_shards=2) == shard_ids[:2])
+    open(os.path.join(job_dir, 'shards', f'{shard_ids[2]}.lock'), 'w').close()
+
+    with pytest.raises(ValueError):
+        jobs.merge_job(job_dir)
+
+    # The claimed shard is only redone once its lock is stale.
+    processed = jobs.run_local(job_dir, processes=3)
+
+    assert(sorted(processed) == shard_ids[3:])
+    assert(jobs.pending_shards(job_dir) == [shard_ids[2]])
+    assert(jobs.run_shards(job_dir, stale_after=0) == [shard_ids[2]])
+    assert(jobs.run_shards(job_dir, stale_after=0) == [])
+
+    matches, mismatches = jobs.merge_job(job_dir)
+
+    assert(os.path.exists(os.path.join(job_dir, 'matches.csv')))
+    assert(os.path.exists(os.path.join(job_dir, 'mismatches.csv')))
+    assert(not any(x.endswith('.tmp') or x.endswith('.lock')
+                   for x in os.listdir(os.path.join(job_dir, 'shards'))))
+
+    assert(list(matches.columns) == jobs.RESULT_COLUMNS)
+
+    expected = list()
+
+    for cur_path in paths:
+
+        sackmann_df = next(cws.iter_sackmann_data(cur_path))
+        problematic = cws.validate_all(sackmann_df)
+
+        expected.extend((os.path.abspath(cur_path), x['match_tuple'].Index)
+                        for x in problematic)
+
+        assert(list(matches.loc[matches['file'] == os.path.abspath(
+            cur_path), 'row']) == list(sackmann_df.index))
+
+    assert(list(zip(mismatches['file'], mismatches['row'])) == expected)
+    assert(list(mismatches['cause']) == ['retirement', 'score_mismatch'] * 2)
+    assert((mismatches['parsed_score'] != mismatches['score']).all())
+
+
+def test_stale_lock_takeover(tmp_path, monkeypatch):
+
+    path = os.path.join(tmp_path, 'pbp.csv')
+    make_sackmann_frame(20).to_csv(path, index=False)
+
+    job_dir = os.path.join(tmp_path, 'job')
+    manifest = jobs.plan_job([path], job_dir, shard_size=20)
+    shard_id = manifest['shards'][0]['id']
+    lock_path = os.path.join(job_dir, 'shards', f'{shard_id}.lock')
+    release_path = os.path.join(tmp_path, 'release')
+
+    # Other processes only process their shard once release_path exists,
+    # so that they hold its lock for as long as needed.
+    process_shard = jobs.process_shard
+    parent = os.getpid()
+
+    def blocking_process_shard(*args):
+        while os.getpid() != parent and not os.path.exists(release_path):
+            time.sleep(0.01)
+        return process_shard(*args)
+
+    monkeypatch.setattr(jobs, 'process_shard', blocking_process_shard)
+
+    def age_lock():
+        while not os.path.exists(lock_path):
+            time.sleep(0.01)
+        os.utime(lock_path, (time.time() - 100, time.time() - 100))
+
+    def run_with_other(heartbeat, wait_for_heartbeat):
+
+        # Another process claims the shard first.
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context(
+                'fork')) as executor:
+
+            other = executor.submit(jobs.run_shards, job_dir,
+                                    heartbeat=heartbeat)
+            age_lock()
+
+            while wait_for_heartbeat and \
+                    time.time() - os.path.getmtime(lock_path) > 10:
+                time.sleep(0.01)
+
+            processed = jobs.run_shards(job_dir, stale_after=10)
+
+            open(release_path, 'w').close()
+
+            return other.result(), processed
+
+    # The lock is kept fresh, so the shard is not taken over.
+    assert(run_with_other(0.05, True) == ([shard_id], []))
+
+    for cur_file in os.listdir(os.path.join(job_dir, 'shards')):
+        os.remove(os.path.join(job_dir, 'shards', cur_file))
+    os.remove(release_path)
+
+    # Without a heartbeat, the lock goes stale and the shard is processed
+    # twice, but neither process fails, even though the lock is gone when
+    # the first one finishes.
+    assert(run_with_other(100, False) == ([shard_id], [shard_id]))
+
+    assert(sorted(os.listdir(os.path.join(job_dir, 'shards'))) ==
+           [f'{shard_id}.csv', f'{shard_id}.done'])
+    assert(len(jobs.merge_job(job_dir)[0]) == 20)
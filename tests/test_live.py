@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.live import (LiveScorer, FeedSimulator, PointEvent,
+                               queue_events)
+from point_parser.match_state import CompactMatchState
+from point_parser.utils import create_start_match_state, match_summary_string
+
+
+def test_live_scorer():
+
+    feeds = FeedSimulator(30, format_functions=fmts.classic_slam_format_men,
+                          seed=0, points_per_yield=7)
+
+    async def run():
+
+        scorer = LiveScorer()
+        feeds.add_matches(scorer)
+
+        updates = dict()
+
+        async def read(subscription):
+            async for cur_update in subscription:
+                updates.setdefault(cur_update.match_id, []).append(
+                    cur_update)
+
+        reader = asyncio.create_task(read(scorer.subscribe(max_size=16)))
+
+        n_events = await scorer.consume(feeds.events())
+        scorer.close()
+        await reader
+
+        return scorer, n_events, updates
+
+    scorer, n_events, updates = asyncio.run(run())
+
+    assert(n_events == feeds.n_points)
+    assert(len(scorer) == 0)
+    assert(set(updates) == set(feeds.matches))
+
+    for cur_match_id, cur_win_loss in feeds.matches.items():
+
+        expected = list(p.iter_compact_states(
+            cur_win_loss, CompactMatchState.from_match_state(
+                create_start_match_state(f'{cur_match_id}_p1',
+                                         f'{cur_match_id}_p2')),
+            fmts.classic_slam_format_men))
+
+        assert([x.state for x in updates[cur_match_id]] == expected)
+        assert([x.n_points for x in updates[cur_match_id]] ==
+               list(range(1, len(expected) + 1)))
+        assert(updates[cur_match_id][-1].score ==
+               match_summary_string(expected[-1].to_match_state()))
+
+
+def test_backpressure():
+
+    async def run():
+
+        scorer = LiveScorer(render_scores=False)
+        scorer.add_match('m1', 'p1', 'p2', fmts.standard_best_of_three)
+        scorer.add_match('m2', 'p1', 'p2', fmts.standard_best_of_three)
+
+        subscription = scorer.subscribe(['m1'], max_size=2)
+
+        # Updates to other matches are not queued.
+        await scorer.publish(PointEvent('m2', True))
+
+        await scorer.publish(PointEvent('m1', True))
+        await scorer.publish(PointEvent('m1', True))
+
+        # The queue is full, so publishing waits for the subscriber.
+        publishing = asyncio.create_task(
+            scorer.publish(PointEvent('m1', False)))
+        await asyncio.sleep(0.01)
+        assert(not publishing.done())
+
+        first = await subscription.__anext__()
+        await publishing
+
+        subscription.close()
+
+        return first, [x async for x in subscription]
+
+    first, rest = asyncio.run(run())
+
+    assert(first.state.cur_game_score == (1, 0))
+    assert([x.state.cur_game_score for x in rest] == [(2, 0), (2, 1)])
+
+
+def test_queue_events():
+
+    async def run():
+
+        scorer = LiveScorer(score_only=True)
+
+        # Subscribe before the match is added.
+        subscription = scorer.subscribe(['m1'])
+        scorer.add_match('m1', 'p1', 'p2', fmts.standard_best_of_three)
+
+        queue = asyncio.Queue()
+
+        for cur_won in [True, True, False]:
+            queue.put_nowait(PointEvent('m1', cur_won))
+
+        queue.put_nowait(None)
+
+        n_events = await scorer.consume(queue_events(queue))
+        scorer.close()
+
+        return n_events, [x.score async for x in subscription]
+
+    n_events, scores = asyncio.run(run())
+
+    assert(n_events == 3)
+    assert(scores == ['0-0 15:0', '0-0 30:0', '0-0 30:15'])
+
+
+def test_unknown_match():
+
+    async def run():
+        await LiveScorer().publish(PointEvent('m1', True))
+
+    with pytest.raises(KeyError):
+        asyncio.run(run())
+
+
+def test_close_releases_publisher():
+
+    feeds = FeedSimulator(5, seed=1)
+
+    async def run():
+
+        scorer = LiveScorer(render_scores=False)
+        feeds.add_matches(scorer)
+
+        async def read_some(subscription):
+            async with subscription:
+                async for _ in subscription:
+                    # Leave while the publisher waits for room.
+                    await asyncio.sleep(0.01)
+                    return
+
+        reader = asyncio.create_task(read_some(scorer.subscribe(max_size=2)))
+
+        # Closing a subscription while another is being published to does
+        # not change the lists being gone through.
+        other = scorer.subscribe(max_size=2)
+
+        async def close_other():
+            await other.__anext__()
+            other.close()
+
+        closer = asyncio.create_task(close_other())
+
+        n_events = await asyncio.wait_for(scorer.consume(feeds.events()), 5)
+
+        await reader
+        await closer
+
+        return n_events
+
+    assert(asyncio.run(run()) == feeds.n_points)
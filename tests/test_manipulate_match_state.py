@@ -0,0 +1,70 @@
+import random
+import point_parser.formats as fmts
+import point_parser.manipulate_match_state as mms
+from point_parser.match_state import CompactMatchState
+from point_parser.utils import create_start_match_state
+
+
+ALL_FORMATS = [fmts.classic_slam_format_men, fmts.standard_best_of_three,
+               fmts.us_open_format_men, fmts.classic_slam_format_ladies,
+               fmts.us_open_format_ladies]
+
+
+def advance_reference(server_won, match_state, format_functions):
+
+    if match_state.is_tiebreak:
+        return mms.advance_tiebreak(server_won, match_state, format_functions)
+    else:
+        return mms.advance_service_game(server_won, match_state,
+                                        format_functions)
+
+
+def test_advance_compact_state_matches_match_state_functions():
+
+    random.seed(1)
+
+    for cur_format in ALL_FORMATS:
+        for _ in range(20):
+
+            serve_prob = random.uniform(0.5, 0.9)
+
+            state = create_start_match_state('p1', 'p2')
+            compact_state = CompactMatchState.from_match_state(state)
+
+            while not state.is_over:
+
+                server_won = random.random() < serve_prob
+
+                state = advance_reference(server_won, state, cur_format)
+                compact_state = mms.advance_compact_state(
+                    server_won, compact_state, cur_format)
+
+                assert(compact_state.to_match_state() == state)
+
+
+def test_advance_does_not_modify_input():
+
+    state = create_start_match_state('p1', 'p2')
+    new_state = mms.advance_service_game(True, state,
+                                         fmts.standard_best_of_three)
+
+    assert(state.cur_game_score == {'p1': 0, 'p2': 0})
+    assert(new_state.cur_game_score == {'p1': 1, 'p2': 0})
+
+
+def test_compact_match_state_round_trip():
+
+    state = create_start_match_state('p1', 'p2')
+
+    # p1 wins the first set 6-0, then the second set goes to a tiebreak.
+    win_loss = ([True] * 4 + [False] * 4) * 3 + [True] * (4 * 12 + 3)
+
+    for cur_win_loss in win_loss:
+        state = advance_reference(cur_win_loss, state,
+                                  fmts.standard_best_of_three)
+
+    compact_state = CompactMatchState.from_match_state(state)
+
+    assert(len(compact_state.past_sets) == 1)
+    assert(compact_state.is_tiebreak)
+    assert(compact_state.to_match_state() == state)
@@ -0,0 +1,59 @@
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.format_functions import FormatFunctions
+from point_parser.match_parser import MatchParser
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import random_win_loss
+
+
+def test_push_gives_same_states_as_process_win_loss_vector():
+
+    win_loss = random_win_loss(0.6, fmts.classic_slam_format_men)
+    start_state = create_start_match_state('Roger Federer', 'Rafael Nadal')
+
+    expected = p.process_win_loss_vector(win_loss, start_state,
+                                         fmts.classic_slam_format_men)
+
+    parser = MatchParser(start_state, fmts.classic_slam_format_men)
+
+    first_states = [parser.push(x) for x in win_loss[:10]]
+    other_states = parser.push_many(win_loss[10:])
+
+    assert([x.to_match_state() for x in first_states + other_states] ==
+           expected)
+    assert(parser.match_state == expected[-1])
+    assert(parser.n_points == len(win_loss))
+
+
+def test_snapshot_and_restore():
+
+    win_loss = random_win_loss(0.7, fmts.standard_best_of_three)
+    start_state = create_start_match_state('Roger Federer', 'Rafaël Nadal')
+
+    expected = p.process_win_loss_vector(win_loss, start_state,
+                                         fmts.standard_best_of_three)
+
+    parser = MatchParser(start_state, fmts.standard_best_of_three)
+
+    for cur_point, cur_win_loss in enumerate(win_loss):
+
+        # Hand the match over to a new parser after every point.
+        parser = MatchParser.restore(parser.snapshot())
+
+        assert(parser.n_points == cur_point)
+        assert(parser.push(cur_win_loss).to_match_state() ==
+               expected[cur_point])
+
+
+def test_restore_with_custom_format():
+
+    # A copy of a format, which is therefore not in FORMATS.
+    custom_format = FormatFunctions(**vars(fmts.standard_best_of_three))
+
+    parser = MatchParser(create_start_match_state('p1', 'p2'), custom_format)
+    parser.push_many([True] * 10)
+
+    restored = MatchParser.restore(parser.snapshot(), custom_format)
+
+    assert(restored.state == parser.state)
+    assert(restored.format_functions is custom_format)
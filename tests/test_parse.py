@@ -0,0 +1,65 @@
+import point_parser.parse as p
+import point_parser.utils as utils
+import point_parser.formats as fmts
+
+
+# Federer vs. Nadal, Miami 2017 [see README].
+FEDERER_NADAL = [
+    True, False, False, True, False, True, False, True, True, True, True,
+    False, True, True, False, True, False, True, True, True, True, False,
+    False, True, True, False, True, False, True, True, True, True, True, False,
+    True, False, False, False, True, True, True, False, True, True, False,
+    False, True, True, True, True, True, False, False, False, True, True,
+    True, True, False, False, True, False, True, False, True, False, False,
+    True, False, True, True, True, True, True, False, True, True, True, True,
+    True, True, True, False, True, True, False, True, True, True, True, True,
+    True, True, True, True, True, True, True, True, True, False, True, False,
+    False, True, False, True, True, True, False, True, True, False, True,
+    True, False, True, True, False, False, False, False, True, True, False,
+    True, True]
+
+
+def test_process_win_loss_vector_federer_nadal():
+
+    states = p.process_win_loss_vector(
+        FEDERER_NADAL,
+        utils.create_start_match_state('Roger Federer', 'Rafael Nadal'),
+        fmts.standard_best_of_three)
+
+    assert(len(states) == len(FEDERER_NADAL))
+    assert(utils.match_summary_string(states[0]) ==
+           'Roger Federer - Rafael Nadal: 0-0 15:0')
+    assert(states[-1].is_over)
+    assert(utils.match_summary_string(states[-1], score_only=True) ==
+           '6-3 6-4')
+
+
+def test_iter_match_states_is_lazy():
+
+    start_state = utils.create_start_match_state('p1', 'p2')
+
+    # Only the first four points are ever consumed.
+    states = p.iter_match_states(iter([True] * 4 + [None]), start_state,
+                                 fmts.standard_best_of_three)
+
+    for _ in range(4):
+        cur_state = next(states)
+
+    assert(cur_state.cur_set_score == {'p1': 1, 'p2': 0})
+
+
+def test_process_win_loss_vector_long_match():
+
+    # Four sets won 6-0 alternately, followed by a final set in which the
+    # server always holds. This used to exceed the recursion limit.
+    p1_set = ([True] * 4 + [False] * 4) * 3
+    p2_set = ([False] * 4 + [True] * 4) * 3
+    win_loss = (p1_set + p2_set) * 2 + [True] * 4 * 500
+
+    start_state = utils.create_start_match_state('p1', 'p2')
+    states = list(p.iter_match_states(win_loss, start_state,
+                                      fmts.classic_slam_format_men))
+
+    assert(len(states) == len(win_loss))
+    assert(states[-1].sets_won == {'p1': 2, 'p2': 2})
+    assert(states[-1].cur_set_score == {'p1': 250, 'p2': 250})
@@ -0,0 +1,122 @@
+import point_parser.compare_with_sackmann as cws
+import point_parser.formats as fmts
+from point_parser.parse_cache import ParseCache
+from point_parser.synthetic import make_sackmann_frame
+
+
+def test_validate_all_with_parse_cache(tmp_path):
+
+    sackmann_df = make_sackmann_frame(20, seed=2)
+    sackmann_df.loc[3, 'score'] = '6-0 6-0'
+    sackmann_df.loc[8, 'pbp'] = 'SSSS'
+
+    expected = cws.validate_all(sackmann_df)
+
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        cold = cws.validate_all(sackmann_df, parse_cache=parse_cache)
+
+        assert(parse_cache.stats()['misses'] == 20)
+        assert(parse_cache.stats()['entries'] == 20)
+
+    # Warm runs, including from a new process, should not parse anything.
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        warm = cws.validate_all(sackmann_df, parse_cache=parse_cache)
+        warm_parallel = cws.validate_all(sackmann_df, workers=2,
+                                         parse_cache=parse_cache)
+
+        assert(parse_cache.hits == 40)
+        assert(parse_cache.misses == 0)
+
+    assert(cold == expected)
+    assert(warm == expected)
+    assert(warm_parallel == expected)
+
+    # Without final_state_only, all the states are looked up instead.
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        all_states = cws.validate_all(sackmann_df, parse_cache=parse_cache,
+                                      final_state_only=False)
+
+        assert(parse_cache.misses == 20)
+        assert(parse_cache.stats()['entries'] == 40)
+
+    assert(all_states == expected)
+
+
+def test_process_match_with_parse_cache(tmp_path):
+
+    row = make_sackmann_frame(1).iloc[0]
+    cur_format = cws.SLAM_FORMATS[row.tny_name]
+
+    expected = cws.process_match(row.server1, row.server2, row.pbp,
+                                 cur_format)
+
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        for _ in range(2):
+            states = cws.process_match(row.server1, row.server2, row.pbp,
+                                       cur_format, parse_cache=parse_cache)
+            assert(states == expected)
+
+        # The order of the players is part of the key.
+        cws.process_match(row.server2, row.server1, row.pbp, cur_format,
+                          parse_cache=parse_cache)
+
+        assert((parse_cache.hits, parse_cache.misses) == (1, 2))
+
+
+def test_missing_player_name(tmp_path):
+
+    sackmann_df = make_sackmann_frame(5, seed=3)
+    sackmann_df.loc[2, 'server2'] = float('nan')
+
+    expected = cws.validate_all(sackmann_df)
+
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        problematic = cws.validate_all(sackmann_df, parse_cache=parse_cache)
+
+        # The match with the missing name is parsed, but not cached.
+        assert(parse_cache.stats()['entries'] == 4)
+
+    assert(problematic == expected)
+
+
+def test_schema_version_in_key(tmp_path, monkeypatch):
+
+    row = make_sackmann_frame(1).iloc[0]
+    cur_format = cws.SLAM_FORMATS[row.tny_name]
+
+    with ParseCache(tmp_path / 'cache.sqlite') as parse_cache:
+
+        cws.process_match(row.server1, row.server2, row.pbp, cur_format,
+                          parse_cache=parse_cache)
+
+        # Entries stored by an older parser are not used.
+        monkeypatch.setattr(ParseCache, 'SCHEMA_VERSION',
+                            ParseCache.SCHEMA_VERSION + 1)
+
+        cws.process_match(row.server1, row.server2, row.pbp, cur_format,
+                          parse_cache=parse_cache)
+
+        assert((parse_cache.hits, parse_cache.misses) == (0, 2))
+
+
+def test_parse_cache_eviction(tmp_path):
+
+    with ParseCache(tmp_path / 'cache.sqlite', max_bytes=100) as parse_cache:
+
+        for cur_value in range(10):
+
+            key = parse_cache.match_key('test', 'p1', 'p2', str(cur_value),
+                                        fmts.standard_best_of_three)
+            parse_cache.get_or_compute(key, lambda: 'x' * 50)
+
+        assert(parse_cache.stored_bytes() <= 100)
+
+        # The most recent entry is kept.
+        parse_cache.get_or_compute(key, lambda: None)
+
+        assert(parse_cache.hits == 1)
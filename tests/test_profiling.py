@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+import point_parser.compare_with_sackmann as cws
+import point_parser.formats as fmts
+import point_parser.profiling as profiling
+from point_parser.format_functions import FormatFunctions
+from point_parser.synthetic import make_sackmann_frame
+
+
+def test_profile_validate_all():
+
+    sackmann_df = make_sackmann_frame(8)
+
+    with profiling.profile() as cur_profile:
+        cws.validate_all(sackmann_df, final_state_only=False)
+
+    report = cur_profile.to_dict()
+
+    for cur_stage in ['parse', 'convert_to_boolean', 'copy_states',
+                      'match_summary_string']:
+        assert(report['stages'][cur_stage]['calls'] == 8)
+        assert(report['stages'][cur_stage]['seconds'] > 0)
+
+    with profiling.profile() as cur_profile:
+        cws.validate_all(sackmann_df)
+
+    report = cur_profile.to_dict()
+
+    for cur_stage in ['parse', 'convert_to_boolean', 'compare_score']:
+        assert(report['stages'][cur_stage]['calls'] == 8)
+
+    assert('copy_states' not in report['stages'])
+
+    assert(report['callbacks']['service_game_over'] > 0)
+    assert(set(report['callbacks']) == set(
+        FormatFunctions.__dataclass_fields__))
+
+    json.loads(cur_profile.to_json())
+
+
+def test_profiling_off():
+
+    format_functions = fmts.standard_best_of_three
+
+    assert(profiling.instrument(format_functions) is format_functions)
+    assert(profiling.stage('parse') is profiling.stage('load_csv'))
+
+    with profiling.profile():
+        instrumented = profiling.instrument(format_functions)
+
+        assert(instrumented is not format_functions)
+        assert(profiling.instrument(format_functions) is instrumented)
+
+    assert(profiling.instrument(format_functions) is format_functions)
+
+
+def test_profile_from_environment(tmp_path):
+
+    code = ('import point_parser.compare_with_sackmann as cws\n'
+            'from point_parser.synthetic import make_sackmann_frame\n'
+            'cws.validate_all(make_sackmann_frame(2))\n')
+
+    subprocess.run([sys.executable, '-c', code], check=True, env={
+        **os.environ,
+        profiling.PROFILE_ENV_VAR: str(tmp_path / 'profile.json')})
+
+    with open(tmp_path / 'profile.json') as profile_file:
+        report = json.load(profile_file)
+
+    assert(report['stages']['parse']['calls'] == 2)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.simulate import simulate_matches
+from point_parser.utils import create_start_match_state, match_summary_string
+
+
+@pytest.mark.parametrize('format_name', list(fmts.FORMATS))
+def test_simulation_agrees_with_parser(format_name):
+
+    format_functions = fmts.FORMATS[format_name]
+
+    result = simulate_matches(format_functions, (0.7, 0.6), 50, seed=3,
+                              point_columns=True)
+
+    assert(len(result) == 50)
+    assert(len(result.points) == result.n_points.sum())
+
+    for cur_match, cur_points in result.points.groupby('match'):
+
+        states = p.process_win_loss_vector(
+            cur_points['server_won'].tolist(),
+            create_start_match_state('p1', 'p2'), format_functions)
+
+        assert(states[-1].is_over)
+        assert(cur_points['point'].tolist() == list(range(len(states))))
+        assert(cur_points['games_p1'].tolist() ==
+               [x.cur_set_score['p1'] for x in states])
+        assert(match_summary_string(states[-1], score_only=True) ==
+               result.score_string(cur_match))
+        assert(result.winner[cur_match] ==
+               int(states[-1].sets_won['p2'] > states[-1].sets_won['p1']))
+
+
+def test_simulation_is_reproducible():
+
+    first = simulate_matches(fmts.standard_best_of_three, (0.65, 0.65),
+                             200, seed=1)
+    second = simulate_matches(fmts.standard_best_of_three, (0.65, 0.65),
+                              200, seed=1)
+
+    assert(np.array_equal(first.set_scores, second.set_scores))
+    assert(np.array_equal(first.n_points, second.n_points))
+    assert(first.points is None)
+
+    # The stronger server should win more often.
+    result = simulate_matches(fmts.standard_best_of_three, (0.75, 0.55),
+                              2000, seed=2)
+
+    assert(result.winner.mean() < 0.2)
+
+
+def test_simulation_which_never_ends():
+
+    with pytest.raises(ValueError):
+        simulate_matches(fmts.standard_best_of_three, (1., 1.), 3,
+                         max_points=500)
@@ -0,0 +1,128 @@
+import numpy as np
+import point_parser.parse as p
+import point_parser.columnar as columnar
+import point_parser.compare_with_sackmann as cws
+import point_parser.formats as fmts
+import point_parser.stats as stats
+from point_parser.match_state import CompactMatchState
+from point_parser.manipulate_match_state import advance_compact_state
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import make_sackmann_frame, random_win_loss
+
+
+def expected_flags(win_loss, format_functions):
+
+    # The flags, found by playing out both outcomes of each point.
+
+    state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    flags = {x: list() for x in stats.FLAG_COLUMNS}
+
+    for cur_won in win_loss:
+
+        flags['point_server'].append(state.server)
+        flags['point_winner'].append(
+            state.server if cur_won else 1 - state.server)
+        flags['was_tiebreak'].append(state.is_tiebreak)
+
+        returner_wins = advance_compact_state(False, state, format_functions)
+        flags['break_point'].append(
+            not state.is_tiebreak and
+            returner_wins.total_games_played > state.total_games_played)
+
+        for cur_player in [0, 1]:
+
+            outcome = advance_compact_state(
+                state.server == cur_player, state, format_functions)
+
+            flags[f'set_point_p{cur_player + 1}'].append(
+                len(outcome.past_sets) > len(state.past_sets))
+            flags[f'match_point_p{cur_player + 1}'].append(outcome.is_over)
+
+        next_state = advance_compact_state(cur_won, state, format_functions)
+        flags['game_over'].append(
+            next_state.total_games_played > state.total_games_played)
+        state = next_state
+
+    return flags
+
+
+def test_flag_points():
+
+    for cur_format in [fmts.classic_slam_format_men,
+                       fmts.standard_best_of_three,
+                       fmts.no_ad_match_tiebreak]:
+
+        win_loss = random_win_loss(0.65, cur_format)
+        frame = columnar.match_to_frame(win_loss, 'p1', 'p2', cur_format)
+
+        flagged = stats.flag_points(frame, cur_format)
+        expected = expected_flags(win_loss, cur_format)
+
+        for cur_column in stats.FLAG_COLUMNS:
+            assert(flagged[cur_column].tolist() == expected[cur_column])
+
+        # The last point wins the match.
+        winner = flagged['point_winner'].iloc[-1]
+        assert(flagged[f'match_point_p{winner + 1}'].iloc[-1])
+
+
+def test_sackmann_stats():
+
+    sackmann_df = make_sackmann_frame(40)
+    sackmann_df.loc[3, 'pbp'] = 'SSSS'
+
+    player_stats, match_stats, failed = stats.sackmann_stats(sackmann_df)
+
+    assert(list(failed) == [3])
+    assert(len(player_stats) == 2 * 39)
+    assert(list(match_stats['match']) == list(sackmann_df.index.drop(3)))
+
+    for cur_match, cur_row in sackmann_df.drop(index=3).iterrows():
+
+        win_loss = cws.convert_to_boolean(cur_row.pbp)
+        cur_format = cws.SLAM_FORMATS.get(cur_row.tny_name,
+                                          fmts.standard_best_of_three)
+
+        flags = {x: np.array(y) for x, y in expected_flags(
+            win_loss, cur_format).items()}
+        final_state = list(p.iter_compact_states(
+            win_loss, CompactMatchState.from_match_state(
+                create_start_match_state('p1', 'p2')), cur_format))[-1]
+
+        cur_players = player_stats[player_stats['match'] == cur_match]
+        assert(list(cur_players['player']) == [cur_row.server1,
+                                               cur_row.server2])
+
+        service_games = flags['game_over'] & ~flags['was_tiebreak']
+
+        for cur_player, cur_stats in zip([0, 1], cur_players.itertuples()):
+
+            serves = flags['point_server'] == cur_player
+            won = flags['point_winner'] == cur_player
+
+            assert(cur_stats.player_num == cur_player)
+            assert(cur_stats.points_won == won.sum())
+            assert(cur_stats.service_games == (serves & service_games).sum())
+            assert(cur_stats.service_games_held ==
+                   (serves & service_games & won).sum())
+            assert(cur_stats.break_points_faced ==
+                   (serves & flags['break_point']).sum())
+            assert(cur_stats.break_points_won ==
+                   (~serves & flags['break_point'] & won).sum())
+            assert(cur_stats.set_points ==
+                   flags[f'set_point_p{cur_player + 1}'].sum())
+            assert(cur_stats.set_points_won ==
+                   final_state.sets_won[cur_player])
+            assert(cur_stats.match_points_won ==
+                   (final_state.sets_won[cur_player] >
+                    final_state.sets_won[1 - cur_player]))
+
+        cur_match_stats = match_stats[match_stats['match'] == cur_match]
+
+        assert(cur_match_stats['points'].item() == len(win_loss))
+        assert(cur_match_stats['games'].item() ==
+               final_state.total_games_played)
+        assert(cur_match_stats['points_per_game'].item() ==
+               (~flags['was_tiebreak']).sum() / service_games.sum())
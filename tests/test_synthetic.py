@@ -0,0 +1,50 @@
+import random
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import (make_matches, long_final_set_win_loss,
+                                    random_win_loss)
+
+
+def final_state(win_loss, format_functions):
+
+    return p.process_win_loss_vector(
+        win_loss, create_start_match_state('p1', 'p2'), format_functions)[-1]
+
+
+def test_random_win_loss_is_reproducible():
+
+    first = random_win_loss(0.6, fmts.standard_best_of_three,
+                            random.Random(7))
+    second = random_win_loss(0.6, fmts.standard_best_of_three,
+                             random.Random(7))
+
+    assert(first == second)
+    assert(final_state(first, fmts.standard_best_of_three).is_over)
+
+
+def test_long_final_set_win_loss():
+
+    win_loss = long_final_set_win_loss(fmts.classic_slam_format_men, 30)
+    state = final_state(win_loss, fmts.classic_slam_format_men)
+
+    assert(state.is_over)
+    assert(len(state.past_sets) == 5)
+    assert(state.past_sets[-1].player_scores == {'p1': 17, 'p2': 15})
+
+    # With a tiebreak in the final set, it ends at 7-6.
+    win_loss = long_final_set_win_loss(fmts.us_open_format_men, 30)
+    state = final_state(win_loss, fmts.us_open_format_men)
+
+    assert(state.past_sets[-1].tiebreak_score is not None)
+
+
+def test_make_matches():
+
+    matches = make_matches(3, seed=1)
+
+    assert(len(matches) == 4 * len(fmts.FORMATS))
+    assert(matches == make_matches(3, seed=1))
+
+    for cur_name, cur_win_loss in matches:
+        assert(final_state(cur_win_loss, fmts.FORMATS[cur_name]).is_over)
@@ -0,0 +1,71 @@
+import random
+import point_parser.parse as p
+import point_parser.formats as fmts
+from point_parser.match_state import CompactMatchState
+from point_parser.synthetic import random_win_loss
+from point_parser.transition_cache import TransitionCache
+from point_parser.utils import create_start_match_state
+
+
+def test_transition_cache_gives_same_states():
+
+    rng = random.Random(2)
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    cache = TransitionCache()
+    matches = list()
+
+    for cur_format in [fmts.classic_slam_format_men,
+                       fmts.standard_best_of_three]:
+        for _ in range(30):
+
+            win_loss = random_win_loss(rng.uniform(0.5, 0.9), cur_format,
+                                       rng)
+
+            expected = list(p.iter_compact_states(
+                win_loss, start_state, cur_format))
+            cached = list(p.iter_compact_states(
+                win_loss, start_state, cur_format, transition_cache=cache))
+
+            assert(cached == expected)
+
+            matches.append((start_state, win_loss, cur_format))
+
+    # Once warm, the same matches should only need lookups.
+    misses = cache.misses
+
+    for start_state, win_loss, cur_format in matches:
+        list(p.iter_compact_states(win_loss, start_state, cur_format,
+                                   transition_cache=cache))
+
+    assert(cache.misses == misses)
+
+
+def test_transition_cache_counters_and_eviction():
+
+    cache = TransitionCache(max_size=10)
+
+    win_loss = [True] * 40
+    start_state = create_start_match_state('p1', 'p2')
+
+    p.process_win_loss_vector(win_loss, start_state,
+                              fmts.standard_best_of_three,
+                              transition_cache=cache)
+
+    # Every server holds to love, so the 40 points are ten games of four
+    # points each. The set score is different in each game, so no scoring
+    # state repeats and every point is a miss.
+    assert(cache.misses == 10 * 4)
+    assert(len(cache) == 10)
+
+    cache.clear()
+
+    p.process_win_loss_vector(win_loss[:8], start_state,
+                              fmts.standard_best_of_three,
+                              transition_cache=cache)
+    p.process_win_loss_vector(win_loss[:8], start_state,
+                              fmts.standard_best_of_three,
+                              transition_cache=cache)
+
+    assert((cache.hits, cache.misses) == (8, 8))
@@ -0,0 +1,91 @@
+import point_parser.formats as fmts
+import point_parser.triage as triage
+from point_parser.compare_with_sackmann import decode_pbp
+from point_parser.match_state import CompactMatchState
+from point_parser.utils import create_start_match_state
+from point_parser.synthetic import make_sackmann_frame
+
+
+def swap_server(pbp, game):
+
+    # Swaps the server from a game on, as if Jeff had the order of service
+    # wrong.
+
+    games = pbp.split(';')
+    swapped = [x.translate(str.maketrans('SR', 'RS')) for x in games[game:]]
+
+    return ';'.join(games[:game] + swapped)
+
+
+def test_first_divergence():
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    def diverge(pbp):
+        return triage.first_divergence(decode_pbp(pbp), start_state,
+                                       fmts.standard_best_of_three)
+
+    # Games won by the first server after losing their first point.
+    p1_games = ['RSSSS', 'SRRRR'] * 3
+    love_set = ';'.join(p1_games)
+    match = love_set + '.' + love_set
+
+    assert(diverge(match)[:2] == (None, None))
+    assert(diverge(match).state.is_over)
+
+    # A game too short, or too long.
+    assert(diverge('RSS;RSSSS')[:2] == (2, 'missing_game_end'))
+    assert(diverge('RSSSSS;RSSSS')[:2] == (4, 'game_end'))
+
+    # Sets ending too early, or too late.
+    assert(diverge(love_set + ';RSSSS')[:2] == (29, 'set_end'))
+    assert(diverge(';'.join(p1_games[:5]) + '.RSSSS')[:2] ==
+           (24, 'missing_set_end'))
+
+    # Points after the end, and a match which stops early.
+    assert(diverge(match + '.SR')[:2] == (59, 'points_after_end'))
+    assert(diverge(love_set + '.SR')[:2] == (32, 'unfinished'))
+
+    # The server changes after the first point of a tiebreak, which is at 6-6
+    # if the server wins every game.
+    to_tiebreak = ';'.join(['RSSSS'] * 12) + ';'
+
+    assert(diverge(to_tiebreak + 'S/SS/SS/SS')[:2] == (67, 'unfinished'))
+    assert(diverge(to_tiebreak + 'SS/S')[:2] == (60, 'tiebreak_serve_change'))
+
+
+def test_triage_all():
+
+    sackmann_df = make_sackmann_frame(40, seed=1)
+
+    # A retirement.
+    sackmann_df.loc[1, 'pbp'] = sackmann_df.loc[1, 'pbp'][:50].rstrip(';.')
+    # A best of five match played as best of three.
+    sackmann_df.loc[4, 'tny_name'] = 'WomensFrenchOpen'
+    # A best of three match filed under a best of five tournament.
+    sackmann_df.loc[10, 'tny_name'] = 'MensFrenchOpen'
+    # Jeff has the wrong server from the eighth game on.
+    sackmann_df.loc[5, 'pbp'] = swap_server(sackmann_df.loc[5, 'pbp'], 7)
+    # Not a valid pbp string.
+    sackmann_df.loc[6, 'pbp'] = 'SSSS'
+    # A typo in the score.
+    sackmann_df.loc[9, 'score'] = '6-4 6-5'
+
+    triaged = triage.triage_all(sackmann_df)
+
+    assert(list(triaged.index) == [1, 4, 5, 6, 9, 10])
+    assert(list(triaged['cause']) == ['retirement', 'format', 'server_order',
+                                      'invalid_pbp', 'score_mismatch',
+                                      'format'])
+    assert(list(triaged.columns) == triage.TRIAGE_COLUMNS)
+
+    assert(triaged.loc[1, 'divergence'] == 'unfinished')
+    assert(triaged.loc[4, 'divergence'] == 'points_after_end')
+    assert(triaged.loc[4, 'other_format'] == 'classic_slam_format_men')
+    assert(triaged.loc[10, 'divergence'] == 'unfinished')
+    assert(triaged.loc[10, 'other_format'] == 'standard_best_of_three')
+    assert(triaged.loc[5, 'swapped_game'] == 7)
+    assert(triaged.loc[9, 'parsed_score'] == '6-4 6-4')
+
+    assert(len(triage.triage_all(sackmann_df, include_ok=True)) == 40)
@@ -0,0 +1,67 @@
+import random
+import point_parser.parse as p
+import point_parser.formats as fmts
+import point_parser.utils as utils
+from point_parser.match_state import CompactMatchState
+from point_parser.synthetic import long_final_set_win_loss, random_win_loss
+
+
+def check_renderer(win_loss, format_functions):
+
+    start_state = utils.create_start_match_state('Roger Federer',
+                                                 'Rafael Nadal')
+
+    states = p.process_win_loss_vector(win_loss, start_state,
+                                       format_functions)
+    compact_states = list(p.iter_compact_states(
+        win_loss, CompactMatchState.from_match_state(start_state),
+        format_functions))
+
+    for cur_score_only in [False, True]:
+
+        expected = [utils.match_summary_string(x, score_only=cur_score_only)
+                    for x in states]
+
+        assert(utils.match_summary_strings(
+            compact_states, score_only=cur_score_only) == expected)
+        assert(utils.match_summary_strings(
+            states, score_only=cur_score_only) == expected)
+
+
+def test_score_renderer():
+
+    rng = random.Random(11)
+
+    for cur_format in fmts.FORMATS.values():
+        check_renderer(random_win_loss(0.65, cur_format, rng), cur_format)
+
+
+def test_score_renderer_long_final_set():
+
+    check_renderer(long_final_set_win_loss(fmts.classic_slam_format_men, 30),
+                   fmts.classic_slam_format_men)
+
+    # Long deuce games are not in the table to begin with.
+    check_renderer([True, False] * 10 + [True] * 2 + [True] * 4 * 11,
+                   fmts.standard_best_of_three)
+
+
+def test_score_renderer_other_match():
+
+    renderer = utils.ScoreRenderer(score_only=True)
+
+    first = random_win_loss(0.7, fmts.standard_best_of_three,
+                            random.Random(1))
+    second = random_win_loss(0.6, fmts.standard_best_of_three,
+                             random.Random(2))
+
+    start_state = utils.create_start_match_state('p1', 'p2')
+
+    # Switching between matches should not reuse the completed sets.
+    for cur_win_loss in [first, second]:
+
+        final_state = p.process_win_loss_vector(
+            cur_win_loss, start_state, fmts.standard_best_of_three)[-1]
+
+        assert(renderer.render(final_state) ==
+               utils.match_summary_string(final_state, score_only=True))
@@ -0,0 +1,130 @@
+import random
+import numpy as np
+import pytest
+import point_parser.parse as p
+import point_parser.formats as fmts
+import point_parser.columnar as columnar
+from point_parser.manipulate_match_state import advance_compact_state
+from point_parser.match_state import CompactMatchState
+from point_parser.simulate import simulate_matches
+from point_parser.synthetic import (long_final_set_win_loss,
+                                    make_sackmann_frame, random_win_loss)
+from point_parser.utils import create_start_match_state
+from point_parser.win_probability import (WinProbabilityTable, annotate,
+                                          annotate_sackmann_points)
+
+
+def compact_states(win_loss, format_functions):
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    return [start_state] + list(p.iter_compact_states(
+        win_loss, start_state, format_functions))
+
+
+def test_hold_probability():
+
+    table = WinProbabilityTable(fmts.standard_best_of_three, (0.6, 0.6))
+
+    # The well-known probability of holding serve when winning 60% of
+    # points on serve.
+    assert(abs(table.hold_probability(0) - 0.7357) < 1e-4)
+
+    # Thirty-all is the same as deuce.
+    assert(abs(table.hold_probability(0, (2, 2)) - 0.36 / 0.52) < 1e-12)
+
+
+@pytest.mark.parametrize('format_name', list(fmts.FORMATS))
+def test_win_probability_is_consistent(format_name):
+
+    format_functions = fmts.FORMATS[format_name]
+    serve_probs = (0.66, 0.61)
+    table = WinProbabilityTable(format_functions, serve_probs)
+
+    win_loss = random_win_loss(0.64, format_functions, random.Random(8))
+
+    for cur_state in compact_states(win_loss, format_functions)[:-1]:
+
+        prob = serve_probs[cur_state.server]
+
+        # The probability before a point is the average of those after it.
+        expected = (
+            prob * table.win_probability(advance_compact_state(
+                True, cur_state, format_functions)) +
+            (1 - prob) * table.win_probability(advance_compact_state(
+                False, cur_state, format_functions)))
+
+        assert(abs(table.win_probability(cur_state) - expected) < 1e-9)
+        assert(0 <= table.importance(cur_state) <= 1)
+
+
+def test_win_probability_long_final_set():
+
+    format_functions = fmts.classic_slam_format_men
+    table = WinProbabilityTable(format_functions, (0.7, 0.7))
+
+    states = compact_states(long_final_set_win_loss(format_functions, 30),
+                            format_functions)
+
+    # The first server breaks at 15-15 in the final set, and wins.
+    assert(table.win_probability(states[-1]) == 1.)
+    assert(0.5 < table.win_probability(states[-5]) < 1.)
+
+    # Equal players have an equal chance at any tie in the final set.
+    tied = [x for x in states if x.cur_set_score == (12, 12) and
+            x.cur_game_score == (0, 0)][0]
+
+    assert(abs(table.win_probability(tied) - 0.5) < 1e-9)
+
+
+def test_win_probability_against_simulation():
+
+    format_functions = fmts.us_open_format_men
+    table = WinProbabilityTable(format_functions, (0.64, 0.62))
+
+    result = simulate_matches(format_functions, (0.64, 0.62), 20000, seed=4)
+
+    start_state = CompactMatchState.from_match_state(
+        create_start_match_state('p1', 'p2'))
+
+    assert(abs(table.win_probability(start_state) -
+               (result.winner == 0).mean()) < 0.015)
+
+
+def test_annotate():
+
+    format_functions = fmts.standard_best_of_three
+    win_loss = random_win_loss(0.62, format_functions, random.Random(2))
+
+    points = columnar.match_to_frame(win_loss, 'A', 'B', format_functions)
+    annotated = annotate(points, format_functions, (0.62, 0.6))
+
+    table = WinProbabilityTable(format_functions, (0.62, 0.6))
+    states = compact_states(win_loss, format_functions)
+
+    assert(np.allclose(annotated['win_prob_p1'],
+                       [table.win_probability(x) for x in states[1:]]))
+    assert(np.allclose(annotated['importance'],
+                       [table.importance(x) for x in states[:-1]]))
+    assert(annotated['win_prob_p1'].iloc[-1] in [0., 1.])
+
+
+def test_annotate_sackmann_points():
+
+    sackmann_df = make_sackmann_frame(8, seed=6)
+    points, _ = columnar.sackmann_to_frame(sackmann_df)
+
+    annotated = annotate_sackmann_points(points, sackmann_df, (0.63, 0.63))
+
+    for cur_match in [0, 1]:
+
+        match_points = points[points['match'] == cur_match]
+        format_functions = [fmts.classic_slam_format_men,
+                            fmts.us_open_format_ladies][cur_match]
+
+        expected = annotate(match_points, format_functions, (0.63, 0.63))
+
+        assert(np.allclose(
+            annotated.loc[match_points.index, 'importance'],
+            expected['importance']))